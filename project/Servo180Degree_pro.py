@@ -1,23 +1,19 @@
 #!/usr/bin/env python3
 import time
-from board import SCL, SDA
-import busio
 from adafruit_motor import servo
-from adafruit_pca9685 import PCA9685
+from pca_bus import get_bus
 
 I2C_ADDR      = 0x40
-FREQUENCY_HZ  = 50
+FREQUENCY_HZ  = 50            # ставить pca_bus при ініціалізації шини
 MIN_US, MAX_US = 500, 2400   # для MG996R це ок; центр ≈1500us
 CHANNEL        = 0           # змініть на свій канал (0..15)
 
 # --- HW init ---
-i2c = busio.I2C(SCL, SDA)
-pca = PCA9685(i2c, address=I2C_ADDR)
-pca.frequency = FREQUENCY_HZ
+bus = get_bus(I2C_ADDR)
 
 # Створюємо ОДИН раз: далі тільки .angle
 srv = servo.Servo(
-    pca.channels[CHANNEL],
+    bus.channel(CHANNEL),
     min_pulse=MIN_US, max_pulse=MAX_US,
     actuation_range=180,
 )
@@ -47,4 +43,4 @@ if __name__ == "__main__":
         print("Ctrl+C -> center & deinit")
         center()
     finally:
-        pca.deinit()
+        bus.close()
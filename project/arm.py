@@ -1,15 +1,41 @@
 #!/usr/bin/env python3
-import time, json, os, math
-import board, busio
-from adafruit_servokit import ServoKit
-from typing import Dict, Tuple
+import json, os, math, time
+import backend
+from typing import Dict, Optional, Tuple
+from pca_frame import servo_duty, FREQUENCY_HZ
+from pca_bus import get_bus, PRIO_ARM
+from trajectory import PLANNER, sync_profile
+from servo_cal import JointTransform, compile_joint
+import recorder
+import telemetry
 
 def clamp(x: float, lo: float, hi: float) -> float:
     return lo if x < lo else hi if x > hi else x
 
+class _WatchedDict(dict):
+    """dict, що кличе on_change при зміні (щоб arm.OFFSETS[j] -= 1 теж перекомпілював калібрування)."""
+    def __init__(self, data, on_change):
+        super().__init__(data)
+        self._on_change = on_change
+    def __setitem__(self, k, v):
+        super().__setitem__(k, v); self._on_change()
+    def __delitem__(self, k):
+        super().__delitem__(k); self._on_change()
+    def update(self, *a, **kw):
+        super().update(*a, **kw); self._on_change()
+
+class JointState:
+    """Останнє КОМАНДОВАНЕ значення каналу (абсолютний кут + 16-бітний duty)."""
+    __slots__ = ("channel", "angle", "duty")
+
+    def __init__(self, channel: int):
+        self.channel = channel
+        self.angle: Optional[float] = None   # None — ще не писали (або після рестарту без resync)
+        self.duty: Optional[int] = None
+
 class Arm:
     """
-    Контролер руки на PCA9685 (через adafruit_servokit.ServoKit).
+    Контролер руки на PCA9685 (через спільну шину pca_bus.get_bus()).
 
     Кути API задаються ВІД центру:
       set_joint("base", delta) -> фактичний абсолютний кут =
@@ -21,18 +47,33 @@ class Arm:
       - Пер-суглобні actuation_range (joint_range), напр. base=270/360 (якщо серво позиційне >180).
       - Збереження/завантаження OFFSETS і LIMITS у JSON.
       - Плавні пози (pose).
+      - Покадровий запис (FrameWriter): pose/center шлють усі суглоби одного тіку
+        одним I2C burst'ом, незмінні канали пропускаються.
+      - Скомпільоване калібрування (servo_cal): delta -> duty без повторного
+        сортування меж і бібліотечної математики; перебудовується саме, коли
+        змінюються OFFSETS/LIMITS/joint_range/CENTER/PULSE_US/enforce_limits.
+      - Тіньовий стан (state): кути/duty читаються з пам'яті, а не з PCA9685;
+        resync_from_hw() — явне читання регістрів, коли це справді треба.
     """
 
+    # зміна будь-якого з цих атрибутів інвалідовує скомпільовані трансформації
+    _CAL_ATTRS = frozenset(("LIMITS", "OFFSETS", "joint_range", "CENTER", "PULSE_US", "enforce_limits"))
+
     def __init__(
         self,
         i2c_addr: int = 0x40,
-        channels: int = 16,
+        channels: int = 16,                       # не використовується (лишено для сумісності)
         center: int = 90,
         pulse_us: Tuple[int,int] = (600, 2400),   # ~1500us по центру
         default_range: int = 360,                 # базовий actuation_range, якщо не задано в joint_range
         offsets_file: str = "/home/mykodia/car/server/arm_offsets.json",
         limits_file:  str = "/home/mykodia/car/server/arm_limits.json",
+        lut: bool = False,                        # таблиця duty з кроком 0.1° замість афінної формули
     ):
+        self.use_lut = lut
+        self._xf = None
+        self.i2c_addr = i2c_addr
+        self._frame = None
         # --- канали (твоя мапа)
         self.JOINTS: Dict[str, int] = {
             "gripper":  0,  # щупальці
@@ -66,26 +107,64 @@ class Arm:
             "wrist":    default_range,
         }
 
+        # --- ліміти для синхронних рухів (pose(profile=...)): град/с і град/с²
+        # менше AMAX — м'якший старт і менше просідання живлення
+        self.VMAX: Dict[str, float] = { j: 180.0 for j in self.JOINTS }
+        self.AMAX: Dict[str, float] = { j: 720.0 for j in self.JOINTS }
+        self.PROFILE_HZ = 50.0
+
         self.CENTER = float(center)
         self.PULSE_US = pulse_us
         self.offsets_file = offsets_file
         self.limits_file = limits_file
         self.enforce_limits = True  # перемикач ПЗ-обмежень
+        self.planner = PLANNER      # кеш easing-таблиць спільний для всіх Arm у процесі
 
-        # --- HW init
-        i2c = busio.I2C(board.SCL, board.SDA)
-        self.kit = ServoKit(channels=channels, i2c=i2c, address=i2c_addr)
+        # --- HW: спільна шина PCA9685 піднімається ліниво, при першому записі (див. frame);
+        # actuation_range/PULSE_US живуть у скомпільованих трансформаціях (servo_cal)
 
-        # --- налаштувати кожен канал
-        for name, ch in self.JOINTS.items():
-            s = self.kit.servo[ch]
-            s.actuation_range = int(self.joint_range.get(name, default_range))
-            s.set_pulse_width_range(*self.PULSE_US)
+        # --- тіньовий стан: єдине джерело правди для читання кутів
+        self.state: Dict[str, JointState] = { j: JointState(ch) for j, ch in self.JOINTS.items() }
+        self._tel = { j: telemetry.channel("arm." + j) for j in self.JOINTS }
 
         # --- завантажити конфіги, якщо існують
         self._load_offsets_if_any()
         self._load_limits_if_any()
 
+    def __setattr__(self, name, value):
+        if name in self._CAL_ATTRS:
+            if isinstance(value, dict):
+                value = _WatchedDict(value, self._invalidate)
+            object.__setattr__(self, "_xf", None)
+        object.__setattr__(self, name, value)
+
+    @property
+    def frame(self):
+        """Буфер кадру на спільній шині; перше звернення піднімає залізо."""
+        if self._frame is None:
+            self.bus = get_bus(self.i2c_addr)
+            self._frame = self.bus.frame(PRIO_ARM)
+        return self._frame
+
+    # ========== скомпільоване калібрування ==========
+    def _invalidate(self):
+        self._xf = None
+
+    def compile(self) -> Dict[str, JointTransform]:
+        """Зібрати трансформації delta -> (кут, duty) для всіх суглобів."""
+        return {
+            j: compile_joint(self.CENTER, self.OFFSETS[j],
+                             self.LIMITS[j] if self.enforce_limits else None,
+                             self.joint_range[j], self.PULSE_US, FREQUENCY_HZ, self.use_lut)
+            for j in self.JOINTS
+        }
+
+    def _transforms(self) -> Dict[str, JointTransform]:
+        xf = self._xf
+        if xf is None:
+            xf = self._xf = self.compile()
+        return xf
+
     # ========== I/O (JSON) ==========
     def _load_offsets_if_any(self):
         if os.path.exists(self.offsets_file):
@@ -140,8 +219,6 @@ class Arm:
     def set_joint_range(self, joint: str, degrees: int):
         """Змінити actuation_range конкретного суглоба (наприклад, base: 270/360)."""
         self.joint_range[joint] = int(degrees)
-        ch = self.JOINTS[joint]
-        self.kit.servo[ch].actuation_range = int(degrees)
 
     # ========== внутрішня математика ==========
     def _abs_target(self, joint: str, delta_from_center: float) -> float:
@@ -149,30 +226,64 @@ class Arm:
            - у LIMITS (із авто-сортуванням), якщо enforce_limits=True;
            - у 0..joint_range[joint], якщо enforce_limits=False.
         """
-        target = self.CENTER + self.OFFSETS[joint] + float(delta_from_center)
-        if self.enforce_limits:
-            lo, hi = self.LIMITS[joint]
-            if hi < lo: lo, hi = hi, lo
-            return clamp(target, lo, hi)
         # без софт-лімітів все одно тримаємося в апаратному 0..actuation_range суглоба
-        return clamp(target, 0, float(self.joint_range[joint]))
+        return self._transforms()[joint].angle(float(delta_from_center))
 
     def _current_rel(self, joint: str) -> float:
-        ch = self.JOINTS[joint]
-        cur = self.kit.servo[ch].angle
+        cur = self.state[joint].angle
         if cur is None:
             cur = self.CENTER + self.OFFSETS[joint]
         return cur - (self.CENTER + self.OFFSETS[joint])
 
+    def _stage(self, joint: str, delta_from_center: float):
+        """Покласти суглоб у поточний кадр (без запису на шину) і оновити тіньовий стан."""
+        t0 = time.perf_counter()
+        xf = self._transforms()[joint]
+        ang, duty = xf.angle(delta_from_center), xf.duty(delta_from_center)
+        st = self.state[joint]
+        st.angle, st.duty = ang, duty
+        self.frame.set_duty(st.channel, duty)
+        if recorder.active is not None: recorder.active.joint(joint, delta_from_center)
+        if telemetry.active is not None:
+            # після клампу — те, що реально пішло на серво (pose/center/MotionExecutor/replay теж тут)
+            telemetry.active.record(self._tel[joint], ang - xf.base, time.perf_counter() - t0)
+
+    # ========== читання стану (без шини) ==========
+    def angle(self, joint: str) -> Optional[float]:
+        """Останній командований абсолютний кут (None — ще не писали)."""
+        return self.state[joint].angle
+
+    def rel(self, joint: str) -> float:
+        """Останній командований кут відносно CENTER+OFFSETS."""
+        return self._current_rel(joint)
+
+    def resync_from_hw(self, *joints: str):
+        """Перечитати duty з PCA9685 у тіньовий стан (напр. після рестарту процесу)."""
+        for j in (joints or self.JOINTS):
+            st = self.state[j]
+            duty = self.frame.read_duty(st.channel)
+            if duty == 0:
+                st.angle, st.duty = None, None     # канал вимкнений — кута немає
+                continue
+            lo = servo_duty(0, self.joint_range[j], self.PULSE_US, self.frame.frequency)
+            hi = servo_duty(self.joint_range[j], self.joint_range[j], self.PULSE_US, self.frame.frequency)
+            st.duty = duty
+            st.angle = clamp((duty - lo) / float(hi - lo), 0.0, 1.0) * self.joint_range[j]
+
     # ========== публічне керування ==========
     def set_joint(self, joint: str, delta_from_center: float, wait: float = 0.0):
-        ch = self.JOINTS[joint]
-        self.kit.servo[ch].angle = self._abs_target(joint, delta_from_center)
-        if wait: time.sleep(wait)
+        self._stage(joint, delta_from_center)
+        self.frame.flush()
+        if wait: backend.sleep(wait)
 
     def center(self, wait_each: float = 0.0):
+        if wait_each:
+            for j in self.JOINTS:
+                self.set_joint(j, 0.0, wait_each)
+            return
         for j in self.JOINTS:
-            self.set_joint(j, 0.0, wait_each)
+            self._stage(j, 0.0)
+        self.frame.flush()
 
     def gripper_open(self):  self.set_joint("gripper", +30, 0.15)
     def gripper_close(self): self.set_joint("gripper", -30, 0.15)
@@ -185,17 +296,46 @@ class Arm:
         if mode == "easeio":  return 0.5 - 0.5 * math.cos(math.pi * x)
         return x
 
-    def pose(self, t: float = 0.0, steps: int = 20, easing: str = "easeio", **targets_rel):
-        """Одночасний рух кількох суглобів до відносних кутів (delta від центру)."""
+    def pose(self, t: float = 0.0, steps: int = 20, easing: str = "easeio",
+             profile: Optional[str] = None, **targets_rel):
+        """Одночасний рух кількох суглобів до відносних кутів (delta від центру).
+        Блокує на t секунд; неблокуючий і перериваний варіант — arm_motion.MotionExecutor.
+
+        profile="trapezoid"/"scurve": t/steps/easing ігноруються, тривалість — мінімальна,
+        яку дозволяють VMAX/AMAX найповільнішого суглоба; усі суглоби приходять разом."""
+        if profile:
+            return self._pose_profiled(profile, targets_rel)
         if t <= 0 or steps <= 1:
             for j, v in targets_rel.items():
-                self.set_joint(j, float(v))
+                self._stage(j, float(v))
+            self.frame.flush()
             return
-        start = { j: self._current_rel(j) for j in targets_rel.keys() }
+        joints = list(targets_rel)
+        start = [self._current_rel(j) for j in joints]
+        goal  = [float(targets_rel[j]) for j in joints]
+        path = self.planner.plan(start, goal, steps, easing)   # (steps, joints) одним махом
         dt = t / steps
-        for k in range(1, steps + 1):
-            a = self._easing(k / steps, easing)
-            for j, goal in targets_rel.items():
-                val = start[j] + (float(goal) - start[j]) * a
-                self.set_joint(j, val)
-            time.sleep(dt)
+        for row in path.tolist():
+            for j, val in zip(joints, row):
+                self._stage(j, val)
+            self.frame.flush()
+            backend.sleep(dt)
+
+    def _pose_profiled(self, shape: str, targets_rel: Dict[str, float]) -> float:
+        joints = list(targets_rel)
+        xf = self._transforms()
+        start = [self._current_rel(j) for j in joints]
+        # рахуємо шлях до ДОСЯЖНОЇ цілі (після клампу), а не до запитаної
+        goal  = [xf[j].angle(float(targets_rel[j])) - xf[j].base for j in joints]
+        dt = 1.0 / self.PROFILE_HZ
+        path = sync_profile(start, goal, [self.VMAX[j] for j in joints],
+                            [self.AMAX[j] for j in joints], dt, shape)
+        deadline = backend.monotonic()
+        for row in path.tolist():
+            for j, val in zip(joints, row):
+                self._stage(j, val)
+            self.frame.flush()
+            deadline += dt
+            delay = deadline - backend.monotonic()
+            if delay > 0: backend.sleep(delay)
+        return len(path) * dt
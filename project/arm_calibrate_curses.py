@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 # /home/mykodia/car/server/arm_calibrate_curses.py
+import startup; startup.begin("arm_calibrate_curses")
 import time, json, os, curses
 from arm import Arm, clamp
+startup.mark("import")
 
 JOINTS = ["gripper", "shoulder", "base", "wrist"]
 LIMITS_FILE  = "/home/mykodia/car/server/arm_limits.json"
@@ -35,7 +37,7 @@ def draw(stdscr, arm: Arm, sel, step, delta, limits):
     stdscr.addstr(row, 0, f"OFFSETS: {arm.OFFSETS}")
     row += 2
 
-    stdscr.addstr(row, 0, "Joint       Δ (deg)   AbsTarget   Limits [min,max]")
+    stdscr.addstr(row, 0, "Joint       Δ (deg)   AbsNow      Limits [min,max]")
     row += 1
     stdscr.addstr(row, 0, "-" * 64)
     row += 1
@@ -43,9 +45,10 @@ def draw(stdscr, arm: Arm, sel, step, delta, limits):
     for j in JOINTS:
         mark = "→" if j == JOINTS[sel] else " "
         rel  = delta[j]
-        abs_target = arm._abs_target(j, rel)  # CENTER + OFFSETS + rel, clamped to LIMITS
+        abs_now = arm.angle(j)  # останній командований кут (тіньовий стан, без читання I2C)
+        abs_txt = "   --  " if abs_now is None else f"{abs_now:>7.1f}"
         lo, hi = limits[j]
-        stdscr.addstr(row, 0, f"{mark} {j:<10} {rel:>7.1f}      {abs_target:>7.1f}     [{int(lo):>3},{int(hi):<3}]")
+        stdscr.addstr(row, 0, f"{mark} {j:<10} {rel:>7.1f}      {abs_txt}     [{int(lo):>3},{int(hi):<3}]")
         row += 1
 
     row += 1
@@ -113,12 +116,14 @@ def main(stdscr):
                 # set MIN / MAX at current absolute position
                 elif ch == ord(','):
                     j = JOINTS[sel]
-                    abs_now = arm._abs_target(j, delta[j])
-                    limits[j][0] = int(round(abs_now))
+                    abs_now = arm.angle(j)
+                    if abs_now is not None:
+                        limits[j][0] = int(round(abs_now))
                 elif ch == ord('.'):
                     j = JOINTS[sel]
-                    abs_now = arm._abs_target(j, delta[j])
-                    limits[j][1] = int(round(abs_now))
+                    abs_now = arm.angle(j)
+                    if abs_now is not None:
+                        limits[j][1] = int(round(abs_now))
 
                 # OFFSET adjust for selected joint
                 elif ch in (ord('o'), ord('O')):
@@ -173,3 +178,4 @@ def main(stdscr):
 
 if __name__ == "__main__":
     curses.wrapper(main)
+    startup.print_report()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
-import time, board, busio
-from adafruit_servokit import ServoKit
+import time
+from adafruit_motor import servo
+from pca_bus import get_bus, PRIO_ARM
 
 ADDR = 0x40
 MIN_US, MAX_US = 600, 2400  # центр ≈1500us
@@ -29,13 +30,11 @@ OFFSETS = {
     "wrist":    0,
 }
 
-i2c = busio.I2C(board.SCL, board.SDA)
-kit = ServoKit(channels=16, i2c=i2c, address=ADDR)
-
-for name, ch in JOINTS.items():
-    s = kit.servo[ch]
-    s.actuation_range = 180
-    s.set_pulse_width_range(MIN_US, MAX_US)
+bus = get_bus(ADDR)
+servos = {
+    name: servo.Servo(bus.channel(ch, PRIO_ARM), min_pulse=MIN_US, max_pulse=MAX_US, actuation_range=180)
+    for name, ch in JOINTS.items()
+}
 
 def clamp(x, lo, hi): return lo if x < lo else hi if x > hi else x
 
@@ -44,11 +43,10 @@ def set_joint(name: str, delta_from_center: float, wait: float = 0.0):
     delta_from_center: відносно CENTER (від’ємне — вниз/ліво, додатне — вгору/право).
     ФАКТИЧНИЙ кут = CENTER + OFFSETS[name] + delta_from_center, обмежений LIMITS[name].
     """
-    ch = JOINTS[name]
     lo, hi = LIMITS[name]
     target = CENTER + OFFSETS.get(name, 0) + delta_from_center
     target = clamp(target, lo, hi)
-    kit.servo[ch].angle = target
+    servos[name].angle = target
     if wait: time.sleep(wait)
 
 def center_all():
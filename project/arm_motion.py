@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/arm_motion.py
+"""
+Фоновий виконавець рухів руки (замість блокуючого Arm.pose).
+
+  motion = MotionExecutor(arm); motion.start()
+  fut = motion.move_to(0.8, base=+30, wrist=-10)   # не блокує
+  fut.result()                                      # True — доїхали, False — перебили
+
+- Тікає з фіксованою частотою по абсолютних дедлайнах (похибка sleep не накопичується,
+  положення рахується від часу старту руху, а не від кількості тіків).
+- Нова команда для суглоба одразу перехоплює його рух і стартує з поточного
+  КОМАНДОВАНОГО положення (без черги за старим рухом).
+- Кожен тік — один кадр FrameWriter (усі суглоби одним burst'ом).
+"""
+import asyncio, threading
+from concurrent.futures import Future
+from typing import Dict, Optional, Set
+
+import backend
+from arm import Arm
+
+
+class _Move:
+    __slots__ = ("t0", "dur", "easing", "start", "goal", "joints", "future")
+
+    def __init__(self, t0: float, dur: float, easing: str,
+                 start: Dict[str, float], goal: Dict[str, float]):
+        self.t0 = t0
+        self.dur = dur
+        self.easing = easing
+        self.start = start
+        self.goal = goal
+        self.joints: Set[str] = set(goal)
+        self.future: Future = Future()
+
+
+class MotionExecutor(threading.Thread):
+    def __init__(self, arm: Arm, rate_hz: float = 50.0):
+        super().__init__(name="arm-motion", daemon=True)
+        self.arm = arm
+        self.dt = 1.0 / float(rate_hz)
+        self._cv = threading.Condition()
+        self._owner: Dict[str, _Move] = {}     # суглоб -> рух, що ним зараз керує
+        self._running = True
+        self.ticks = 0
+        self.late_ticks = 0                    # тіки, що проспали дедлайн на цілий період
+
+    # ========== API ==========
+    def move_to(self, t: float = 0.0, easing: str = "easeio", **targets_rel) -> Future:
+        """Почати рух до відносних кутів за t секунд. Повертає Future[bool]."""
+        now = backend.monotonic()
+        with self._cv:
+            start = {j: self._commanded(j) for j in targets_rel}
+            goal = {j: float(v) for j, v in targets_rel.items()}
+            mv = _Move(now, max(0.0, float(t)), easing, start, goal)
+            for j in goal:
+                self._release(j)
+                self._owner[j] = mv
+            self._cv.notify()
+        return mv.future
+
+    async def move_to_async(self, t: float = 0.0, easing: str = "easeio", **targets_rel) -> bool:
+        return await asyncio.wrap_future(self.move_to(t, easing, **targets_rel))
+
+    def commanded(self, joint: str) -> float:
+        with self._cv:
+            return self._commanded(joint)
+
+    def stop(self):
+        """Зупинити всі рухи там, де вони зараз (поточне положення тримається)."""
+        with self._cv:
+            for j in list(self._owner):
+                self._release(j)
+
+    def shutdown(self, timeout: Optional[float] = 1.0):
+        self.stop()
+        with self._cv:
+            self._running = False
+            self._cv.notify()
+        if self.is_alive():
+            self.join(timeout)
+
+    # ========== внутрішнє ==========
+    def _commanded(self, joint: str) -> float:
+        # тіньовий стан руки — єдине джерело правди: бачить і pose/center/replay в обхід виконавця
+        return self.arm._current_rel(joint)
+
+    def _release(self, joint: str):
+        mv = self._owner.pop(joint, None)
+        if mv is None:
+            return
+        mv.joints.discard(joint)
+        if not mv.joints and not mv.future.done():
+            mv.future.set_result(False)        # повністю перехоплено іншою командою
+
+    def _tick(self, now: float):
+        done = []
+        for j, mv in list(self._owner.items()):
+            if mv.future.cancelled():
+                self._release(j)
+                continue
+            x = 1.0 if mv.dur <= 0 else min(1.0, (now - mv.t0) / mv.dur)
+            a = self.arm._easing(x, mv.easing)
+            val = mv.start[j] + (mv.goal[j] - mv.start[j]) * a
+            self.arm._stage(j, val)
+            if x >= 1.0:
+                del self._owner[j]
+                mv.joints.discard(j)
+                if not mv.joints:
+                    done.append(mv)
+        self.arm.frame.flush()
+        for mv in done:
+            if not mv.future.done():
+                mv.future.set_result(True)
+
+    def run(self):
+        deadline = backend.monotonic()
+        while True:
+            with self._cv:
+                while self._running and not self._owner:
+                    self._cv.wait()
+                    deadline = backend.monotonic()
+                if not self._running:
+                    return
+                self._tick(backend.monotonic())
+            self.ticks += 1
+            deadline += self.dt
+            delay = deadline - backend.monotonic()
+            if delay > 0:
+                backend.sleep(delay)
+            elif delay < -self.dt:
+                # відстали більше ніж на період — не доганяємо пачкою, а перезаякорюємось
+                self.late_ticks += 1
+                deadline = backend.monotonic()
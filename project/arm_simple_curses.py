@@ -2,8 +2,8 @@
 # /home/mykodia/car/server/arm_simple_curses.py
 import time
 import curses
-import board, busio
-from adafruit_servokit import ServoKit
+from adafruit_motor import servo
+from pca_bus import get_bus, PRIO_ARM
 
 # === НАЛАШТУВАННЯ ===
 I2C_ADDR = 0x40
@@ -73,20 +73,18 @@ def main(stdscr):
     stdscr.nodelay(True)
     stdscr.timeout(50)  # ms
 
-    # Servo init
-    i2c = busio.I2C(board.SCL, board.SDA)
-    kit = ServoKit(channels=CHANNELS, i2c=i2c, address=I2C_ADDR)
-
-    # Поставимо actuation_range на всі канали з карти JOINTS
-    for _, ch in JOINTS:
-        s = kit.servo[ch]
-        s.actuation_range = ACTUATION_RANGE
-        s.set_pulse_width_range(600, 2400)
+    # Servo init (спільна шина PCA9685; actuation_range на всі канали з карти JOINTS)
+    bus = get_bus(I2C_ADDR)
+    servos = {
+        ch: servo.Servo(bus.channel(ch, PRIO_ARM), min_pulse=600, max_pulse=2400,
+                        actuation_range=ACTUATION_RANGE)
+        for _, ch in JOINTS
+    }
 
     # Початкові кути: 90°
     angles = { ch: 90.0 for _, ch in JOINTS }
     for _, ch in JOINTS:
-        kit.servo[ch].angle = angles[ch]
+        servos[ch].angle = angles[ch]
         time.sleep(0.02)
 
     sel = 2   # базово керуємо "base"
@@ -104,11 +102,11 @@ def main(stdscr):
                 elif ch == curses.KEY_LEFT:
                     name, chan = JOINTS[sel]
                     angles[chan] = clamp(angles[chan] - step, 0, ACTUATION_RANGE)
-                    kit.servo[chan].angle = angles[chan]
+                    servos[chan].angle = angles[chan]
                 elif ch == curses.KEY_RIGHT:
                     name, chan = JOINTS[sel]
                     angles[chan] = clamp(angles[chan] + step, 0, ACTUATION_RANGE)
-                    kit.servo[chan].angle = angles[chan]
+                    servos[chan].angle = angles[chan]
                 elif ch == curses.KEY_UP or ch == ord(']'):
                     step = min(30.0, step + 1.0)
                 elif ch == curses.KEY_DOWN or ch == ord('['):
@@ -116,20 +114,20 @@ def main(stdscr):
                 elif ch in (ord('c'), ord('C')):
                     for _, chan in JOINTS:
                         angles[chan] = 90.0
-                        kit.servo[chan].angle = angles[chan]
+                        servos[chan].angle = angles[chan]
                         time.sleep(0.01)
                 elif ch == ord('0'):
                     name, chan = JOINTS[sel]
                     angles[chan] = 0.0
-                    kit.servo[chan].angle = angles[chan]
+                    servos[chan].angle = angles[chan]
                 elif ch == ord('9'):
                     name, chan = JOINTS[sel]
                     angles[chan] = 90.0
-                    kit.servo[chan].angle = angles[chan]
+                    servos[chan].angle = angles[chan]
                 elif ch in (ord('='), ord('+')):  # на багатьох клавіатурах '=' це '+'
                     name, chan = JOINTS[sel]
                     angles[chan] = float(ACTUATION_RANGE)
-                    kit.servo[chan].angle = angles[chan]
+                    servos[chan].angle = angles[chan]
 
             now = time.time()
             if now - last > 0.05:
@@ -142,7 +140,7 @@ def main(stdscr):
         # Повернемо все в центр на виході (можеш прибрати, якщо не треба)
         for _, chan in JOINTS:
             try:
-                kit.servo[chan].angle = 90.0
+                servos[chan].angle = 90.0
             except Exception:
                 pass
             time.sleep(0.01)
@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
-import sys, termios, tty, select, time
+import startup; startup.begin("arm_teleop_cli")
+import os, sys, termios, tty, select, time
 from arm import Arm
+from arm_motion import MotionExecutor
+import cmd_watchdog as wd
+import recorder
+startup.mark("import")
 
 JOINT_ORDER = ["gripper", "shoulder", "base", "wrist"]
+NUDGE_T  = 0.12   # с, плавний дотяг одного кроку
+CENTER_T = 0.8    # с, повернення в центр (можна перебити будь-якою клавішею)
+ARM_TIMEOUT = 0.3 # с, сторож: без тіку циклу довше — недоїханий рух зупиняється
 
 def get_key(timeout=0.05):
     dr, _, _ = select.select([sys.stdin], [], [], timeout)
@@ -17,8 +25,17 @@ def get_key(timeout=0.05):
     return ch1
 
 def main():
+    recorder.start_from_env()     # CAR_RECORD=файл — записати сесію для recorder.py play
     arm = Arm()
     arm.center()
+    motion = MotionExecutor(arm)
+    motion.start()
+    dataset = None
+    if os.environ.get("CAR_DATASET"):      # CAR_DATASET=каталог — кадри + тіньовий стан руки
+        import drive_dataset as dataset
+        dataset.start_from_env(arm=arm)
+    # цикл нижче крутиться кожні ~70 мс навіть без клавіш; завис — рух руки зупиняється
+    wd.watch("arm", ARM_TIMEOUT, motion.stop)
     sel = 2  # стартово керуватимемо "base"
     step = 5.0
 
@@ -29,6 +46,7 @@ def main():
         delta = { j:0.0 for j in JOINT_ORDER }  # відносний кут кожного
 
         while True:
+            wd.feed("arm")
             key = get_key(0.05)
             if key:
                 low = key.lower()
@@ -39,18 +57,18 @@ def main():
                 elif low == '4': sel = 3
                 elif low in ('c',):
                     for j in JOINT_ORDER: delta[j]=0.0
-                    arm.center()
+                    motion.move_to(CENTER_T, **delta)
                 elif low in ('[',): step = max(1.0, step-1.0); print(f"\nstep={step}")
                 elif low in (']',): step = min(20.0, step+1.0); print(f"\nstep={step}")
                 elif low in ('s',): arm.save_offsets(); print("\nOffsets saved.")
                 elif low in ('a','esc[D'):  # вліво/менше
                     j = JOINT_ORDER[sel]
                     delta[j] -= step
-                    arm.set_joint(j, delta[j])
+                    motion.move_to(NUDGE_T, **{j: delta[j]})
                 elif low in ('d','esc[C'):  # вправо/більше
                     j = JOINT_ORDER[sel]
                     delta[j] += step
-                    arm.set_joint(j, delta[j])
+                    motion.move_to(NUDGE_T, **{j: delta[j]})
 
             # невеликий рендер статусу
             sys.stdout.write(f"\rSelected: {JOINT_ORDER[sel]:>8} | step={step:>4.0f} | " +
@@ -60,7 +78,13 @@ def main():
 
     finally:
         termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, old)
+        motion.shutdown()
         arm.center()
+        recorder.stop()
+        if dataset is not None:
+            dataset.stop()
+        print()
+        startup.print_report(sys.stdout)
 
 if __name__ == "__main__":
     main()
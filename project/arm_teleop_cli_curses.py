@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 # /home/mykodia/car/server/arm_teleop_cli_curses.py
+import startup; startup.begin("arm_teleop_cli_curses")
 import time
 import curses
 from arm import Arm
+startup.mark("import")
 
 JOINTS = ["gripper", "shoulder", "base", "wrist"]
 
@@ -37,16 +39,17 @@ def draw_ui(stdscr, sel_idx, step, delta_map, arm):
     row += 2
 
     # Per-joint table
-    stdscr.addstr(row, 0, "Joint      Delta(°)   AbsTarget(°)   Limits")
+    stdscr.addstr(row, 0, "Joint      Delta(°)   AbsNow(°)      Limits")
     row += 1
     stdscr.addstr(row, 0, "-" * 60)
     row += 1
     for j in JOINTS:
         rel = delta_map[j]
-        abs_target = arm._abs_target(j, rel)  # uses CENTER+OFFSETS and clamps to LIMITS
+        abs_now = arm.angle(j)  # last commanded angle from the shadow state (no I2C read)
+        abs_txt = "   --  " if abs_now is None else f"{abs_now:>7.1f}"
         lo, hi = arm.LIMITS[j]
         mark = "←" if j == JOINTS[sel_idx] else " "
-        stdscr.addstr(row, 0, f"{mark} {j:<9} {rel:>8.1f}      {abs_target:>7.1f}     [{lo:>3},{hi:<3}]")
+        stdscr.addstr(row, 0, f"{mark} {j:<9} {rel:>8.1f}      {abs_txt}     [{lo:>3},{hi:<3}]")
         row += 1
 
     # Footer
@@ -140,3 +143,4 @@ def main(stdscr):
 
 if __name__ == "__main__":
     curses.wrapper(main)
+    startup.print_report()
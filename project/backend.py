@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/backend.py
+"""
+Вибір заліза: справжні бібліотеки (RPi.GPIO, busio/PCA9685, rpi_ws281x, picamera2)
+або симулятори, що працюють на звичайному Linux.
+
+  CAR_BACKEND=sim python3 teleop_cli.py      # або backend.configure("sim") до першого використання
+  CAR_CLOCK=real|virtual                     # для sim за замовчуванням virtual
+
+Симулятори пишуть кожен запис у backend.LOG як (час, пристрій, операція, дані).
+Віртуальний годинник: backend.sleep(dt) не спить, а просуває спільний час, тож
+ramp_to / pose / breathProcessing проганяються швидше за реальний час, а часові
+мітки в LOG лишаються «справжніми» (як було б на залізі). Годинник один на процес:
+sleep будь-якого потоку просуває його для всіх — для бенчів/прогонів цього досить.
+"""
+import os, time, threading
+from typing import Any, List, Optional, Tuple
+
+from pca_frame import FakeI2C, LED0_ON_L, regs_to_duty
+
+BACKEND = os.environ.get("CAR_BACKEND", "hw")          # "hw" | "sim"
+
+
+# ========== годинники ==========
+class RealClock:
+    monotonic = staticmethod(time.monotonic)
+    sleep = staticmethod(time.sleep)
+
+
+class VirtualClock:
+    def __init__(self, start: float = 0.0):
+        self._now = float(start)
+        self._lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        return self._now
+
+    def sleep(self, dt: float):
+        if dt > 0:
+            with self._lock:
+                self._now += dt
+        else:
+            time.sleep(0)          # віддати GIL, як і справжній sleep(0)
+
+    def advance(self, dt: float):
+        self.sleep(dt)
+
+
+clock: Any = RealClock()
+
+
+def monotonic() -> float:
+    return clock.monotonic()
+
+
+def sleep(dt: float):
+    clock.sleep(dt)
+
+
+def configure(backend: Optional[str] = None, clock_kind: Optional[str] = None):
+    """Обрати бекенд/годинник. Викликати до першого звернення до заліза."""
+    global BACKEND, clock
+    if backend:
+        BACKEND = backend
+    kind = clock_kind or os.environ.get("CAR_CLOCK") or ("virtual" if BACKEND == "sim" else "real")
+    clock = VirtualClock() if kind == "virtual" else RealClock()
+
+
+def is_sim() -> bool:
+    return BACKEND == "sim"
+
+
+# ========== журнал симуляторів ==========
+class SimLog:
+    def __init__(self):
+        self.records: List[Tuple[float, str, str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, device: str, op: str, data: Any = None):
+        with self._lock:
+            self.records.append((clock.monotonic(), device, op, data))
+
+    def select(self, device: Optional[str] = None, op: Optional[str] = None):
+        return [r for r in self.records
+                if (device is None or r[1] == device) and (op is None or r[2] == op)]
+
+    def clear(self):
+        with self._lock:
+            self.records.clear()
+
+
+LOG = SimLog()
+
+
+# ========== GPIO ==========
+class SimGPIO:
+    """Підмножина API RPi.GPIO, якою користуються move.py / robotLight.py / switch.py."""
+    BCM, BOARD = 11, 10
+    OUT, IN = 0, 1
+    LOW, HIGH = 0, 1
+
+    def __init__(self):
+        self._mode = None
+        self.pins = {}
+
+    def setwarnings(self, flag): pass
+
+    def setmode(self, mode): self._mode = mode
+
+    def getmode(self): return self._mode
+
+    def setup(self, pins, direction, initial=None, pull_up_down=None):
+        for p in (pins if isinstance(pins, (list, tuple)) else (pins,)):
+            self.pins[p] = self.LOW if initial is None else initial
+
+    def output(self, pins, values):
+        if isinstance(pins, (list, tuple)):
+            vals = values if isinstance(values, (list, tuple)) else [values] * len(pins)
+            for p, v in zip(pins, vals):
+                self.pins[p] = int(v)
+            LOG.add("gpio", "output", tuple(zip(pins, vals)))
+        else:
+            self.pins[pins] = int(values)
+            LOG.add("gpio", "output", ((pins, values),))
+
+    def input(self, pin): return self.pins.get(pin, self.LOW)
+
+    def cleanup(self, *a):
+        self._mode = None
+
+    class PWM:
+        def __init__(self, pin, freq):
+            self.pin, self.freq, self.duty = pin, freq, 0.0
+
+        def start(self, duty):
+            self.duty = duty
+            LOG.add("pwm", "start", (self.pin, duty))
+
+        def ChangeDutyCycle(self, duty):
+            self.duty = duty
+            LOG.add("pwm", "duty", (self.pin, duty))
+
+        def ChangeFrequency(self, freq):
+            self.freq = freq
+
+        def stop(self):
+            LOG.add("pwm", "stop", (self.pin,))
+
+
+# ========== PCA9685 ==========
+class SimPCA9685(FakeI2C):
+    """FakeI2C, що ще й пише в LOG, які канали отримали який duty."""
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        super().writeto(address, buffer, start=start, end=end)
+        buf = bytes(buffer[start:end])
+        reg = buf[0] if buf else 0
+        if reg >= LED0_ON_L and len(buf) >= 5:
+            first = (reg - LED0_ON_L) // 4
+            chans = []
+            for i in range((len(buf) - 1) // 4):
+                r = LED0_ON_L + 4 * (first + i)
+                on = self.regs[r] | (self.regs[r + 1] << 8)
+                off = self.regs[r + 2] | (self.regs[r + 3] << 8)
+                chans.append((first + i, regs_to_duty(on, off)))
+            LOG.add("pca9685", "write", tuple(chans))
+        else:
+            LOG.add("pca9685", "reg", (reg, buf[1:]))
+
+
+# ========== NeoPixel ==========
+class SimNeoPixel:
+    def __init__(self, num, pin, freq_hz=800000, dma=10, invert=False, brightness=255, channel=0):
+        self._px = [0] * num
+
+    def begin(self): pass
+
+    def numPixels(self): return len(self._px)
+
+    def setPixelColor(self, n, color): self._px[n] = color
+
+    def getPixelColor(self, n): return self._px[n]
+
+    def show(self):
+        LOG.add("ws281x", "show", tuple(self._px))
+
+
+# ========== камера ==========
+class SimTransform:
+    def __init__(self, hflip=0, vflip=0):
+        self.hflip, self.vflip = hflip, vflip
+
+
+class SimCamera:
+    """Те, що треба від Picamera2: конфіг, start/stop, capture_array/capture_file (синтетичний кадр)."""
+
+    def __init__(self, *a, **kw):
+        self.size = (640, 480)
+        self.started = False
+        self.frame_no = 0
+
+    def _cfg(self, main=None, lores=None, transform=None, **kw):
+        return {"main": dict(main or {"size": (640, 480)}), "lores": lores, "transform": transform}
+
+    create_still_configuration = _cfg
+    create_preview_configuration = _cfg
+    create_video_configuration = _cfg
+
+    def configure(self, cfg):
+        self.size = tuple(cfg["main"].get("size", self.size))
+
+    def start(self):
+        self.started = True
+        LOG.add("camera", "start", self.size)
+
+    def stop(self):
+        self.started = False
+        LOG.add("camera", "stop")
+
+    def close(self): self.stop()
+
+    def capture_array(self, name="main"):
+        import numpy as np
+        w, h = self.size
+        self.frame_no += 1
+        img = np.empty((h, w, 3), dtype=np.uint8)
+        img[...] = (self.frame_no * 7) & 0xFF          # кадри відрізняються між собою
+        LOG.add("camera", "capture", self.frame_no)
+        return img
+
+    def capture_metadata(self):
+        return {"SensorTimestamp": int(clock.monotonic() * 1e9), "ExposureTime": 10000,
+                "FrameNo": self.frame_no}
+
+    def capture_file(self, path, name="main", format=None):
+        self.capture_array(name)
+        with open(path, "wb") as f:
+            f.write(b"\xff\xd8SIM\xff\xd9")           # заглушка JPEG
+        return {}
+
+
+# ========== фабрики ==========
+_gpio = None
+
+
+def gpio():
+    """Модуль RPi.GPIO або спільний SimGPIO."""
+    global _gpio
+    if _gpio is None:
+        if is_sim():
+            _gpio = SimGPIO()
+        else:
+            import RPi.GPIO as GPIO
+            _gpio = GPIO
+    return _gpio
+
+
+def i2c():
+    if is_sim():
+        return SimPCA9685()
+    import board, busio
+    return busio.I2C(board.SCL, board.SDA)
+
+
+def neopixel(*args, **kwargs):
+    if is_sim():
+        return SimNeoPixel(*args, **kwargs)
+    from rpi_ws281x import Adafruit_NeoPixel
+    return Adafruit_NeoPixel(*args, **kwargs)
+
+
+def camera(*args, **kwargs):
+    if is_sim():
+        return SimCamera(*args, **kwargs)
+    from picamera2 import Picamera2
+    return Picamera2(*args, **kwargs)
+
+
+class SimJpeg:
+    """Заглушка JPEG-кодера: маркери SOI/EOI + розмір і контрольна сума кадру (без справжнього стиснення)."""
+
+    def __call__(self, img, quality=85):
+        h, w = img.shape[:2]
+        body = b"SIM %dx%d q%d %08x" % (w, h, quality, int(img[::16, ::16].sum()) & 0xFFFFFFFF)
+        return b"\xff\xd8" + body + b"\xff\xd9"
+
+
+def jpeg_encoder():
+    """
+    fn(img HxWx3 uint8 у порядку BGR — так віддає Picamera2 "RGB888", quality) -> bytes JPEG.
+    simplejpeg (ставиться разом з picamera2) -> cv2 -> PIL; у sim без них — SimJpeg.
+    """
+    try:
+        import simplejpeg
+        return lambda img, quality=85: simplejpeg.encode_jpeg(img, quality=quality, colorspace="BGR")
+    except ImportError:
+        pass
+    try:
+        import cv2
+        return lambda img, quality=85: cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+    except ImportError:
+        pass
+    try:
+        import io
+        from PIL import Image
+
+        def enc(img, quality=85):
+            buf = io.BytesIO()
+            Image.fromarray(img[..., ::-1]).save(buf, "JPEG", quality=quality)
+            return buf.getvalue()
+        return enc
+    except ImportError:
+        if is_sim():
+            return SimJpeg()
+        raise
+
+
+def transform(hflip=0, vflip=0):
+    if is_sim():
+        return SimTransform(hflip, vflip)
+    from libcamera import Transform
+    return Transform(hflip=hflip, vflip=vflip)
+
+
+configure()
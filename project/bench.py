@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/bench.py
+"""
+Бенчі гарячих шляхів на симуляторах (backend=sim), без заліза:
+
+  python3 bench.py                    # прогнати і порівняти з bench_baseline.json (якщо є)
+  python3 bench.py --save-baseline    # записати поточні числа як базу
+  python3 bench.py --only pose,drive  # лише вибрані
+
+Що міряємо:
+  drive    — teleop_cli.apply_drive: «натиснув» -> перший запис slew-лімітера в мотори (p50/p99)
+  move     — move.move: час команди і швидкість потоку команд
+  pose     — Arm.pose: I2C-транзакцій і байтів на позу, записів/с (у віртуальному часі)
+  light    — RobotLight.setColor: час кадру
+  executor — MotionExecutor: джиттер тіку відносно 50 Гц (на реальному годиннику)
+  arm      — arm_teleop_cli: «натиснув» -> MotionExecutor -> flush кадру PCA (p50/p99, реальний годинник)
+
+Метрики-лічильники (транзакції, байти) детерміновані й порівнюються з точністю до сотих,
+часові — з допуском --tolerance (за замовчуванням 25%).
+"""
+import os, sys, json, time, argparse
+from typing import Callable, Dict, List, Tuple
+
+import backend
+backend.configure("sim")
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+# ім'я метрики -> (значення, "time"|"count"|"rate"); rate — більше = краще
+Metrics = Dict[str, Tuple[float, str]]
+
+
+def pct(samples: List[float], p: float) -> float:
+    s = sorted(samples)
+    if not s:
+        return 0.0
+    k = min(len(s) - 1, max(0, int(round(p / 100.0 * (len(s) - 1)))))
+    return s[k]
+
+
+def timed(fn: Callable[[int], None], n: int) -> List[float]:
+    out = []
+    pc = time.perf_counter
+    for i in range(n):
+        t = pc()
+        fn(i)
+        out.append(pc() - t)
+    return out
+
+
+def _lat(prefix: str, samples: List[float]) -> Metrics:
+    total = sum(samples) or 1e-12
+    return {
+        f"{prefix}.p50_us": (pct(samples, 50) * 1e6, "time"),
+        f"{prefix}.p99_us": (pct(samples, 99) * 1e6, "time"),
+        f"{prefix}.per_s":  (len(samples) / total, "rate"),
+    }
+
+
+# ========== бенчі ==========
+def bench_drive(n: int) -> Metrics:
+    import teleop_cli, slew
+    # сусідні уставки різні — кожна дає запис у мотори; цикл 40 -> 10 теж зміна
+    speeds = [10, 20, 30, 20, -10, -30, 0, 40]
+    turns = [0, 5, 10, 15, 10, 0, -10, -20]
+    lim = slew.get_limiter()
+    teleop_cli.apply_drive(0, 0)     # підняти залізо до заміру
+    lim.wait(1.0)
+    lat = []
+    pc = time.perf_counter
+    try:
+        for i in range(n):
+            t = pc()
+            teleop_cli.apply_drive(speeds[i % len(speeds)], turns[i % len(turns)])
+            # apply_drive лише передає уставку — чекаємо першого запису лімітера в мотори
+            give_up = t + 1.0
+            while lim.last_write < t and pc() < give_up:
+                time.sleep(0)
+            lat.append(lim.last_write - t)
+            lim.wait(1.0)            # рампа добігла — наступний замір з тихого лімітера
+    finally:
+        slew.close_limiter()         # далі ніхто не пише в мотори у фоні
+    return _lat("drive.key_to_actuation", lat)
+
+
+def bench_move(n: int) -> Metrics:
+    import move
+    move.setup()
+    dirs = ["forward", "backward", "no"]
+    turns = ["no", "left", "right"]
+    backend.LOG.clear()
+    lat = timed(lambda i: move.move(40 + i % 30, dirs[i % 3], turns[(i // 3) % 3]), n)
+    m = _lat("move.command", lat)
+    m["move.gpio_writes_per_cmd"] = (len(backend.LOG.select("gpio")) / float(n), "count")
+    m["move.pwm_writes_per_cmd"] = (len(backend.LOG.select("pwm")) / float(n), "count")
+    return m
+
+
+def bench_pose(n: int) -> Metrics:
+    from arm import Arm
+    arm = Arm(offsets_file="/nonexistent", limits_file="/nonexistent")
+    arm.center()
+    i2c = arm.bus.i2c
+    i2c.reset_counters()
+    t_virt = backend.monotonic()
+    cpu = []
+    for k in range(n):
+        sign = 1 if k % 2 == 0 else -1
+        t = time.perf_counter()
+        arm.pose(1.0, 20, "easeio", gripper=20 * sign, shoulder=15 * sign, base=40 * sign, wrist=-10 * sign)
+        cpu.append(time.perf_counter() - t)
+    dur = backend.monotonic() - t_virt
+    return {
+        "pose.i2c_transactions": (i2c.transactions / float(n), "count"),
+        "pose.i2c_bytes": (i2c.bytes_written / float(n), "count"),
+        "pose.writes_per_s": (i2c.transactions / dur if dur else 0.0, "count"),
+        "pose.cpu_p50_us": (pct(cpu, 50) * 1e6, "time"),
+    }
+
+
+def bench_light(n: int) -> Metrics:
+    from robotLight import RobotLight
+    rl = RobotLight()
+    lat = timed(lambda i: rl.setColor(i % 256, 255 - i % 256, 64), n)
+    return _lat("light.setColor", lat)
+
+
+def bench_executor(n: int) -> Metrics:
+    from arm import Arm
+    from arm_motion import MotionExecutor
+    arm = Arm(offsets_file="/nonexistent", limits_file="/nonexistent")
+    saved = backend.clock
+    backend.clock = backend.RealClock()          # джиттер має сенс лише в реальному часі
+    try:
+        ticks: List[float] = []
+        frame = arm.frame
+        flush = frame.flush
+        def rec_flush(*a, **kw):
+            ticks.append(time.monotonic())
+            return flush(*a, **kw)
+        frame.flush = rec_flush
+        ex = MotionExecutor(arm, rate_hz=50.0)
+        ex.start()
+        ex.move_to(n / 50.0, base=30).result(n / 50.0 + 2.0)
+        ex.shutdown()
+    finally:
+        backend.clock = saved
+    period = 1.0 / 50.0
+    jit = [abs((b - a) - period) for a, b in zip(ticks, ticks[1:])]
+    return {
+        "executor.jitter_p50_us": (pct(jit, 50) * 1e6, "time"),
+        "executor.jitter_p99_us": (pct(jit, 99) * 1e6, "time"),
+        "executor.late_ticks": (float(ex.late_ticks), "count"),
+    }
+
+
+def bench_arm_drive(n: int) -> Metrics:
+    """arm_teleop_cli: клавіша -> MotionExecutor.move_to -> перший flush кадру PCA."""
+    from arm import Arm
+    from arm_motion import MotionExecutor
+    arm = Arm(offsets_file="/nonexistent", limits_file="/nonexistent")
+    arm.center()
+    saved = backend.clock
+    backend.clock = backend.RealClock()          # виконавець тікає в реальному часі
+    pc = time.perf_counter
+    flushes: List[float] = []
+    frame = arm.frame
+    flush = frame.flush
+    def rec_flush(*a, **kw):
+        r = flush(*a, **kw)
+        flushes.append(pc())
+        return r
+    frame.flush = rec_flush
+    lat = []
+    ex = MotionExecutor(arm, rate_hz=50.0)
+    ex.start()
+    try:
+        for i in range(n):
+            del flushes[:]
+            t = pc()
+            fut = ex.move_to(0.12, base=(5.0 if i % 2 else -5.0))     # як NUDGE_T у arm_teleop_cli
+            give_up = t + 1.0
+            while not flushes and pc() < give_up:
+                time.sleep(0)
+            lat.append((flushes[0] if flushes else give_up) - t)
+            fut.result(1.0)
+            time.sleep(0.05)                     # наступна «клавіша» — з тихого виконавця, як у людини
+    finally:
+        ex.shutdown()
+        backend.clock = saved
+    return _lat("arm.key_to_actuation", lat)
+
+
+BENCHES: Dict[str, Tuple[Callable[[int], Metrics], int]] = {
+    "drive":    (bench_drive, 2000),
+    "move":     (bench_move, 2000),
+    "pose":     (bench_pose, 20),
+    "light":    (bench_light, 500),
+    "executor": (bench_executor, 50),
+    "arm":      (bench_arm_drive, 25),
+}
+
+
+# ========== порівняння з базою ==========
+def compare(cur: Metrics, base: Dict[str, float], tol: float) -> List[str]:
+    bad = []
+    for name, (val, kind) in cur.items():
+        if name not in base:
+            continue
+        ref = base[name]
+        if kind == "count":
+            worse = round(val, 2) > round(ref, 2)    # як у звіті: середні на команду не шумлять сотими
+        elif kind == "rate":
+            worse = val < ref * (1.0 - tol)
+        else:
+            worse = val > ref * (1.0 + tol)
+        if worse:
+            bad.append(f"{name}: {val:.2f} vs baseline {ref:.2f}")
+    return bad
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", default="", help="кома-список: " + ",".join(BENCHES))
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--baseline", default=BASELINE_FILE)
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    ap.add_argument("--scale", type=float, default=1.0, help="множник кількості ітерацій")
+    args = ap.parse_args(argv)
+
+    names = [n for n in args.only.split(",") if n] or list(BENCHES)
+    metrics: Metrics = {}
+    for name in names:
+        fn, n = BENCHES[name]
+        metrics.update(fn(max(1, int(n * args.scale))))
+
+    width = max(len(k) for k in metrics)
+    for k, (v, kind) in metrics.items():
+        print(f"{k:<{width}}  {v:>12.2f}  {kind}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({k: v for k, (v, _) in metrics.items()}, f, indent=2, sort_keys=True)
+        print("baseline saved:", args.baseline)
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            bad = compare(metrics, json.load(f), args.tolerance)
+        if bad:
+            print("\nREGRESSIONS:")
+            for line in bad:
+                print("  " + line)
+            return 1
+        print("\nno regressions vs", args.baseline)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/camera_burst.py
+"""
+Серійна зйомка і таймлапс: кадри забираються з частотою сенсора в обмежену чергу,
+а JPEG-кодування і запис на SD — у пулі воркерів, тож темп зйомки не впирається
+ні в кодер, ні в картку.
+
+  python3 camera_burst.py burst 3.0                 # 3 с кожного кадру
+  python3 camera_burst.py timelapse 600 --every 2   # 10 хв, кадр раз на 2 с
+  CAR_BACKEND=sim CAR_CLOCK=real python3 camera_burst.py burst 2 --out /tmp/burst
+
+Імена — photo_YYYYmmdd_HHMMSS_мкс_№кадру.jpg: не збігаються навіть у межах однієї секунди.
+Коли пул не встигає (черга повна): policy="drop" — кадр відкидається і рахується,
+"block" — зйомка чекає місця (рахується час очікування). Метрики: глибина черги
+(поточна/максимум), відкинуті кадри, час очікування в черзі, кодування і запису.
+"""
+import os, time, queue, threading
+from datetime import datetime
+from typing import List, Optional
+
+from camera_service import CameraService
+
+IMAGES_DIR = "/repo/adeept-car/images"
+QUEUE_SIZE = 32                 # сирих кадрів 1280x720x3 ≈ 2.7 МБ кожен -> до ~90 МБ
+WORKERS = 3                     # simplejpeg/запис відпускають GIL — потоків досить
+QUALITY = 90
+
+
+def photo_name(ts: Optional[float] = None, frame_no: Optional[int] = None, prefix: str = "photo") -> str:
+    dt = datetime.fromtimestamp(time.time() if ts is None else ts)
+    name = f"{prefix}_{dt.strftime('%Y%m%d_%H%M%S_%f')}"
+    return f"{name}_{frame_no:06d}.jpg" if frame_no is not None else name + ".jpg"
+
+
+def _pct(s: List[float], p: float) -> float:
+    if not s:
+        return 0.0
+    s = sorted(s)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+class BurstWriter:
+    def __init__(self, camera: CameraService, out_dir: str = IMAGES_DIR, workers: int = WORKERS,
+                 queue_size: int = QUEUE_SIZE, policy: str = "drop", quality: int = QUALITY):
+        if policy not in ("drop", "block"):
+            raise ValueError("policy must be 'drop' or 'block'")
+        self.camera = camera
+        self.out_dir = out_dir
+        self.policy = policy
+        self.quality = quality
+        self._q: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, name=f"burst-w{i}", daemon=True)
+                         for i in range(workers)]
+        self.files: List[str] = []
+        self.captured = self.dropped = self.written = self.errors = 0
+        self.max_depth = 0
+        self.blocked_s = 0.0
+        self.wait_s: List[float] = []          # у черзі: від кадру до початку кодування
+        self.encode_s: List[float] = []
+        self.write_s: List[float] = []
+        os.makedirs(out_dir, exist_ok=True)
+        for w in self._workers:
+            w.start()
+
+    # ========== зйомка ==========
+    def _put(self, frame):
+        self.captured += 1
+        item = (frame, time.monotonic(), time.time())
+        if self.policy == "drop":
+            try:
+                self._q.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return
+        else:
+            t = time.monotonic()
+            self._q.put(item)
+            self.blocked_s += time.monotonic() - t
+        d = self._q.qsize()
+        if d > self.max_depth:
+            self.max_depth = d
+
+    def burst(self, seconds: float) -> int:
+        """Кожен кадр сенсора протягом seconds. Повертає кількість знятих кадрів."""
+        t_end = time.monotonic() + seconds
+        last = None
+        n = 0
+        while time.monotonic() < t_end:
+            frame = self.camera.next_frame(last)
+            last = frame[0]
+            self._put(frame)
+            n += 1
+        return n
+
+    def timelapse(self, seconds: float, every: float) -> int:
+        """Кадр раз на every секунд (абсолютні дедлайни — інтервал не «пливе»)."""
+        t0 = time.monotonic()
+        n = 0
+        deadline = t0
+        while deadline < t0 + seconds:
+            self._put(self.camera.next_frame())
+            n += 1
+            deadline += every
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return n
+
+    # ========== пул ==========
+    def _work(self):
+        while True:
+            item = self._q.get()
+            if item is None:
+                self._q.task_done()
+                return
+            (no, ts, img), t_put, wall = item
+            try:
+                t0 = time.monotonic()
+                data = self.camera.encode(img, self.quality)
+                t1 = time.monotonic()
+                path = os.path.join(self.out_dir, photo_name(wall, no))
+                with open(path, "wb") as f:
+                    f.write(data)
+                t2 = time.monotonic()
+                with self._lock:
+                    self.wait_s.append(t0 - t_put)
+                    self.encode_s.append(t1 - t0)
+                    self.write_s.append(t2 - t1)
+                    self.files.append(path)
+                    self.written += 1
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+            finally:
+                self._q.task_done()
+
+    def close(self):
+        """Дописати все з черги і зупинити воркери."""
+        self._q.join()
+        for _ in self._workers:
+            self._q.put(None)
+        for w in self._workers:
+            w.join()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "captured": self.captured, "written": self.written, "dropped": self.dropped,
+                "errors": self.errors, "queue_depth": self._q.qsize(), "queue_max": self.max_depth,
+                "queue_size": self._q.maxsize, "blocked_s": self.blocked_s,
+                "wait_p50_ms": _pct(self.wait_s, 50) * 1e3, "wait_p99_ms": _pct(self.wait_s, 99) * 1e3,
+                "encode_p50_ms": _pct(self.encode_s, 50) * 1e3, "write_p50_ms": _pct(self.write_s, 50) * 1e3,
+            }
+
+
+if __name__ == "__main__":
+    import argparse, startup
+    startup.begin("camera_burst")
+    startup.mark("import")
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("mode", choices=("burst", "timelapse"))
+    ap.add_argument("seconds", type=float)
+    ap.add_argument("--every", type=float, default=1.0, help="інтервал таймлапсу, с")
+    ap.add_argument("--out", default=IMAGES_DIR)
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--queue", type=int, default=QUEUE_SIZE)
+    ap.add_argument("--policy", choices=("drop", "block"), default="drop")
+    args = ap.parse_args()
+
+    cam = CameraService()
+    cam.start()
+    cam.wait_ready()
+    startup.mark("warm")
+    bw = BurstWriter(cam, args.out, args.workers, args.queue, args.policy)
+    t = time.monotonic()
+    n = bw.burst(args.seconds) if args.mode == "burst" else bw.timelapse(args.seconds, args.every)
+    el = time.monotonic() - t
+    bw.close()
+    cam.shutdown()
+    st = bw.stats()
+    print(f"{n} frames in {el:.2f}s ({n / el:.1f} fps) -> {args.out}")
+    print(" ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in st.items()))
+    startup.print_report()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/camera_service.py
+"""
+Постійно «теплий» сервіс камери замість разового capture_picamera2.py.
+
+Сенсор стрімить безперервно (AE/AWB вже зійшлися), знімок — це наступний кадр живого
+потоку: від «затвора» до результату ~1 кадр (33 мс при 30 fps) + кодування JPEG,
+а не >1 с на Picamera2() / configure / start / sleep(0.8) / stop.
+
+  python3 camera_service.py                   # демон: тримає камеру, слухає SOCKET_PATH
+  python3 camera_service.py snap [шлях]       # клієнт: знімок у файл через запущений демон
+  CAR_BACKEND=sim CAR_CLOCK=real python3 camera_service.py --selftest
+
+У своєму процесі:
+  cam = CameraService(); cam.start(); cam.wait_ready()
+  img = cam.capture_array()      # numpy HxWx3 (BGR, як Picamera2 "RGB888")
+  jpg = cam.capture_jpeg()       # bytes
+  cam.capture_file(path)
+
+Синтетичне джерело — backend.SimCamera (CAR_BACKEND=sim) або будь-який об'єкт
+з capture_array() у source=.
+"""
+import os, time, socket, threading, socketserver
+from typing import Optional, Tuple
+
+import backend
+import startup
+
+SIZE = (1280, 720)
+FPS = 30
+WARMUP_S = 0.8                   # AE/AWB — один раз при старті сервісу, а не на кожен знімок
+JPEG_QUALITY = 90
+SOCKET_PATH = "/tmp/car-camera.sock"
+
+Frame = Tuple[int, float, object]      # (№ кадру, time.monotonic() отримання, масив)
+
+
+class CameraService(threading.Thread):
+    def __init__(self, size=SIZE, fps: float = FPS, hflip: int = 1, vflip: int = 1,
+                 source=None, warmup: float = WARMUP_S, quality: int = JPEG_QUALITY):
+        super().__init__(name="camera", daemon=True)
+        self.size = tuple(size)
+        self.fps = float(fps)
+        self.hflip, self.vflip = hflip, vflip
+        self.cam = source
+        self.warmup = warmup
+        self.quality = quality
+        self._encode = None
+        self._cv = threading.Condition()
+        self._frame: Optional[Frame] = None
+        self._meta: Tuple[int, dict] = (0, {})
+        self._ready = threading.Event()
+        self._running = True
+        self.frames = 0
+        self.errors = 0
+
+    # ========== життєвий цикл ==========
+    def _open(self):
+        if self.cam is not None:
+            return
+        with startup.hw("picamera2"):
+            cam = backend.camera()
+            cfg = cam.create_video_configuration(
+                main={"size": self.size, "format": "RGB888"},
+                controls={"FrameRate": self.fps},
+                transform=backend.transform(hflip=self.hflip, vflip=self.vflip),
+            )
+            cam.configure(cfg)
+            cam.start()
+        self.cam = cam
+
+    def _grab(self):
+        cam = self.cam
+        if hasattr(cam, "capture_request"):
+            # Picamera2: масив і метадані одного й того самого кадру (а не двох сусідніх)
+            req = cam.capture_request()
+            try:
+                return req.make_array("main"), req.get_metadata()
+            finally:
+                req.release()
+        img = cam.capture_array("main")
+        return img, (cam.capture_metadata() if hasattr(cam, "capture_metadata") else {})
+
+    def run(self):
+        self._open()
+        t_ready = time.monotonic() + self.warmup
+        # справжній сенсор сам задає темп (capture_array блокує до кадру); синтетика — ні
+        pace = 1.0 / self.fps if backend.is_sim() or not hasattr(self.cam, "capture_request") else 0.0
+        deadline = time.monotonic()
+        while self._running:
+            try:
+                img, md = self._grab()
+            except Exception:
+                self.errors += 1
+                time.sleep(0.05)
+                continue
+            now = time.monotonic()
+            with self._cv:
+                self.frames += 1
+                self._frame = (self.frames, now, img)
+                self._meta = (self.frames, md)
+                self._cv.notify_all()
+            if not self._ready.is_set() and now >= t_ready:
+                self._ready.set()
+            if pace:
+                deadline += pace
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    deadline = time.monotonic()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def shutdown(self):
+        self._running = False
+        if self.is_alive():
+            self.join(1.0)
+        if self.cam is not None and hasattr(self.cam, "stop"):
+            self.cam.stop()
+
+    # ========== знімки ==========
+    def latest(self) -> Optional[Frame]:
+        """Останній кадр без очікування (може бути вже «старим» на інтервал кадру)."""
+        return self._frame
+
+    def next_frame(self, after: Optional[int] = None, timeout: float = 1.0) -> Frame:
+        """Перший кадр, отриманий після виклику (або новіший за №after) — «натискання затвора»."""
+        with self._cv:
+            if after is None:
+                after = self._frame[0] if self._frame else 0
+            if not self._cv.wait_for(lambda: self._frame is not None and self._frame[0] > after, timeout):
+                raise TimeoutError("no frame from camera")
+            return self._frame
+
+    def metadata(self, frame_no: int) -> dict:
+        """Метадані кадру (ExposureTime, AnalogueGain, SensorTimestamp...), якщо він ще останній."""
+        with self._cv:                 # пара (№, метадані) оновлюється в run() під тим самим локом
+            no, md = self._meta
+        return md if no == frame_no else {}
+
+    def encode(self, img, quality: Optional[int] = None) -> bytes:
+        if self._encode is None:
+            self._encode = backend.jpeg_encoder()
+        return self._encode(img, self.quality if quality is None else quality)
+
+    def capture_array(self, fresh: bool = True, timeout: float = 1.0):
+        """fresh=False — останній готовий кадр; до першого кадру чекає його (TimeoutError — камера мовчить)."""
+        frame = None if fresh else self.latest()
+        if frame is None:
+            frame = self.next_frame(None if fresh else 0, timeout)
+        return frame[2]
+
+    def capture_jpeg(self, quality: Optional[int] = None, fresh: bool = True) -> bytes:
+        return self.encode(self.capture_array(fresh), quality)
+
+    def capture_file(self, path: str, quality: Optional[int] = None) -> str:
+        data = self.capture_jpeg(quality)
+        tmp = path + ".part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)          # читач ніколи не побачить недописаний файл
+        startup.actuated()
+        return path
+
+
+# ========== демон і клієнт (Unix-сокет) ==========
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline().decode().strip()
+        svc: CameraService = self.server.service
+        try:
+            cmd, _, arg = line.partition(" ")
+            if cmd == "file":
+                self.wfile.write(f"ok {svc.capture_file(arg)}\n".encode())
+            elif cmd == "jpeg":
+                data = svc.capture_jpeg()
+                self.wfile.write(f"ok {len(data)}\n".encode() + data)
+            else:
+                self.wfile.write(b"err unknown command\n")
+        except Exception as e:
+            self.wfile.write(f"err {e}\n".encode())
+
+
+def serve(service: CameraService, path: str = SOCKET_PATH):
+    if os.path.exists(path):
+        os.unlink(path)
+    srv = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    srv.daemon_threads = True
+    srv.service = service
+    return srv
+
+
+def snap(path: str, sock_path: str = SOCKET_PATH, timeout: float = 5.0) -> str:
+    """Знімок через запущений демон. ConnectionError/FileNotFoundError — демона немає."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(sock_path)
+        s.sendall(f"file {os.path.abspath(path)}\n".encode())
+        reply = s.makefile("rb").readline().decode().strip()
+    status, _, arg = reply.partition(" ")
+    if status != "ok":
+        raise RuntimeError(arg)
+    return arg
+
+
+def selftest(n: int = 30) -> int:
+    svc = CameraService(size=(640, 480), warmup=0.2)
+    svc.start()
+    svc.wait_ready(5.0)
+    lat = []
+    for _ in range(n):
+        t = time.monotonic()
+        svc.capture_jpeg()
+        lat.append(time.monotonic() - t)
+    svc.shutdown()
+    lat.sort()
+    print(f"{n} captures: p50 {lat[n // 2] * 1e3:.1f} ms, max {lat[-1] * 1e3:.1f} ms "
+          f"(frames {svc.frames}, errors {svc.errors})")
+    return 0 if lat[-1] < 2.0 / svc.fps + 0.05 else 1
+
+
+if __name__ == "__main__":
+    import sys
+    args = sys.argv[1:]
+    if args[:1] == ["--selftest"]:
+        raise SystemExit(selftest())
+    if args[:1] == ["snap"]:
+        from datetime import datetime
+        out = args[1] if len(args) > 1 else datetime.now().strftime("photo_%Y%m%d_%H%M%S_%f.jpg")
+        print("Saved:", snap(out))
+        raise SystemExit(0)
+    startup.begin("camera_service")
+    svc = CameraService()
+    svc.start()
+    svc.wait_ready()
+    startup.mark("warm")
+    startup.print_report()
+    srv = serve(svc)
+    print("camera ready on", SOCKET_PATH)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        svc.shutdown()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/camera_stream.py
+"""
+Живий MJPEG-стрім камери: кадр кодується ОДИН раз, і ті самі bytes ідуть усім клієнтам.
+
+  python3 camera_stream.py                    # http://<pi>:8000/stream.mjpg, /snapshot.jpg, /stats
+  CAR_BACKEND=sim CAR_CLOCK=real python3 camera_stream.py --selftest
+
+- Кодувальник — один потік: бере кадри з CameraService, зменшує (scale) і кодує з STREAM_FPS.
+  Результат — незмінний bytes: спільний для всіх клієнтів, звільняється, коли його
+  відпустить останній (звичайний лічильник посилань Python), без копій на клієнта.
+- У кожного клієнта — лише слот «останній кадр»: поки клієнт відсилає попередній,
+  новіші кадри перезаписують слот; повільний клієнт пропускає кадри (drops), а не
+  гальмує кодувальник чи інших.
+- /stats — fps і пропуски по кожному клієнту.
+
+H.264 (апаратний кодер Picamera2) тут не робимо: він потребує окремого потоку lores і
+власного виходу; MJPEG читає будь-який браузер і <img>.
+"""
+import json, time, socket, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from camera_service import CameraService
+
+PORT = 8000
+STREAM_FPS = 15
+STREAM_QUALITY = 70
+SCALE = 2                         # 1280x720 -> 640x360 проріджуванням (дешево, без інтерполяції)
+BOUNDARY = b"FRAME"
+SNDBUF = 128 * 1024              # невеликий буфер сокета: старі кадри не стоять у ядрі, а пропускаються
+
+Encoded = Tuple[int, float, bytes]     # (№, time.monotonic() кадру, JPEG)
+
+
+class _Client:
+    __slots__ = ("addr", "t0", "sent", "drops", "last_no", "bytes")
+
+    def __init__(self, addr):
+        self.addr = addr
+        self.t0 = time.monotonic()
+        self.sent = self.drops = self.bytes = 0
+        self.last_no = 0
+
+
+class MjpegStreamer(threading.Thread):
+    def __init__(self, camera: CameraService, fps: float = STREAM_FPS, quality: int = STREAM_QUALITY,
+                 scale: int = SCALE, encode=None):
+        super().__init__(name="mjpeg-encode", daemon=True)
+        self.camera = camera
+        self.dt = 1.0 / float(fps)
+        self.quality = quality
+        self.scale = max(1, int(scale))
+        self._encode = encode
+        self._cv = threading.Condition()
+        self._cur: Optional[Encoded] = None
+        self._clients: Dict[int, _Client] = {}
+        self._running = True
+        self.encoded = 0
+        self.encode_s = 0.0
+
+    # ========== кодування ==========
+    def _enc(self, img) -> bytes:
+        if self.scale > 1:
+            import numpy as np
+            img = np.ascontiguousarray(img[::self.scale, ::self.scale])
+        if self._encode is not None:
+            return self._encode(img, self.quality)
+        return self.camera.encode(img, self.quality)
+
+    def run(self):
+        last = 0
+        deadline = time.monotonic()
+        while self._running:
+            try:
+                no, ts, img = self.camera.next_frame(last, timeout=1.0)
+            except TimeoutError:
+                continue
+            last = no
+            t = time.perf_counter()
+            data = self._enc(img)
+            self.encode_s += time.perf_counter() - t
+            with self._cv:
+                self.encoded += 1
+                self._cur = (self.encoded, ts, data)
+                self._cv.notify_all()
+            deadline += self.dt
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.monotonic()
+
+    def shutdown(self):
+        self._running = False
+        with self._cv:
+            self._cv.notify_all()
+        if self.is_alive():
+            self.join(1.0)
+
+    # ========== роздача ==========
+    def latest(self) -> Optional[Encoded]:
+        return self._cur
+
+    def wait_newer(self, client: _Client, timeout: float = 1.0) -> Optional[Encoded]:
+        with self._cv:
+            ok = self._cv.wait_for(lambda: not self._running or (self._cur is not None and self._cur[0] > client.last_no),
+                                   timeout)
+            if not ok or not self._running:
+                return None
+            cur = self._cur
+        if client.last_no:
+            client.drops += cur[0] - client.last_no - 1      # кадри, що перезаписали слот, поки ми слали
+        client.last_no = cur[0]
+        return cur
+
+    def add_client(self, addr) -> _Client:
+        c = _Client(addr)
+        with self._cv:
+            self._clients[id(c)] = c
+        return c
+
+    def remove_client(self, c: _Client):
+        with self._cv:
+            self._clients.pop(id(c), None)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._cv:
+            clients = list(self._clients.values())
+        return {
+            "encoded": self.encoded,
+            "encode_ms_avg": self.encode_s / self.encoded * 1e3 if self.encoded else 0.0,
+            "camera_frames": self.camera.frames,
+            "clients": [{"addr": "%s:%s" % c.addr[:2], "fps": c.sent / max(1e-6, now - c.t0),
+                         "sent": c.sent, "bytes": c.bytes,
+                         # + кадри, вже перезаписані в слоті, поки клієнт досі шле попередній
+                         "drops": c.drops + max(0, self.encoded - c.last_no - 1)} for c in clients],
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    streamer: MjpegStreamer = None
+
+    def log_message(self, *a):
+        pass
+
+    def _send(self, code: int, ctype: str, body: bytes):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/index.html"):
+            self._send(200, "text/html", b'<html><body style="margin:0"><img src="/stream.mjpg"></body></html>')
+        elif path == "/snapshot.jpg":
+            cur = self.streamer.latest()
+            if cur is None:
+                self._send(503, "text/plain", b"no frame yet")
+            else:
+                self._send(200, "image/jpeg", cur[2])
+        elif path == "/stats":
+            self._send(200, "application/json", json.dumps(self.streamer.stats()).encode())
+        elif path == "/stream.mjpg":
+            self._stream()
+        else:
+            self._send(404, "text/plain", b"not found")
+
+    def _stream(self):
+        st = self.streamer
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=" + BOUNDARY.decode())
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF)
+        c = st.add_client(self.client_address)
+        out = self.connection
+        try:
+            while True:
+                cur = st.wait_newer(c)
+                if cur is None:
+                    if not st._running:
+                        break
+                    continue
+                data = cur[2]
+                head = b"--%s\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n\r\n" % (BOUNDARY, len(data))
+                out.sendall(head)
+                out.sendall(data)           # спільний bytes — без копії на клієнта
+                out.sendall(b"\r\n")
+                c.sent += 1
+                c.bytes += len(data)
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass
+        finally:
+            st.remove_client(c)
+
+
+def make_server(streamer: MjpegStreamer, host: str = "0.0.0.0", port: int = PORT) -> ThreadingHTTPServer:
+    handler = type("Handler", (_Handler,), {"streamer": streamer})
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    return srv
+
+
+def selftest(fast: int = 3, seconds: float = 3.0) -> int:
+    """Синтетична камера + кілька швидких клієнтів і один навмисно повільний."""
+    import urllib.request
+    cam = CameraService(size=(640, 480), warmup=0.0)
+    cam.start()
+    # ~40 КБ на кадр, як у реального JPEG 640x360, щоб повільний клієнт справді впирався в буфери
+    streamer = MjpegStreamer(cam, fps=30, scale=1, encode=lambda img, q: bytes(40000))
+    streamer.start()
+    srv = make_server(streamer, "127.0.0.1", 0)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:%d/stream.mjpg" % srv.server_address[1]
+
+    def reader(delay: float):
+        s = socket.create_connection(srv.server_address)
+        if delay:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8192)
+        s.sendall(b"GET /stream.mjpg HTTP/1.0\r\n\r\n")
+        t_end = time.monotonic() + seconds
+        while time.monotonic() < t_end:
+            if not s.recv(65536 if not delay else 4096):
+                break
+            if delay:
+                time.sleep(delay)
+        s.close()
+
+    ths = [threading.Thread(target=reader, args=(0.0,)) for _ in range(fast)]
+    ths.append(threading.Thread(target=reader, args=(0.05,)))
+    for t in ths:
+        t.start()
+    time.sleep(seconds / 2)
+    stats = json.loads(urllib.request.urlopen(url.replace("stream.mjpg", "stats")).read())
+    for t in ths:
+        t.join()
+    srv.shutdown()
+    streamer.shutdown()
+    cam.shutdown()
+    print(f"encoded {stats['encoded']} (camera {stats['camera_frames']}), "
+          f"{stats['encode_ms_avg']:.2f} ms/encode")
+    for c in sorted(stats["clients"], key=lambda c: -c["fps"]):
+        print(f"  {c['addr']:<22} {c['fps']:5.1f} fps  sent {c['sent']:4}  drops {c['drops']}")
+    slow = min(stats["clients"], key=lambda c: c["fps"])
+    fast_ok = all(c["drops"] <= 2 for c in stats["clients"] if c is not slow)
+    ok = len(stats["clients"]) == fast + 1 and slow["drops"] > 0 and fast_ok
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    import sys, startup
+    if sys.argv[1:2] == ["--selftest"]:
+        raise SystemExit(selftest())
+    startup.begin("camera_stream")
+    cam = CameraService()
+    cam.start()
+    streamer = MjpegStreamer(cam)
+    streamer.start()
+    srv = make_server(streamer)
+    print(f"MJPEG on http://0.0.0.0:{PORT}/stream.mjpg")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        streamer.shutdown()
+        cam.shutdown()
@@ -1,19 +1,35 @@
 #!/usr/bin/env python3
-from picamera2 import Picamera2
-from libcamera import Transform
+import startup; startup.begin("capture_picamera2")
+import sys
+import backend
+import camera_service
 from datetime import datetime
-import time
+startup.mark("import")
 
-cam = Picamera2()
-cfg = cam.create_still_configuration(
-    main={"size": (1280, 720)},
-    transform=Transform(hflip=1, vflip=1)  # змінюй 0/1 за потреби
-)
-cam.configure(cfg)
-cam.start()
-time.sleep(0.8)  # дати AE/AWB стабілізуватись
+# мікросекунди в імені: два знімки в одну секунду більше не перезаписують один одного
+path = f"/repo/adeept-car/images/photo_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jpg"
+
+# запущений camera_service тримає камеру теплою — знімок за десятки мс без перезапуску сенсора
+try:
+    print("Saved:", camera_service.snap(path))
+    startup.actuated()
+    startup.print_report()
+    sys.exit(0)
+except (OSError, RuntimeError):
+    pass        # демона немає — разовий знімок, як раніше
+
+with startup.hw("picamera2"):
+    cam = backend.camera()                     # Picamera2 або SimCamera (CAR_BACKEND=sim)
+    cfg = cam.create_still_configuration(
+        main={"size": (1280, 720)},
+        transform=backend.transform(hflip=1, vflip=1)  # змінюй 0/1 за потреби
+    )
+    cam.configure(cfg)
+    cam.start()
+backend.sleep(0.8)  # дати AE/AWB стабілізуватись
 
-path = f"/repo/adeept-car/images/photo_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
 cam.capture_file(path)
+startup.actuated()
 cam.stop()
-print("Saved:", path)
\ No newline at end of file
+print("Saved:", path)
+startup.print_report()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/cmd_watchdog.py
+"""
+Сторожовий таймер команд: якщо керуючий цикл (teleop_cli, сервер) завис або впав
+не туди, де є finally, мотори не лишаються крутитися на останньому duty.
+
+  import cmd_watchdog as wd                   # не "watchdog" — так зветься pip-пакет стеження за ФС
+  wd.feed("drive")                            # на кожну команду/тік керування — дешево, без локів
+  wd.watch("arm", 0.2, motion.stop)           # своя реакція для групи
+  wd.get_watchdog().stats()                   # вік команд, мінімальний запас до спрацювання
+
+Групи: drive (стоп обох моторів — лімітер hard + motorStop), steering і arm
+(серви тримають останнє положення самі; для arm варто передати MotionExecutor.stop,
+щоб недоїханий рух не продовжувався без нагляду).
+
+- Група «озброюється» першим feed() і до того не спрацьовує.
+- Після спрацювання група чекає наступного feed() — він же знімає тривогу.
+- Перевірка йде власним потоком з CHECK_HZ по абсолютних дедлайнах, з SCHED_FIFO,
+  якщо дозволено (root/CAP_SYS_NICE). Від живості керуючого циклу не залежить.
+- Час — справжній time.monotonic (не backend-годинник): сторож про реальні зависання.
+Гарантія: реакція не пізніше timeout + 1/CHECK_HZ від останньої команди.
+"""
+import os, time, threading
+from typing import Callable, Dict, Optional
+
+DEFAULT_TIMEOUTS = {"drive": 0.10, "steering": 0.10, "arm": 0.20}   # секунди
+CHECK_HZ = 200
+RT_PRIORITY = 50            # SCHED_FIFO 1..99
+
+_last: Dict[str, float] = {}    # група -> time.monotonic() останньої команди
+
+
+def feed(group: str):
+    """Відмітити свіжу команду для групи (викликати з будь-якого потоку)."""
+    _last[group] = time.monotonic()
+
+
+def stop_drive():
+    """Аварійна зупинка тяги (стандартний on_trip групи "drive"): лімітер, потім мотори."""
+    import move, slew
+    # спершу лімітер (уставка і поточна тяга в нуль під його локом) — інакше його тік
+    # встигає повернути ненульову duty одразу після нашого motorStop
+    slew.stop_if_running(hard=True)
+    move.motorStop()
+
+
+class _Group:
+    __slots__ = ("timeout", "on_trip", "armed_at", "tripped", "trips", "min_margin", "max_age")
+
+    def __init__(self, timeout: float, on_trip: Optional[Callable[[], None]]):
+        self.timeout = float(timeout)
+        self.on_trip = on_trip
+        self.armed_at: Optional[float] = None     # значення _last, яке вже бачили
+        self.tripped = False
+        self.trips = 0
+        self.min_margin: Optional[float] = None   # найменший запас timeout - вік, с
+        self.max_age = 0.0
+
+
+class Watchdog(threading.Thread):
+    def __init__(self, check_hz: float = CHECK_HZ, rt_priority: int = RT_PRIORITY):
+        super().__init__(name="cmd-watchdog", daemon=True)
+        self.dt = 1.0 / float(check_hz)
+        self.rt_priority = rt_priority
+        self.realtime = False
+        self._lock = threading.Lock()
+        self._groups: Dict[str, _Group] = {}
+        self._running = True
+        self.checks = 0
+        self.late_checks = 0
+        self.errors = 0
+        for g, t in DEFAULT_TIMEOUTS.items():
+            self.watch(g, t, stop_drive if g == "drive" else None)
+
+    # ========== API ==========
+    def watch(self, group: str, timeout: float, on_trip: Optional[Callable[[], None]] = None):
+        """Додати/переналаштувати групу. on_trip=None — лише зафіксувати спрацювання."""
+        with self._lock:
+            self._groups[group] = _Group(timeout, on_trip)
+
+    def stats(self) -> Dict[str, dict]:
+        now = time.monotonic()
+        out = {}
+        with self._lock:
+            for name, g in self._groups.items():
+                last = _last.get(name)
+                out[name] = {
+                    "timeout_ms": g.timeout * 1e3,
+                    "age_ms": None if last is None else (now - last) * 1e3,
+                    "min_margin_ms": None if g.min_margin is None else g.min_margin * 1e3,
+                    "max_age_ms": g.max_age * 1e3,
+                    "tripped": g.tripped,
+                    "trips": g.trips,
+                }
+        return out
+
+    def reset_stats(self):
+        with self._lock:
+            for g in self._groups.values():
+                g.min_margin, g.max_age, g.trips = None, 0.0, 0
+
+    def shutdown(self):
+        self._running = False
+        if self.is_alive():
+            self.join(1.0)
+
+    # ========== цикл ==========
+    def _set_realtime(self):
+        try:
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(self.rt_priority))
+            self.realtime = True
+        except (AttributeError, OSError):
+            self.realtime = False         # без прав — звичайний потік, лише частіший
+
+    def _check(self, now: float):
+        tripped = []
+        with self._lock:
+            for name, g in self._groups.items():
+                last = _last.get(name)
+                if last is None:
+                    continue
+                if last != g.armed_at:
+                    g.armed_at = last
+                    g.tripped = False
+                if g.tripped:
+                    continue
+                age = now - last
+                margin = g.timeout - age
+                if g.min_margin is None or margin < g.min_margin:
+                    g.min_margin = margin
+                if age > g.max_age:
+                    g.max_age = age
+                if margin < 0:
+                    g.tripped = True
+                    g.trips += 1
+                    tripped.append(g)
+        for g in tripped:
+            if g.on_trip is not None:
+                try:
+                    g.on_trip()
+                except Exception:
+                    self.errors += 1      # сторож не має права впасти через реакцію
+
+    def run(self):
+        self._set_realtime()
+        deadline = time.monotonic()
+        while self._running:
+            self._check(time.monotonic())
+            self.checks += 1
+            deadline += self.dt
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -self.dt:
+                self.late_checks += 1
+                deadline = time.monotonic()
+
+
+_watchdog: Optional[Watchdog] = None
+_watchdog_lock = threading.Lock()
+
+
+def get_watchdog() -> Watchdog:
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = Watchdog()
+            _watchdog.start()
+        return _watchdog
+
+
+def watch(group: str, timeout: float, on_trip: Optional[Callable[[], None]] = None):
+    get_watchdog().watch(group, timeout, on_trip)
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/control_server.py
+"""
+Мережеве керування машинкою: asyncio UDP + WebSocket.
+
+  python3 control_server.py                          # UDP :8765, WS :8766 (якщо є пакет websockets)
+  python3 control_server.py --client 127.0.0.1 --rate 200 --count 1000   # локальний клієнт-навантажувач
+  CAR_BACKEND=sim python3 control_server.py --selftest                  # сервер + кілька клієнтів без заліза
+
+Пакет — бінарний кадр protocol.py (основний формат) або JSON-об'єкт з номером і будь-якою підмножиною каналів:
+  {"seq": 17,
+   "drive":  {"speed": 40} | {"left": 40, "right": 25},    # знакові -100..100, через slew-лімітер
+   "steer":  {"delta": -10},                                # градуси, steer_set
+   "arm":    {"t": 0.3, "base": 20, "wrist": -5},           # відносні кути, MotionExecutor.move_to
+   "light":  {"mode": "color", "r": 255, "g": 0, "b": 0},   # color | off | police | breath
+   "switch": {"port": 2, "on": 1}}
+
+Latest-wins: прийом лише перезаписує слот каналу (arm — окремий слот на суглоб, switch — на порт),
+без черг; потік актуації віддає в залізо лише найновіше, не частіше ACT_HZ. Тож хоч сотні пакетів/с
+від кількох клієнтів — відставання не накопичується, проміжні уставки просто відкидаються.
+seq — 32-бітний лічильник клієнта; пакет, не новіший за вже прийнятий від того ж клієнта
+для того ж слота, — застарілий (переставлений мережею) і відкидається. Номери джерела, що
+мовчить довше SOURCE_IDLE_S, забуваються (таблиця не росте на довгоживучому сервері).
+
+Drive/steer мають бути «живими»: клієнт шле їх хоча б раз на DRIVE_TIMEOUT, інакше
+cmd_watchdog зупиняє мотори.
+"""
+import json, time, socket, asyncio, argparse, threading
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import cmd_watchdog as wd
+import protocol
+
+UDP_PORT = 8765
+WS_PORT = 8766
+ACT_HZ = 100
+DRIVE_TIMEOUT = 0.25        # с без drive-пакетів — стоп (мережа повільніша за локальний tty)
+MAX_PACKET = 2048
+SOURCE_IDLE_S = 30.0        # джерело (UDP-адреса) мовчить довше — його seq забуваються
+MAX_SOURCES = 64            # більше джерел — витісняємо найдавніше активне
+
+SEQ_MASK = 0xFFFFFFFF
+
+Slot = Tuple[str, Hashable]      # ("drive", None) | ("arm", "base") | ("switch", 2) ...
+
+
+def seq_newer(a: int, b: int) -> bool:
+    """a новіший за b з урахуванням переповнення 32-бітного лічильника."""
+    d = (a - b) & SEQ_MASK
+    return 0 < d < 0x80000000
+
+
+def parse_json(data) -> Tuple[int, Iterable[Tuple[Slot, Any]]]:
+    msg = json.loads(data)
+    seq = int(msg["seq"]) & SEQ_MASK
+    items = []
+    for ch, val in msg.items():
+        if ch == "seq":
+            continue
+        # ті самі значення, що й protocol.decode: кортежі/числа, а не dict
+        if ch == "arm":
+            t = float(val.get("t", 0.0))
+            items.extend((("arm", j), (float(v), t)) for j, v in val.items() if j != "t")
+        elif ch == "switch":
+            items.append((("switch", int(val["port"])), int(val["on"])))
+        elif ch == "drive":
+            if "speed" in val:
+                l = r = float(val["speed"])
+            else:
+                l, r = float(val.get("left", 0)), float(val.get("right", 0))
+            items.append((("drive", None), (l, r)))
+        elif ch == "steer":
+            items.append((("steer", None), float(val.get("delta", 0.0))))
+        elif ch == "light":
+            items.append((("light", None), (val.get("mode", "off"), int(val.get("r", 0)),
+                                            int(val.get("g", 0)), int(val.get("b", 0)))))
+        else:
+            raise ValueError(f"unknown channel {ch!r}")
+    return seq, items
+
+
+class Actuators:
+    """Залізо піднімається ліниво — сервер без рук/світла не чіпає PCA/ws281x."""
+
+    def __init__(self):
+        self._arm = None
+        self._motion = None
+        self._light = None
+
+    def drive(self, val: Tuple[float, float]):
+        from slew import get_limiter
+        get_limiter().set(*val)
+        wd.feed("drive")
+
+    def steer(self, delta: float):
+        from steering import steer_set
+        steer_set(delta)
+        wd.feed("steering")
+
+    @property
+    def motion(self):
+        if self._motion is None:
+            from arm import Arm
+            from arm_motion import MotionExecutor
+            self._arm = Arm()
+            self._motion = MotionExecutor(self._arm)
+            self._motion.start()
+        return self._motion
+
+    def arm(self, joints: Dict[str, Tuple[float, float]]):
+        by_t: Dict[float, Dict[str, float]] = {}
+        for j, (v, t) in joints.items():
+            by_t.setdefault(t, {})[j] = v
+        for t, targets in by_t.items():
+            self.motion.move_to(t, **targets)
+        wd.feed("arm")
+
+    @property
+    def light(self):
+        if self._light is None:
+            from robotLight import RobotLight
+            self._light = RobotLight(daemon=True)
+            self._light.start()
+        return self._light
+
+    def set_light(self, val: Tuple[str, int, int, int]):
+        mode, *rgb = val
+        if mode == "police":
+            self.light.police()
+        elif mode == "breath":
+            self.light.breath(*rgb)
+        else:
+            self.light.pause()
+            if mode == "color":
+                self.light.setColor(*rgb)
+
+    def switch(self, port: int, on: int):
+        self.light.switch(port, 1 if on else 0)
+
+    def stop(self):
+        wd.stop_drive()
+        if self._motion is not None:
+            self._motion.shutdown()
+
+
+class ControlServer:
+    def __init__(self, host: str = "0.0.0.0", udp_port: int = UDP_PORT, ws_port: Optional[int] = WS_PORT,
+                 act_hz: float = ACT_HZ, actuators: Optional[Actuators] = None, decoders=None):
+        self.host = host
+        self.udp_port = udp_port
+        self.ws_port = ws_port
+        self.dt = 1.0 / float(act_hz)
+        self.act = actuators or Actuators()
+        # (ознака, парсер): перший, чия ознака підходить до сирих байтів; інакше JSON
+        self.decoders = list(decoders if decoders is not None else [(protocol.is_packet, protocol.decode)])
+        self._cv = threading.Condition()
+        self._pending: Dict[Slot, Any] = {}
+        # джерело -> [час останнього пакета, {слот: seq}]; старі джерела витісняє _evict
+        self._sources: Dict[Hashable, list] = {}
+        self._next_sweep = time.monotonic() + SOURCE_IDLE_S
+        self._running = True
+        self._thread = threading.Thread(target=self._actuate, name="ctl-actuate", daemon=True)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.udp_addr = None
+        self.ws_addr = None
+        self.stats = {"packets": 0, "bad": 0, "stale": 0, "updates": 0,
+                      "coalesced": 0, "applied": 0, "ticks": 0, "errors": 0, "evicted": 0}
+
+    # ========== прийом (потік event loop'а) ==========
+    def _decode(self, data):
+        for match, parse in self.decoders:
+            if match(data):
+                return parse(data)
+        return parse_json(data)
+
+    def ingest(self, data, source: Hashable):
+        st = self.stats
+        st["packets"] += 1
+        try:
+            seq, items = self._decode(data)
+            items = list(items)
+        except Exception:
+            st["bad"] += 1
+            return
+        now = time.monotonic()
+        src = self._sources.get(source)
+        if src is None:
+            if now >= self._next_sweep or len(self._sources) >= MAX_SOURCES:
+                self._evict(now)
+            src = self._sources[source] = [now, {}]
+        src[0] = now
+        last_seq = src[1]
+        fresh = []
+        for slot, val in items:
+            last = last_seq.get(slot)
+            if last is not None and not seq_newer(seq, last):
+                st["stale"] += 1
+                continue
+            last_seq[slot] = seq
+            fresh.append((slot, val))
+        if not fresh:
+            return
+        with self._cv:
+            pend = self._pending
+            for slot, val in fresh:
+                if slot in pend:
+                    st["coalesced"] += 1
+                pend[slot] = val
+            st["updates"] += len(fresh)
+            self._cv.notify()
+
+    def forget(self, source: Hashable):
+        self._sources.pop(source, None)
+
+    def _evict(self, now: float):
+        """Прибрати джерела, що мовчать довше SOURCE_IDLE_S; понад MAX_SOURCES — найдавніші."""
+        drop = [s for s, (seen, _) in self._sources.items() if now - seen > SOURCE_IDLE_S]
+        extra = len(self._sources) - len(drop) - (MAX_SOURCES - 1)      # місце для нового джерела
+        if extra > 0:
+            live = sorted((s for s in self._sources if s not in drop), key=lambda s: self._sources[s][0])
+            drop += live[:extra]
+        for s in drop:
+            del self._sources[s]
+        self.stats["evicted"] += len(drop)
+        self._next_sweep = now + SOURCE_IDLE_S
+
+    # ========== актуація (власний потік) ==========
+    def _apply(self, batch: Dict[Slot, Any]):
+        arm = {}
+        for (ch, sub), val in batch.items():
+            try:
+                if ch == "drive":
+                    self.act.drive(val)
+                elif ch == "steer":
+                    self.act.steer(val)
+                elif ch == "arm":
+                    arm[sub] = val
+                elif ch == "light":
+                    self.act.set_light(val)
+                elif ch == "switch":
+                    self.act.switch(sub, val)
+            except Exception:
+                self.stats["errors"] += 1
+        if arm:
+            try:
+                self.act.arm(arm)
+            except Exception:
+                self.stats["errors"] += 1
+        self.stats["applied"] += len(batch)
+
+    def _actuate(self):
+        # перша уставка після тиші йде одразу; далі не частіше за dt — решта зливається в слотах
+        next_ok = time.monotonic()
+        while True:
+            with self._cv:
+                while self._running and not self._pending:
+                    self._cv.wait()
+                if not self._running:
+                    return
+                batch, self._pending = self._pending, {}
+            self._apply(batch)
+            self.stats["ticks"] += 1
+            next_ok += self.dt
+            delay = next_ok - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_ok = time.monotonic()
+
+    # ========== мережа ==========
+    class _Udp(asyncio.DatagramProtocol):
+        def __init__(self, server: "ControlServer"):
+            self.server = server
+
+        def datagram_received(self, data, addr):
+            self.server.ingest(data, addr)
+
+    async def _ws_handler(self, ws, path=None):
+        src = ("ws", id(ws))
+        try:
+            async for msg in ws:
+                self.ingest(msg, src)
+        except Exception:
+            pass
+        finally:
+            self.forget(src)
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._thread.start()
+        transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: self._Udp(self), local_addr=(self.host, self.udp_port))
+        self._udp = transport
+        self.udp_addr = transport.get_extra_info("sockname")
+        self._ws = None
+        if self.ws_port is not None:
+            try:
+                import websockets
+            except ImportError:
+                print("websockets не встановлено — лише UDP (pip install websockets)")
+            else:
+                self._ws = await websockets.serve(self._ws_handler, self.host, self.ws_port,
+                                                  max_size=MAX_PACKET, compression=None)
+                self.ws_addr = next(iter(self._ws.sockets)).getsockname()
+
+    async def close(self):
+        self._udp.close()
+        if self._ws is not None:
+            self._ws.close()
+            await self._ws.wait_closed()
+        with self._cv:
+            self._running = False
+            self._cv.notify()
+        self._thread.join(1.0)
+
+    async def serve_forever(self, stats_every: float = 0.0):
+        await self.start()
+        wd.watch("drive", DRIVE_TIMEOUT, wd.stop_drive)
+        wd.get_watchdog()
+        print(f"UDP {self.udp_addr}  WS {self.ws_addr}")
+        try:
+            while True:
+                await asyncio.sleep(stats_every or 3600)
+                if stats_every:
+                    print(self.stats, flush=True)
+        finally:
+            await self.close()
+            self.act.stop()
+
+
+# ========== клієнт ==========
+class UdpClient:
+    """Простий клієнт: сам нумерує пакети. c.send(drive={"speed": 40}, steer={"delta": 5})"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = UDP_PORT, encode=None):
+        self.addr = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.seq = 0
+        self.encode = encode or (lambda seq, ch: json.dumps(dict(ch, seq=seq), separators=(",", ":")).encode())
+
+    def send(self, **channels):
+        self.seq = (self.seq + 1) & SEQ_MASK
+        self.sock.sendto(self.encode(self.seq, channels), self.addr)
+        return self.seq
+
+    def send_raw(self, seq: int, **channels):
+        self.sock.sendto(self.encode(seq & SEQ_MASK, channels), self.addr)
+
+    def close(self):
+        self.sock.close()
+
+
+def run_client(host: str, port: int, rate: float, count: int, binary: bool = True):
+    c = UdpClient(host, port, protocol.encode_channels if binary else None)
+    dt = 1.0 / rate
+    t0 = deadline = time.monotonic()
+    for i in range(count):
+        s = int(60 * ((i % 100) / 50.0 - 1.0))
+        c.send(drive={"speed": s}, steer={"delta": (i % 21) - 10})
+        deadline += dt
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    print(f"sent {count} packets in {time.monotonic() - t0:.2f}s")
+
+
+def selftest(clients: int = 4, rate: float = 250.0, seconds: float = 2.0) -> int:
+    """Сервер на випадкових портах + кілька UDP-клієнтів; останнє надіслане має бути в залізі."""
+    import backend
+    backend.configure("sim", "real")
+
+    async def main():
+        srv = ControlServer("127.0.0.1", 0, None)
+        await srv.start()
+        host, port = srv.udp_addr[:2]
+        last = {}
+
+        def blast(k):
+            c = UdpClient(host, port, protocol.encode_channels if k % 2 else None)   # навпіл бінарні/JSON
+            n = int(rate * seconds)
+            for i in range(n):
+                c.send(steer={"delta": (i + k) % 30 - 15}, arm={"t": 0, "base": i % 40})
+                if i % 50 == 0:
+                    c.send_raw(c.seq - 5, steer={"delta": 99})     # переставлений пакет — має відпасти
+                time.sleep(1.0 / rate)
+            c.send(drive={"speed": 0}, steer={"delta": k})
+            last[k] = k
+
+        ths = [threading.Thread(target=blast, args=(k,)) for k in range(clients)]
+        t0 = time.monotonic()
+        for t in ths:
+            t.start()
+        while any(t.is_alive() for t in ths):
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.1)
+        el = time.monotonic() - t0
+        await srv.close()
+        srv.act.stop()
+        return srv, el
+
+    srv, el = asyncio.run(main())
+    st = srv.stats
+    print(f"{st['packets']} packets in {el:.2f}s ({st['packets'] / el:.0f}/s) from {clients} clients: {st}")
+    ok = st["stale"] >= clients and st["bad"] == 0 and st["errors"] == 0 and st["applied"] < st["updates"]
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    import startup; startup.begin("control_server")
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--udp-port", type=int, default=UDP_PORT)
+    ap.add_argument("--ws-port", type=int, default=WS_PORT)
+    ap.add_argument("--stats", type=float, default=0.0, help="друкувати лічильники кожні N с")
+    ap.add_argument("--client", metavar="HOST", help="режим клієнта: слати drive/steer на HOST")
+    ap.add_argument("--rate", type=float, default=100.0)
+    ap.add_argument("--json", action="store_true", help="клієнт шле JSON замість бінарного протоколу")
+    ap.add_argument("--count", type=int, default=500)
+    ap.add_argument("--selftest", action="store_true")
+    args = ap.parse_args()
+    if args.selftest:
+        raise SystemExit(selftest())
+    if args.client:
+        run_client(args.client, args.udp_port, args.rate, args.count, not args.json)
+    else:
+        import os
+        dataset = None
+        if os.environ.get("CAR_DATASET"):  # кадри + стан із телеметрії цього процесу (рука — через Arm._stage)
+            import drive_dataset as dataset
+            dataset.start_from_env()
+        try:
+            asyncio.run(ControlServer(args.host, args.udp_port, args.ws_port).serve_forever(args.stats))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if dataset is not None:
+                dataset.stop()
+        startup.print_report()
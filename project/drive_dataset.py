@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/drive_dataset.py
+"""
+Датасет для навчання: кадри камери + стан актуаторів на момент кадру, у чанкованому
+append-only форматі з компактним колонковим індексом на чанк.
+
+  CAR_DATASET=/repo/adeept-car/datasets/run1 python3 teleop_cli.py     # також arm_teleop_cli, control_server
+  rec = DatasetRecorder(cam, root, arm=arm); rec.start() ... rec.close()   # у своєму керуючому скрипті
+  python3 drive_dataset.py info /repo/adeept-car/datasets/run1
+  python3 drive_dataset.py extract run1 --from 300 --to 330 --out /tmp/f   # JPEG-и діапазону кадрів
+  CAR_BACKEND=sim CAR_CLOCK=real python3 drive_dataset.py --selftest
+
+Каталог сесії:
+  meta.json             — розмір кадру, fps, якість, перелік колонок
+  chunk_000000.bin      — JPEG-и підряд (лише дописування, великий буфер — послідовний запис на SD)
+  chunk_000000.idx      — індекс чанка: заголовок IDX + колонки COLUMNS одна за одною (по рядку на кадр)
+
+Запис — лише в тому процесі, що керує машинкою (start_from_env() у керуючих скриптах):
+стан береться з його ж telemetry/Arm, окремий процес-записувач бачив би самі NaN.
+Стан актуаторів знімається в момент отримання кадру: кермо і мотори — останні команди
+з telemetry (steer, motor.A/B), рука — тіньовий стан Arm.state (arm=, кут відносно центру
+після клампу; без arm — канали telemetry arm.<суглоб>). NaN — команди ще не було
+(або CAR_TELEMETRY=0).
+Кодування JPEG — у пулі воркерів, дописування і індекси — в окремому потоці-писачі;
+черга обмежена: не встигаємо — кадр відкидається і рахується, зйомка не гальмує.
+Індекс чанка пишеться після fsync даних (через .part + os.replace): індекс ніколи не
+посилається на недописані байти. Після падіння втрачається лише поточний незакритий чанк.
+Довільний доступ: Dataset тримає всі індекси в пам'яті (~60 байт на кадр), діапазон
+кадрів — searchsorted по колонці, самі кадри — os.pread за offset/size, без сканування.
+"""
+import os, glob, json, time, queue, struct, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import telemetry
+from protocol import ARM_JOINTS
+
+MAGIC = b"CARDSET1"
+IDX = struct.Struct("<8sII")               # magic, № чанка, кадрів у чанку
+STATE = ("steer", "motor.A", "motor.B") + tuple("arm." + j for j in ARM_JOINTS)
+COLUMNS = [("frame", "<u4"), ("t", "<f8"), ("offset", "<u8"), ("size", "<u4")] + [(n, "<f4") for n in STATE]
+
+CHUNK_FRAMES = 300              # 10 с при 30 fps
+QUEUE_SIZE = 16
+WORKERS = 2
+QUALITY = 85
+SIZE = (640, 480)
+WRITE_BUFFER = 1 << 20
+
+
+def _pct(s: List[float], p: float) -> float:
+    if not s:
+        return 0.0
+    s = sorted(s)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+def _chunk_path(root: str, n: int, ext: str) -> str:
+    return os.path.join(root, f"chunk_{n:06d}.{ext}")
+
+
+class DatasetRecorder:
+    def __init__(self, camera, root: str, arm=None, chunk_frames: int = CHUNK_FRAMES, workers: int = WORKERS,
+                 queue_size: int = QUEUE_SIZE, quality: int = QUALITY):
+        self.camera = camera
+        self.arm = arm
+        self.root = root
+        self.chunk_frames = chunk_frames
+        self.quality = quality
+        os.makedirs(root, exist_ok=True)
+        if glob.glob(os.path.join(root, "chunk_*")):
+            raise FileExistsError(f"{root} already contains a dataset")
+        with open(os.path.join(root, "meta.json"), "w") as f:
+            json.dump({"size": list(camera.size), "fps": camera.fps, "quality": quality,
+                       "chunk_frames": chunk_frames, "columns": COLUMNS, "created": time.time()}, f, indent=1)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="dataset-enc")
+        self._q: "queue.Queue" = queue.Queue(maxsize=queue_size)   # (future JPEG, рядок) у порядку кадрів
+        self._writer = threading.Thread(target=self._write_loop, name="dataset-writer", daemon=True)
+        self._capture: Optional[threading.Thread] = None
+        self._running = False
+        self._lock = threading.Lock()
+        self.captured = self.written = self.dropped = self.errors = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.max_depth = 0
+        self.write_s: List[float] = []
+        self.flush_s: List[float] = []
+        self._writer.start()
+
+    # ========== зйомка ==========
+    def _state(self) -> Tuple[float, ...]:
+        tel = telemetry.active
+        nan = float("nan")
+        drive = (nan,) * 3 if tel is None else (tel.last("steer"), tel.last("motor.A"), tel.last("motor.B"))
+        arm = self.arm
+        if arm is None:
+            joints = tuple(nan if tel is None else tel.last("arm." + j) for j in ARM_JOINTS)
+        else:
+            joints = tuple(nan if arm.angle(j) is None else arm.rel(j) for j in ARM_JOINTS)
+        return drive + joints
+
+    def add(self, frame) -> bool:
+        """Кадр (№, monotonic, масив) зі станом актуаторів «зараз». False — відкинуто (черга повна)."""
+        no, t, img = frame
+        row = (no, t) + self._state()
+        self.captured += 1
+        if self._q.full():
+            self.dropped += 1
+            return False
+        self._q.put((self._pool.submit(self.camera.encode, img, self.quality), row))
+        d = self._q.qsize()
+        if d > self.max_depth:
+            self.max_depth = d
+        return True
+
+    def _capture_loop(self):
+        last = None
+        while self._running:
+            try:
+                frame = self.camera.next_frame(last)
+            except TimeoutError:
+                continue
+            last = frame[0]
+            self.add(frame)
+
+    def start(self):
+        """Фоновий запис кожного кадру камери (поруч із керуючим скриптом)."""
+        self._running = True
+        self._capture = threading.Thread(target=self._capture_loop, name="dataset-capture", daemon=True)
+        self._capture.start()
+
+    # ========== писач ==========
+    def _open_chunk(self):
+        self._f = open(_chunk_path(self.root, self.chunks, "bin"), "wb", buffering=WRITE_BUFFER)
+        self._off = 0
+        self._rows: List[tuple] = []
+
+    def _close_chunk(self):
+        if not self._rows:
+            self._f.close()
+            os.unlink(_chunk_path(self.root, self.chunks, "bin"))
+            return
+        t0 = time.monotonic()
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        self._f.close()
+        cols = list(zip(*self._rows))
+        path = _chunk_path(self.root, self.chunks, "idx")
+        with open(path + ".part", "wb") as f:
+            f.write(IDX.pack(MAGIC, self.chunks, len(self._rows)))
+            for (name, dt), col in zip(COLUMNS, cols):
+                f.write(np.asarray(col, dtype=dt).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".part", path)
+        with self._lock:
+            self.flush_s.append(time.monotonic() - t0)
+        self.chunks += 1
+
+    def _write_loop(self):
+        self._open_chunk()
+        while True:
+            item = self._q.get()
+            if item is None:
+                break
+            fut, (no, t, *state) = item
+            try:
+                data = fut.result()
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                continue
+            t0 = time.monotonic()
+            self._f.write(data)
+            self._rows.append((no, t, self._off, len(data), *state))
+            self._off += len(data)
+            with self._lock:
+                self.write_s.append(time.monotonic() - t0)
+                self.written += 1
+                self.bytes += len(data)
+            if len(self._rows) >= self.chunk_frames:
+                self._close_chunk()
+                self._open_chunk()
+        self._close_chunk()
+
+    def close(self):
+        """Зупинити зйомку, дописати чергу і закрити останній чанк."""
+        self._running = False
+        if self._capture is not None:
+            self._capture.join(2.0)
+        self._q.put(None)
+        self._writer.join()
+        self._pool.shutdown()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "captured": self.captured, "written": self.written, "dropped": self.dropped,
+                "errors": self.errors, "chunks": self.chunks, "mb": self.bytes / 1e6,
+                "queue_max": self.max_depth, "queue_size": self._q.maxsize,
+                "write_p99_ms": _pct(self.write_s, 99) * 1e3, "flush_max_ms": max(self.flush_s or [0.0]) * 1e3,
+            }
+
+
+class Dataset:
+    """Читання: усі індекси в пам'яті колонками, кадри — pread без сканування чанків."""
+
+    def __init__(self, root: str):
+        self.root = root
+        with open(os.path.join(root, "meta.json")) as f:
+            self.meta = json.load(f)
+        parts = {name: [] for name, _ in COLUMNS}
+        chunk = []
+        for path in sorted(glob.glob(os.path.join(root, "chunk_*.idx"))):
+            with open(path, "rb") as f:
+                buf = f.read()
+            magic, n_chunk, rows = IDX.unpack_from(buf, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{path}: not a dataset index")
+            off = IDX.size
+            for name, dt in COLUMNS:
+                a = np.frombuffer(buf, dtype=dt, count=rows, offset=off)
+                parts[name].append(a)
+                off += a.nbytes
+            chunk.append(np.full(rows, n_chunk, dtype=np.uint32))
+        self.columns = {name: (np.concatenate(p) if p else np.empty(0, dt))
+                        for (name, dt), p in zip(COLUMNS, parts.values())}
+        self.chunk = np.concatenate(chunk) if chunk else np.empty(0, np.uint32)
+        self._fds = {}
+
+    def __len__(self):
+        return len(self.chunk)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def row(self, i: int) -> dict:
+        return {name: self.columns[name][i].item() for name, _ in COLUMNS}
+
+    def frame_range(self, start: int, stop: int) -> range:
+        """Рядки з №кадру в [start, stop) (номери кадрів зростають, пропуски — відкинуті кадри)."""
+        fr = self.columns["frame"]
+        return range(int(np.searchsorted(fr, start)), int(np.searchsorted(fr, stop)))
+
+    def time_range(self, t0: float, t1: float) -> range:
+        t = self.columns["t"]
+        return range(int(np.searchsorted(t, t0)), int(np.searchsorted(t, t1)))
+
+    def jpeg(self, i: int) -> bytes:
+        c = int(self.chunk[i])
+        fd = self._fds.get(c)
+        if fd is None:
+            fd = self._fds[c] = os.open(_chunk_path(self.root, c, "bin"), os.O_RDONLY)
+        return os.pread(fd, int(self.columns["size"][i]), int(self.columns["offset"][i]))
+
+    def iter(self, rows: range) -> Iterator[Tuple[dict, bytes]]:
+        for i in rows:
+            yield self.row(i), self.jpeg(i)
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+
+active: Optional[DatasetRecorder] = None
+_own_camera = None
+
+
+def start(root: str, camera=None, arm=None) -> DatasetRecorder:
+    """Почати запис у цьому процесі; без camera= піднімається власний CameraService (SIZE)."""
+    global active, _own_camera
+    stop()
+    if camera is None:
+        from camera_service import CameraService
+        camera = _own_camera = CameraService(size=SIZE)
+        camera.start()
+        camera.wait_ready()
+    active = DatasetRecorder(camera, root, arm=arm)
+    active.start()
+    return active
+
+
+def start_from_env(camera=None, arm=None) -> Optional[DatasetRecorder]:
+    root = os.environ.get("CAR_DATASET")
+    return start(root, camera, arm) if root else None
+
+
+def stop():
+    global active, _own_camera
+    rec, active = active, None
+    if rec is not None:
+        rec.close()
+        print(f"dataset: {rec.written} frames -> {rec.root} " +
+              " ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}" for k, v in rec.stats().items()))
+    cam, _own_camera = _own_camera, None
+    if cam is not None:
+        cam.shutdown()
+
+
+def selftest(seconds: float = 3.0) -> int:
+    import tempfile, backend
+    backend.configure("sim")
+    import steering, move
+    from arm import Arm
+    from camera_service import CameraService
+    arm = Arm(offsets_file="/nonexistent", limits_file="/nonexistent")
+    arm.center()
+    cam = CameraService(size=SIZE, warmup=0.1)
+    cam.start()
+    cam.wait_ready(5.0)
+    root = os.path.join(tempfile.mkdtemp(), "run")
+    rec = DatasetRecorder(cam, root, arm=arm, chunk_frames=30)
+    rec.start()
+    t_end = time.monotonic() + seconds
+    t_pose = None
+    i = 0
+    while time.monotonic() < t_end:
+        if t_pose is None and time.monotonic() > t_end - seconds / 2:
+            arm.pose(base=40, wrist=20)         # поза пишеться через _stage, мимо set_joint
+            t_pose = time.monotonic()
+        steering.steer_set((i % 60) - 30)      # кермо змінюється кожні 10 мс — вирівнювання видно в даних
+        move.move(30 + i % 40, "forward", "no")
+        time.sleep(0.01)
+        i += 1
+    rec.close()
+    cam.shutdown()
+    st = rec.stats()
+    ds = Dataset(root)
+    rows = ds.frame_range(int(ds["frame"][0]) + 10, int(ds["frame"][0]) + 20)
+    got = list(ds.iter(rows))
+    fps = len(ds) / seconds
+    print(f"{len(ds)} frames in {st['chunks']} chunks ({fps:.1f} fps), {st['mb']:.2f} MB, dropped {st['dropped']}, "
+          f"write p99 {st['write_p99_ms']:.2f} ms, chunk flush max {st['flush_max_ms']:.1f} ms")
+    print("row", got[0][0])
+    after = ds["t"] > t_pose
+    arm_ok = (not any(np.isnan(ds["arm." + j]).any() for j in ARM_JOINTS)
+              and after.any() and np.all(ds["arm.base"][after] == 40) and np.all(ds["arm.wrist"][after] == 20)
+              and telemetry.active.last("arm.base") == 40)
+    print("arm after pose:", {j: float(ds["arm." + j][-1]) for j in ARM_JOINTS}, "OK" if arm_ok else "MISMATCH")
+    ok = arm_ok and (len(ds) == st["written"] and len(got) == 10 and all(j[:2] == b"\xff\xd8" for _, j in got)
+          and np.all(np.diff(ds["frame"].astype(np.int64)) > 0) and not np.isnan(ds["steer"]).any()
+          and fps > 0.9 * cam.fps)
+    ds.close()
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("cmd", nargs="?", choices=("info", "extract"))
+    ap.add_argument("root", nargs="?")
+    ap.add_argument("--from", dest="start", type=int, default=0, help="№ кадру (extract)")
+    ap.add_argument("--to", dest="stop", type=int, default=1 << 32)
+    ap.add_argument("--out", default=".")
+    ap.add_argument("--selftest", action="store_true")
+    args = ap.parse_args()
+    if args.selftest:
+        raise SystemExit(selftest())
+    if not args.cmd or not args.root:
+        ap.error("cmd and root are required")
+
+    if args.cmd == "info":
+        ds = Dataset(args.root)
+        n = len(ds)
+        print(f"{n} frames, {len(set(ds.chunk.tolist()))} chunks, {ds.meta['size']} @ {ds.meta['fps']} fps")
+        if n:
+            t = ds["t"]
+            span = t[-1] - t[0]
+            gaps = int((np.diff(ds["frame"].astype(np.int64)) - 1).sum())
+            print(f"span {span:.1f}s, frames {ds['frame'][0]}..{ds['frame'][-1]} (skipped {gaps}), "
+                  f"{ds['size'].sum() / 1e6:.1f} MB")
+            for name in STATE:
+                col = ds[name]
+                seen = col[~np.isnan(col)]
+                print(f"  {name:<12} " + (f"{seen.min():+7.1f} .. {seen.max():+7.1f}" if seen.size else "—"))
+    else:
+        ds = Dataset(args.root)
+        os.makedirs(args.out, exist_ok=True)
+        n = 0
+        for row, data in ds.iter(ds.frame_range(args.start, args.stop)):
+            with open(os.path.join(args.out, f"frame_{row['frame']:06d}.jpg"), "wb") as f:
+                f.write(data)
+            n += 1
+        print(n, "frames ->", args.out)
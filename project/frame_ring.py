@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/frame_ring.py
+"""
+Кільце кадрів у multiprocessing.shared_memory: один процес з камерою пише,
+будь-скільки інших (зір, стрім, запис датасету) читають кадри як numpy-масиви
+прямо зі спільної пам'яті — без копій, пікла і без блокування писача.
+
+  python3 frame_ring.py produce               # CameraService -> кільце RING_NAME
+  python3 frame_ring.py consume               # читач: fps, втрачені/зіпсовані кадри
+  CAR_BACKEND=sim CAR_CLOCK=real python3 frame_ring.py --selftest
+
+Розкладка: заголовок (розміри, № останнього кадру) + метадані слотів + слоти даних
+(вирівняні на 64 байти). У кожного слота — seqlock: писач робить лічильник непарним,
+копіює кадр і метадані, робить парним. Читач бере слот лише з парним лічильником і
+потрібним № кадру, а після обробки перевіряє FrameView.valid() — чи слот не
+переписали, поки ним користувались (інакше кадр відкинути або взяти копію).
+
+Писач ніколи не чекає читачів: повільний читач отримує overrun — Consumer.next()
+перескакує на найновіший кадр (у нього найбільше часу до перезапису) і рахує втрачені.
+"""
+import time, struct, threading
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+RING_NAME = "car_frames"
+NSLOTS = 8
+
+MAGIC = b"FRNG"
+VERSION = 1
+HEADER = struct.Struct("<4sIIIIIQQ")     # magic, версія, слотів, h, w, c, крок слота, № останнього кадру
+HEADER_SIZE = 64
+_HEAD_OFF = 32
+META = struct.Struct("<QQdQIf")          # seqlock, № кадру, t (monotonic), SensorTimestamp нс, експозиція мкс, gain
+META_SIZE = 64
+_U64 = struct.Struct("<Q")
+
+
+def _align(n: int, a: int = 64) -> int:
+    return (n + a - 1) // a * a
+
+
+def _attach_shm(name: str) -> shared_memory.SharedMemory:
+    # читач не повинен «прибрати» чужий сегмент при виході (resource_tracker до 3.13 так робить)
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda *a, **kw: None     # unregister після fork зламав би трекер батька
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+class FrameView:
+    """Кадр без копії. arr — лише для читання; після обробки — valid()."""
+    __slots__ = ("arr", "frame_no", "t", "sensor_ts", "exposure", "gain", "_ring", "_slot", "_lock")
+
+    def __init__(self, ring, slot, lock, frame_no, t, sensor_ts, exposure, gain):
+        self.arr = ring._arrays[slot]
+        self.frame_no, self.t, self.sensor_ts, self.exposure, self.gain = frame_no, t, sensor_ts, exposure, gain
+        self._ring, self._slot, self._lock = ring, slot, lock
+
+    def valid(self) -> bool:
+        """Слот досі містить цей кадр (писач не почав переписувати його)."""
+        return self._ring._lock_of(self._slot) == self._lock
+
+    def copy(self) -> Optional[np.ndarray]:
+        """Власна копія кадру або None, якщо його переписали під час копіювання."""
+        out = self.arr.copy()
+        return out if self.valid() else None
+
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        buf = shm.buf
+        magic, ver, self.nslots, h, w, c, self.stride, _ = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or ver != VERSION:
+            raise ValueError(f"{shm.name}: not a frame ring v{VERSION}")
+        self.shape = (h, w, c) if c > 1 else (h, w)
+        self._data_off = _align(HEADER_SIZE + self.nslots * META_SIZE)
+        self._arrays = []
+        for i in range(self.nslots):
+            a = np.ndarray(self.shape, np.uint8, buffer=buf, offset=self._data_off + i * self.stride)
+            if not owner:
+                a.flags.writeable = False
+            self._arrays.append(a)
+
+    # ========== створення/підключення ==========
+    @classmethod
+    def create(cls, shape: Tuple[int, ...], nslots: int = NSLOTS, name: str = RING_NAME) -> "FrameRing":
+        h, w = shape[:2]
+        c = shape[2] if len(shape) > 2 else 1
+        stride = _align(h * w * c)
+        size = _align(HEADER_SIZE + nslots * META_SIZE) + nslots * stride
+        try:
+            old = _attach_shm(name)           # хвіст від попереднього продюсера, що впав
+            old.close()
+            old.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name, create=True, size=size)
+        shm.buf[:HEADER_SIZE + nslots * META_SIZE] = bytes(HEADER_SIZE + nslots * META_SIZE)
+        HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, nslots, h, w, c, stride, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = RING_NAME) -> "FrameRing":
+        return cls(_attach_shm(name), owner=False)
+
+    def close(self):
+        self._arrays = []
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    # ========== писач ==========
+    def _meta_off(self, slot: int) -> int:
+        return HEADER_SIZE + slot * META_SIZE
+
+    def _lock_of(self, slot: int) -> int:
+        return _U64.unpack_from(self.shm.buf, self._meta_off(slot))[0]
+
+    def head(self) -> int:
+        """№ останнього повністю записаного кадру (0 — ще жодного)."""
+        return _U64.unpack_from(self.shm.buf, _HEAD_OFF)[0]
+
+    def write(self, img, t: Optional[float] = None, sensor_ts: int = 0,
+              exposure: int = 0, gain: float = 0.0) -> int:
+        buf = self.shm.buf
+        n = self.head() + 1
+        slot = n % self.nslots
+        off = self._meta_off(slot)
+        lock = _U64.unpack_from(buf, off)[0]
+        _U64.pack_into(buf, off, lock + 1)                 # непарний: слот у роботі
+        np.copyto(self._arrays[slot], img, casting="no")
+        META.pack_into(buf, off, lock + 1, n, time.monotonic() if t is None else t,
+                       int(sensor_ts), int(exposure), float(gain))
+        _U64.pack_into(buf, off, lock + 2)                 # парний: кадр n готовий
+        _U64.pack_into(buf, _HEAD_OFF, n)
+        return n
+
+    # ========== читачі ==========
+    def get(self, frame_no: int) -> Optional[FrameView]:
+        """Кадр frame_no, якщо він зараз у кільці й не пишеться; інакше None."""
+        slot = frame_no % self.nslots
+        off = self._meta_off(slot)
+        lock, no, t, sts, exp, gain = META.unpack_from(self.shm.buf, off)
+        if lock & 1 or no != frame_no:
+            return None
+        if self._lock_of(slot) != lock:
+            return None
+        return FrameView(self, slot, lock, no, t, sts, exp, gain)
+
+    def latest(self) -> Optional[FrameView]:
+        return self.get(self.head())
+
+
+class Consumer:
+    """Послідовне читання з обліком втрат: next() — наступний кадр, а при overrun — найновіший."""
+
+    def __init__(self, ring: FrameRing, from_latest: bool = True):
+        self.ring = ring
+        self.last = ring.head() if from_latest else 0
+        self.lost = 0            # кадри, які писач переписав раніше, ніж ми до них дійшли
+        self.overruns = 0        # скільки разів відставали більше ніж на кільце
+        self.torn = 0            # кадри, що виявились переписаними під час обробки (рахує check())
+
+    def next(self, timeout: float = 1.0, poll: float = 0.0005) -> Optional[FrameView]:
+        t_end = time.monotonic() + timeout
+        while True:
+            head = self.ring.head()
+            if head > self.last:
+                want = self.last + 1
+                oldest = head - self.ring.nslots + 2      # слот head+1 писач може вже переписувати
+                if want < oldest:
+                    # відстали на ціле кільце: наздоганяти старі кадри марно — беремо свіжий
+                    self.overruns += 1
+                    self.lost += head - want
+                    want = head
+                fv = self.ring.get(want)
+                self.last = want
+                if fv is not None:
+                    return fv
+                self.lost += 1
+                continue
+            if time.monotonic() >= t_end:
+                return None
+            time.sleep(poll)
+
+    def check(self, fv: FrameView) -> bool:
+        ok = fv.valid()
+        if not ok:
+            self.torn += 1
+        return ok
+
+
+def publish(camera, ring: FrameRing) -> threading.Thread:
+    """Потік: кожен кадр CameraService -> кільце (з експозицією/gain/SensorTimestamp)."""
+    def run():
+        last = 0
+        while camera.is_alive():
+            try:
+                no, ts, img = camera.next_frame(last)
+            except TimeoutError:
+                continue
+            last = no
+            md = camera.metadata(no)
+            ring.write(img, ts, md.get("SensorTimestamp", 0), md.get("ExposureTime", 0),
+                       md.get("AnalogueGain", 0.0))
+    th = threading.Thread(target=run, name="frame-ring-pub", daemon=True)
+    th.start()
+    return th
+
+
+# ========== перевірка ==========
+def _consume(idx: int, name: str, seconds: float, delay: float, out):
+    ring = FrameRing.attach(name)
+    c = Consumer(ring)
+    n = bad = 0
+    t_end = time.monotonic() + seconds
+    while time.monotonic() < t_end:
+        fv = c.next(0.5)
+        if fv is None:
+            continue
+        # синтетика: кожен піксель = № кадру & 0xFF; обробка — по представленню без копії
+        ok = int(fv.arr[::37, ::41].max()) == int(fv.arr[::37, ::41].min()) == (fv.frame_no & 0xFF)
+        if delay:
+            time.sleep(delay)
+        if c.check(fv):
+            n += 1
+            bad += not ok
+    out.put((idx, n, bad, c.lost, c.overruns, c.torn))
+    del fv
+    ring.close()
+
+
+def selftest(consumers: int = 2, seconds: float = 2.0, fps: float = 120.0) -> int:
+    import multiprocessing as mp
+    name = RING_NAME + "_test"
+    ring = FrameRing.create((480, 640, 3), nslots=4, name=name)
+    frame = np.empty(ring.shape, np.uint8)
+    q = mp.Queue()
+    # один читач встигає, другий навмисно повільніший за писача — має ловити overrun, а не биті кадри
+    procs = [mp.Process(target=_consume, args=(i, name, seconds, 0.0 if i == 0 else 2.0 / fps, q))
+             for i in range(consumers)]
+    for p in procs:
+        p.start()
+    time.sleep(0.3)
+    t_end = time.monotonic() + seconds + 0.3
+    deadline = time.monotonic()
+    n = 0
+    while time.monotonic() < t_end:
+        n += 1
+        frame.fill(n & 0xFF)
+        ring.write(frame, exposure=10000)
+        deadline += 1.0 / fps
+        d = deadline - time.monotonic()
+        if d > 0:
+            time.sleep(d)
+    res = sorted(q.get(timeout=5) for _ in procs)
+    for p in procs:
+        p.join()
+    ring.close()
+    ok = True
+    print(f"producer: {n} frames at {fps:.0f} fps")
+    for i, got, bad, lost, overruns, torn in res:
+        print(f"  consumer {i}: ok {got}  corrupt {bad}  lost {lost}  overruns {overruns}  torn {torn}")
+        ok &= bad == 0
+    ok &= res[-1][3] > 0                     # повільний читач помітив втрати
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    import sys
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "--selftest":
+        raise SystemExit(selftest())
+    if cmd == "produce":
+        from camera_service import CameraService
+        cam = CameraService()
+        cam.start()
+        first = cam.next_frame(timeout=5.0)
+        ring = FrameRing.create(first[2].shape)
+        publish(cam, ring)
+        print(f"ring {RING_NAME}: {ring.nslots} x {ring.shape}")
+        try:
+            while True:
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            cam.shutdown()
+            ring.close()
+    elif cmd == "consume":
+        ring = FrameRing.attach()
+        c = Consumer(ring)
+        t0, n = time.monotonic(), 0
+        try:
+            while True:
+                fv = c.next()
+                if fv is not None and c.check(fv):
+                    n += 1
+                if time.monotonic() - t0 >= 1.0:
+                    print(f"{n / (time.monotonic() - t0):5.1f} fps  lost {c.lost}  overruns {c.overruns}  torn {c.torn}")
+                    t0, n = time.monotonic(), 0
+        except KeyboardInterrupt:
+            pass
+        finally:
+            ring.close()
+    else:
+        print(__doc__)
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/line_follow.py
+"""
+Їзда по лінії з ізострічки: зір на низькій роздільності -> PD-регулятор -> steer_set + тяга.
+
+  python3 line_follow.py                        # камера 320x240 (CameraService), їде
+  python3 line_follow.py --source ring          # кадри з frame_ring (камера в іншому процесі)
+  python3 line_follow.py --source frames.npy    # записана послідовність (N,H,W[,3]) — без заліза
+  CAR_BACKEND=sim python3 line_follow.py --selftest
+
+Зір (LineDetector) — лише векторні операції numpy над поданням без копій:
+  ROI — нижня частина кадру, проріджена кроком decimate (зелений канал, без cvtColor);
+  поріг — за статистикою самого ROI (темна лінія на світлій підлозі, dark=False — навпаки);
+  ROI ділиться на смуги, у кожній — центр мас «лінійних» пікселів по стовпцях.
+  offset — центр нижньої смуги, -1..+1 (мінус — лінія лівіше); heading — нахил через
+  центри смуг, градуси (плюс — лінія йде вправо).
+На 640x480 з decimate=4 кадр обробляється за десятки-сотні мікросекунд — з запасом на 30+ fps.
+
+Регулятор (LineFollower): кермо = Kp·offset + Kd·d(offset)/dt + Kh·heading (у градусах керма,
+кламп по LEFT_MAX/RIGHT_MAX), швидкість падає на крутих поворотах; лінія загубилась довше
+за LOST_S — тяга в нуль. Тяга — через slew-лімітер, кермо/тяга годують cmd_watchdog.
+"""
+import math, time
+from typing import Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+ROI = (0.55, 1.0)          # частка висоти кадру: від .. до (низ — найближче до машини)
+DECIMATE = 4
+BANDS = 3
+MIN_FRACTION = 0.01        # менше «лінійних» пікселів у смузі — лінії в ній немає
+
+KP = 30.0                  # градусів керма на одиницю offset
+KD = 2.0                   # градусів на (offset/с)
+KH = 0.5                   # градусів керма на градус heading
+BASE_SPEED = 35
+MIN_SPEED = 20
+LOST_S = 0.3
+
+
+class LineEstimate(NamedTuple):
+    found: bool
+    offset: float            # -1..+1
+    heading: float           # градуси
+    fraction: float          # частка «лінійних» пікселів у ROI
+    proc_s: float            # час обробки кадру
+
+
+class LineDetector:
+    def __init__(self, roi=ROI, decimate: int = DECIMATE, bands: int = BANDS, dark: bool = True,
+                 min_fraction: float = MIN_FRACTION):
+        self.roi = roi
+        self.dec = max(1, int(decimate))
+        self.bands = bands
+        self.dark = dark
+        self.min_fraction = min_fraction
+        self._xs = None          # кеш координат стовпців під ширину ROI
+
+    def process(self, frame: np.ndarray) -> LineEstimate:
+        t0 = time.perf_counter()
+        h = frame.shape[0]
+        y0, y1 = int(h * self.roi[0]), int(h * self.roi[1])
+        d = self.dec
+        g = frame[y0:y1:d, ::d, 1] if frame.ndim == 3 else frame[y0:y1:d, ::d]   # подання, без копії
+        rows, cols = g.shape
+        # поріг посередині між середнім і крайнім значенням ROI — стійко до загальної яскравості
+        mean = g.mean()
+        ext = g.min() if self.dark else g.max()
+        thr = (mean + ext) * 0.5
+        mask = (g < thr) if self.dark else (g > thr)
+
+        if self._xs is None or self._xs.shape[0] != cols:
+            self._xs = np.arange(cols, dtype=np.float32)
+        band_h = max(1, rows // self.bands)
+        # суми по стовпцях для кожної смуги одним reshape: (смуги, рядки смуги, стовпці)
+        used = band_h * self.bands
+        per_band = mask[rows - used:].reshape(self.bands, band_h, cols).sum(axis=1, dtype=np.int32)
+        counts = per_band.sum(axis=1)
+        centers = (per_band @ self._xs) / np.maximum(counts, 1)
+        ok = counts >= self.min_fraction * band_h * cols
+        frac = float(counts.sum()) / float(used * cols)
+
+        if not ok[-1] or abs(ext - mean) < 8:           # у нижній смузі лінії немає / кадр однорідний
+            return LineEstimate(False, 0.0, 0.0, frac, time.perf_counter() - t0)
+        half = (cols - 1) * 0.5
+        offset = float((centers[-1] - half) / half)
+        idx = np.nonzero(ok)[0]
+        heading = 0.0
+        if idx.size >= 2:
+            # смуга i має центр на висоті (i + 0.5)·band_h; вгору по кадру — вперед по ходу
+            ys = (idx + 0.5) * band_h
+            k = np.polyfit(ys, centers[idx], 1)[0]          # dx/dy у пікселях ROI
+            heading = float(math.degrees(math.atan(-k)))
+        return LineEstimate(True, offset, heading, frac, time.perf_counter() - t0)
+
+
+class LineFollower:
+    def __init__(self, detector: Optional[LineDetector] = None, kp: float = KP, kd: float = KD, kh: float = KH,
+                 base_speed: float = BASE_SPEED, min_speed: float = MIN_SPEED, lost_s: float = LOST_S,
+                 actuate: bool = True):
+        self.det = detector or LineDetector()
+        self.kp, self.kd, self.kh = kp, kd, kh
+        self.base_speed, self.min_speed = base_speed, min_speed
+        self.lost_s = lost_s
+        self.actuate = actuate
+        self._prev: Optional[float] = None
+        self._prev_t = 0.0
+        self._seen_t: Optional[float] = None
+        self.steer = 0.0
+        self.speed = 0.0
+        self.proc: List[float] = []
+
+    def _limits(self):
+        import steering
+        return steering.LEFT_MAX, steering.RIGHT_MAX
+
+    def step(self, frame: np.ndarray, t: Optional[float] = None) -> LineEstimate:
+        t = time.monotonic() if t is None else t
+        est = self.det.process(frame)
+        self.proc.append(est.proc_s)
+        if est.found:
+            deriv = 0.0
+            if self._prev is not None and t > self._prev_t:
+                deriv = (est.offset - self._prev) / (t - self._prev_t)
+            self._prev, self._prev_t, self._seen_t = est.offset, t, t
+            left, right = self._limits()
+            s = self.kp * est.offset + self.kd * deriv + self.kh * est.heading
+            self.steer = max(-left, min(right, s))
+            turn = abs(self.steer) / max(left, right)
+            self.speed = self.base_speed - (self.base_speed - self.min_speed) * turn
+        elif self._seen_t is None or t - self._seen_t > self.lost_s:
+            self.speed = 0.0             # кермо лишаємо — лінія, найімовірніше, там, куди повертали
+            self._prev = None
+        if self.actuate:
+            self._apply()
+        return est
+
+    def _apply(self):
+        import cmd_watchdog as wd
+        from steering import steer_set
+        from slew import get_limiter
+        steer_set(self.steer)
+        get_limiter().set(self.speed, self.speed)
+        wd.feed("drive"); wd.feed("steering")
+
+    def stop(self):
+        if self.actuate:
+            import move
+            from slew import get_limiter
+            get_limiter().stop(hard=True)
+            move.motorStop()
+
+    def timing(self) -> dict:
+        s = sorted(self.proc)
+        if not s:
+            return {}
+        pick = lambda p: s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))] * 1e3
+        return {"frames": len(s), "p50_ms": pick(50), "p99_ms": pick(99), "max_ms": s[-1] * 1e3}
+
+
+# ========== джерела кадрів ==========
+def synthetic_frames(n: int = 300, size=(480, 640), fps: float = 30.0, noise: int = 6, seed: int = 0):
+    """Темна лінія на світлій підлозі, що гойдається і нахиляється; віддає (кадр, offset, heading)."""
+    h, w = size
+    rng = np.random.default_rng(seed)
+    ys = np.arange(h, dtype=np.float32)[:, None]
+    xs = np.arange(w, dtype=np.float32)[None, :]
+    lw = w * 0.05
+    for i in range(n):
+        t = i / fps
+        off = 0.6 * math.sin(2 * math.pi * 0.25 * t)           # у нижньому краї кадру
+        head = 20.0 * math.sin(2 * math.pi * 0.1 * t + 1.0)    # градуси
+        x_bottom = (off + 1.0) * 0.5 * (w - 1)
+        cx = x_bottom + (h - 1 - ys) * math.tan(math.radians(head))
+        img = np.where(np.abs(xs - cx) < lw, 40, 190).astype(np.int16)
+        img += rng.integers(-noise, noise + 1, size=img.shape, dtype=np.int16)
+        g = np.clip(img, 0, 255).astype(np.uint8)
+        yield np.repeat(g[:, :, None], 3, axis=2), off, head
+
+
+def file_frames(path: str) -> Iterator[np.ndarray]:
+    arr = np.load(path, mmap_mode="r")          # .npy (N,H,W[,3]) — кадри читаються з диска по одному
+    for f in arr:
+        yield f
+
+
+def camera_frames(size=(320, 240), fps: float = 30.0) -> Iterator[np.ndarray]:
+    from camera_service import CameraService
+    cam = CameraService(size=size, fps=fps, warmup=0.5)
+    cam.start()
+    cam.wait_ready(5.0)
+    last = 0
+    try:
+        while True:
+            no, _, img = cam.next_frame(last)
+            last = no
+            yield img
+    finally:
+        cam.shutdown()
+
+
+def ring_frames() -> Iterator[np.ndarray]:
+    from frame_ring import FrameRing, Consumer
+    c = Consumer(FrameRing.attach())
+    while True:
+        fv = c.next()
+        if fv is not None:
+            yield fv.arr                 # без копії; кадр встигне оброблятися за мікросекунди
+
+
+def selftest(n: int = 300) -> int:
+    fol = LineFollower(actuate=False)
+    errs, herr = [], []
+    for i, (frame, off, head) in enumerate(synthetic_frames(n)):
+        est = fol.step(frame, t=i / 30.0)
+        if est.found:
+            # offset детектора — центр нижньої смуги ROI, а не самий нижній рядок: зсув на нахил
+            errs.append(abs(est.offset - off))
+            herr.append(abs(est.heading - head))
+    tm = fol.timing()
+    e = sorted(errs)
+    print(f"{len(errs)}/{n} found, offset err p50 {e[len(e) // 2]:.3f} max {e[-1]:.3f}, "
+          f"heading err p50 {sorted(herr)[len(herr) // 2]:.1f} deg")
+    print(f"proc per frame: p50 {tm['p50_ms']:.3f} ms  p99 {tm['p99_ms']:.3f} ms  max {tm['max_ms']:.3f} ms")
+    ok = len(errs) == n and e[len(e) // 2] < 0.1 and tm["p99_ms"] < 1000.0 / 30
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--source", default="camera", help="camera | ring | synthetic | шлях до .npy")
+    ap.add_argument("--dry", action="store_true", help="лише зір, без керма/моторів")
+    ap.add_argument("--selftest", action="store_true")
+    ap.add_argument("--light-line", action="store_true", help="світла лінія на темній підлозі")
+    args = ap.parse_args()
+    if args.selftest:
+        raise SystemExit(selftest())
+
+    import startup
+    startup.begin("line_follow")
+    startup.mark("import")
+    if args.source == "camera":
+        frames = camera_frames()
+    elif args.source == "ring":
+        frames = ring_frames()
+    elif args.source == "synthetic":
+        frames = (f for f, _, _ in synthetic_frames(10 ** 9))
+    else:
+        frames = file_frames(args.source)
+    if not args.dry:
+        import cmd_watchdog as wd
+        wd.get_watchdog()
+    fol = LineFollower(LineDetector(dark=not args.light_line), actuate=not args.dry)
+    t_rep = time.monotonic()
+    n = 0
+    try:
+        for frame in frames:
+            est = fol.step(frame)
+            n += 1
+            now = time.monotonic()
+            if now - t_rep >= 1.0:
+                tm = fol.timing()
+                print(f"{n / (now - t_rep):5.1f} fps  proc p50 {tm['p50_ms']:.2f} ms p99 {tm['p99_ms']:.2f} ms  "
+                      f"{'LINE' if est.found else 'lost'} off {est.offset:+.2f} head {est.heading:+5.1f}  "
+                      f"steer {fol.steer:+5.1f} speed {fol.speed:4.0f}", flush=True)
+                t_rep, n = now, 0
+                fol.proc.clear()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fol.stop()
+        if fol.proc:
+            tm = fol.timing()
+            print(f"{tm['frames']} frames: proc p50 {tm['p50_ms']:.2f} ms p99 {tm['p99_ms']:.2f} ms max {tm['max_ms']:.2f} ms")
+        startup.print_report()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/motor_pwm.py
+"""
+Апаратний ШІМ для EN-пінів моторів замість програмного GPIO.PWM
+(той крутиться фоновим потоком, їсть CPU і «дрижить», коли зайнята камера).
+
+Обидва класи мають API RPi.GPIO.PWM: start / ChangeDutyCycle / ChangeFrequency / stop,
+тож move.py підставляє їх без змін у motor_left/motor_right/move.
+
+  SysfsPWM  — ядерний ШІМ через /sys/class/pwm (dtoverlay=pwm-2chan).
+              Апаратні канали є лише на GPIO12/13/18/19, тож EN треба перевести
+              на ці піни (на HAT 12 — LED, 13 — порт 3, 18 — Motor_B_Pin2; перевір розводку).
+  PigpioPWM — DMA-таймований ШІМ pigpiod на будь-якому піні (4/17 як є), без потоку в процесі.
+
+Вибір — move.MOTOR_PWM або CAR_MOTOR_PWM=soft|sysfs|pigpio.
+"""
+import os, time
+from typing import Optional
+
+SYSFS_ROOT = "/sys/class/pwm"
+
+
+class SysfsPWM:
+    def __init__(self, chip: int, channel: int, frequency: float = 1000.0,
+                 root: str = SYSFS_ROOT, export_timeout: float = 1.0):
+        self.chip_dir = os.path.join(root, f"pwmchip{chip}")
+        self.dir = os.path.join(self.chip_dir, f"pwm{channel}")
+        if not os.path.isdir(self.dir):
+            with open(os.path.join(self.chip_dir, "export"), "w") as f:
+                f.write(str(channel))
+            # udev може виставляти права на файли ще якийсь час після export
+            deadline = time.monotonic() + export_timeout
+            while not os.access(os.path.join(self.dir, "duty_cycle"), os.W_OK):
+                if time.monotonic() > deadline:
+                    raise OSError(f"pwm{channel} on pwmchip{chip} did not appear")
+                time.sleep(0.01)
+        self.channel = channel
+        # тримаємо файли відкритими: запис = один pwrite, без open/close на кожну команду
+        self._fd_period = os.open(os.path.join(self.dir, "period"), os.O_WRONLY)
+        self._fd_duty = os.open(os.path.join(self.dir, "duty_cycle"), os.O_WRONLY)
+        self._fd_enable = os.open(os.path.join(self.dir, "enable"), os.O_WRONLY)
+        self.period_ns = 0
+        self.duty_ns = -1
+        self.enabled = False
+        self.dc = 0.0
+        self._set_period(int(1e9 / frequency))
+
+    @staticmethod
+    def _put(fd: int, value: int):
+        os.pwrite(fd, b"%d\n" % value, 0)
+
+    def _set_period(self, period_ns: int):
+        if self.duty_ns > period_ns:            # ядро не дає period < duty_cycle
+            self._put(self._fd_duty, 0)
+            self.duty_ns = 0
+        self._put(self._fd_period, period_ns)
+        self.period_ns = period_ns
+
+    def ChangeFrequency(self, frequency: float):
+        self._set_period(int(1e9 / frequency))
+        self.ChangeDutyCycle(self.dc)
+
+    def ChangeDutyCycle(self, dc: float):
+        self.dc = float(dc)
+        duty_ns = int(self.period_ns * min(max(self.dc, 0.0), 100.0) / 100.0)
+        if duty_ns != self.duty_ns:
+            self._put(self._fd_duty, duty_ns)
+            self.duty_ns = duty_ns
+
+    def start(self, dc: float):
+        self.ChangeDutyCycle(dc)
+        if not self.enabled:
+            self._put(self._fd_enable, 1)
+            self.enabled = True
+
+    def stop(self):
+        if self.enabled:
+            self._put(self._fd_enable, 0)
+            self.enabled = False
+
+    def close(self, unexport: bool = True):
+        self.stop()
+        for fd in (self._fd_period, self._fd_duty, self._fd_enable):
+            os.close(fd)
+        if unexport:
+            try:
+                with open(os.path.join(self.chip_dir, "unexport"), "w") as f:
+                    f.write(str(self.channel))
+            except OSError:
+                pass
+
+
+class PigpioPWM:
+    RANGE = 1000          # роздільність duty: 0.1%
+
+    _pi = None
+
+    def __init__(self, pin: int, frequency: float = 1000.0, pi=None):
+        if pi is None:
+            if PigpioPWM._pi is None:
+                import pigpio
+                PigpioPWM._pi = pigpio.pi()
+                if not PigpioPWM._pi.connected:
+                    raise OSError("pigpiod is not running (sudo systemctl start pigpiod)")
+            pi = PigpioPWM._pi
+        self.pi = pi
+        self.pin = pin
+        self.pi.set_PWM_range(pin, self.RANGE)
+        self.pi.set_PWM_frequency(pin, int(frequency))
+        self.dc = 0.0
+        self._raw: Optional[int] = None
+
+    def ChangeFrequency(self, frequency: float):
+        self.pi.set_PWM_frequency(self.pin, int(frequency))
+
+    def ChangeDutyCycle(self, dc: float):
+        self.dc = float(dc)
+        raw = int(min(max(self.dc, 0.0), 100.0) * self.RANGE / 100.0)
+        if raw != self._raw:
+            self.pi.set_PWM_dutycycle(self.pin, raw)
+            self._raw = raw
+
+    def start(self, dc: float):
+        self.ChangeDutyCycle(dc)
+
+    def stop(self):
+        self.pi.set_PWM_dutycycle(self.pin, 0)
+        self._raw = 0
+
+
+def make_fake_sysfs(root: str, chips: int = 1, npwm: int = 2) -> str:
+    """
+    Дерево як /sys/class/pwm у звичайній теці (для прогонів без Pi).
+    Канали створені наперед — на звичайній ФС export їх не «народить».
+    """
+    for c in range(chips):
+        chip = os.path.join(root, f"pwmchip{c}")
+        os.makedirs(chip, exist_ok=True)
+        for name, val in (("export", ""), ("unexport", ""), ("npwm", str(npwm))):
+            with open(os.path.join(chip, name), "w") as f:
+                f.write(val)
+        for ch in range(npwm):
+            d = os.path.join(chip, f"pwm{ch}")
+            os.makedirs(d, exist_ok=True)
+            for name in ("period", "duty_cycle", "enable"):
+                with open(os.path.join(d, name), "w") as f:
+                    f.write("0\n")
+    return root
+
+
+if __name__ == "__main__":
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        make_fake_sysfs(tmp)
+        pwm = SysfsPWM(0, 1, 1000, root=tmp)
+        pwm.start(0)
+        for dc in (25, 25, 60, 100, 0):
+            pwm.ChangeDutyCycle(dc)
+        pwm.ChangeFrequency(2000)
+        d = os.path.join(tmp, "pwmchip0", "pwm1")
+        # pwrite пише з нуля без обрізання — у звичайному файлі значення в першому рядку
+        print({n: open(os.path.join(d, n)).read().split()[0] for n in ("period", "duty_cycle", "enable")})
+        pwm.close()
@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
-import time
+import os
 import atexit
-import RPi.GPIO as GPIO
+import threading
+from time import perf_counter
+import backend
+import startup
+import recorder
+import telemetry
 
-GPIO.setwarnings(False)
+GPIO = None          # RPi.GPIO імпортується в setup() — імпорт move.py нічого не чіпає
 
 _initialized = False
 
@@ -17,6 +22,13 @@ Motor_A_Pin2  = 21
 Motor_B_Pin1  = 27
 Motor_B_Pin2  = 18  # ⚠️ не використовуй одночасно для WS2812!
 
+# ШІМ на EN: "soft" — GPIO.PWM (потік у процесі), "sysfs" — ядерний /sys/class/pwm,
+# "pigpio" — DMA-таймований pigpiod (див. motor_pwm.py)
+MOTOR_PWM      = os.environ.get("CAR_MOTOR_PWM", "soft")
+PWM_FREQ_HZ    = 1000
+SYSFS_PWM_ROOT = "/sys/class/pwm"
+SYSFS_PWM      = {"A": (0, 0), "B": (0, 1)}   # мотор -> (pwmchip, канал); EN мають бути на GPIO12/13/18/19
+
 Dir_forward   = 0
 Dir_backward  = 1
 
@@ -28,21 +40,43 @@ right_backward= Dir_backward
 pwm_A = None
 pwm_B = None
 
+class _Motor:
+    """Що зараз виставлено на виходах мотора (None — невідомо, перший запис піде безумовно)."""
+    __slots__ = ("pwm", "in1", "in2", "pins", "duty")
+
+    def __init__(self, in1, in2):
+        self.pwm = None
+        self.in1, self.in2 = in1, in2
+        self.pins = None     # (in1, in2)
+        self.duty = None
+
+motor_A = _Motor(Motor_A_Pin1, Motor_A_Pin2)   # правий
+motor_B = _Motor(Motor_B_Pin1, Motor_B_Pin2)   # лівий
+_TEL_A = telemetry.channel("motor.A")
+_TEL_B = telemetry.channel("motor.B")
+_lock = threading.Lock()     # кеш стану моторів + запис у GPIO/PWM — атомарно
+
+# лічильники: скільки записів реально пішло і скільки зекономили
+_stats = {"commands": 0, "pin_writes": 0, "pin_skipped": 0,
+          "duty_writes": 0, "duty_skipped": 0, "reversals": 0}
+
+def stats():
+    return dict(_stats)
+
+def reset_stats():
+    for k in _stats: _stats[k] = 0
+
 def motorStop():
     # викликаємо тільки коли GPIO активний
-    if GPIO.getmode() is None:
+    if GPIO is None or GPIO.getmode() is None:
         return
-    GPIO.output(Motor_A_Pin1, GPIO.LOW)
-    GPIO.output(Motor_A_Pin2, GPIO.LOW)
-    GPIO.output(Motor_B_Pin1, GPIO.LOW)
-    GPIO.output(Motor_B_Pin2, GPIO.LOW)
-    GPIO.output(Motor_A_EN, GPIO.LOW)
-    GPIO.output(Motor_B_EN, GPIO.LOW)
+    # EN окремо не чіпаємо: duty=0 на PWM і так тримає його в LOW
+    _apply_motor((motor_A, Dir_forward, 0), (motor_B, Dir_forward, 0))
 
 def _cleanup():
     """Безпечне завершення при виході"""
     try:
-        if GPIO.getmode() is not None:   # режим виставлений
+        if GPIO is not None and GPIO.getmode() is not None:   # режим виставлений
             motorStop()
             try:
                 pwm_A and pwm_A.stop()
@@ -54,44 +88,123 @@ def _cleanup():
         # глушимо будь-яку помилку на виході, щоб не засмічувати лог
         pass
 
-def setup():
-    global pwm_A, pwm_B, _initialized
+def _make_pwm(pin, motor, kind):
+    if kind == "sysfs":
+        from motor_pwm import SysfsPWM
+        chip, ch = SYSFS_PWM[motor]
+        return SysfsPWM(chip, ch, PWM_FREQ_HZ, root=SYSFS_PWM_ROOT)
+    if kind == "pigpio":
+        from motor_pwm import PigpioPWM
+        return PigpioPWM(pin, PWM_FREQ_HZ)
+    return GPIO.PWM(pin, PWM_FREQ_HZ)
+
+def setup(pwm_backend=None):
+    """pwm_backend: "soft" | "sysfs" | "pigpio" (за замовчуванням MOTOR_PWM)."""
+    global GPIO, pwm_A, pwm_B, _initialized
     if _initialized:
         return
-    GPIO.setmode(GPIO.BCM)
-    for pin in (Motor_A_EN, Motor_B_EN, Motor_A_Pin1, Motor_A_Pin2, Motor_B_Pin1, Motor_B_Pin2):
-        GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
-    pwm_A = GPIO.PWM(Motor_A_EN, 1000); pwm_A.start(0)
-    pwm_B = GPIO.PWM(Motor_B_EN, 1000); pwm_B.start(0)
+    kind = pwm_backend or MOTOR_PWM
+    with startup.hw("gpio-motors"):
+        GPIO = backend.gpio()          # RPi.GPIO або SimGPIO (CAR_BACKEND=sim)
+        GPIO.setwarnings(False)
+        GPIO.setmode(GPIO.BCM)
+        pins = [Motor_A_Pin1, Motor_A_Pin2, Motor_B_Pin1, Motor_B_Pin2]
+        if kind == "soft":
+            pins += [Motor_A_EN, Motor_B_EN]   # апаратним ШІМ піни EN налаштовує ядро/pigpiod
+        for pin in pins:
+            GPIO.setup(pin, GPIO.OUT, initial=GPIO.LOW)
+        pwm_A = _make_pwm(Motor_A_EN, "A", kind); pwm_A.start(0)
+        pwm_B = _make_pwm(Motor_B_EN, "B", kind); pwm_B.start(0)
+        motor_A.pwm, motor_B.pwm = pwm_A, pwm_B
+        for m in (motor_A, motor_B):
+            m.pins, m.duty = (GPIO.LOW, GPIO.LOW), 0
     atexit.register(_cleanup)   # реєструємо після успішного setup
     _initialized = True
 
-def _apply_motor(en_pwm, in1, in2, direction, duty):
-    # direction = Dir_forward/backward ; duty=0..100
+def _target_pins(direction, duty):
     if duty <= 0:
-        GPIO.output(in1, GPIO.LOW)
-        GPIO.output(in2, GPIO.LOW)
-        en_pwm.ChangeDutyCycle(0)
-        return
+        return (GPIO.LOW, GPIO.LOW)
     if direction == Dir_forward:
-        GPIO.output(in1, GPIO.LOW)
-        GPIO.output(in2, GPIO.HIGH)
-    else:
-        GPIO.output(in1, GPIO.HIGH)
-        GPIO.output(in2, GPIO.LOW)
-    en_pwm.ChangeDutyCycle(duty)
+        return (GPIO.LOW, GPIO.HIGH)
+    return (GPIO.HIGH, GPIO.LOW)
+
+def _set_duty(m, duty):
+    if m.duty == duty:
+        _stats["duty_skipped"] += 1
+        return
+    m.pwm.ChangeDutyCycle(duty)
+    m.duty = duty
+    _stats["duty_writes"] += 1
+
+def _apply_motor(*cmds):
+    """
+    cmds: (мотор, direction, duty 0..100) для одного або обох моторів.
+    Пише лише те, що змінилося; напрямні піни обох моторів — одним GPIO.output.
+    Реверс: спершу гальмо (duty=0, IN1=IN2=LOW), потім новий напрямок і duty.
+    Викликається з кількох потоків (головний, slew, cmd_watchdog): порівняння з кешем
+    (m.pins/m.duty) і запис — під _lock, інакше запис губиться або йде не в тому порядку.
+    """
+    t0 = perf_counter()
+    startup.actuated()
+    with _lock:
+        _stats["commands"] += 1
+        rec = recorder.active
+        if rec is not None:
+            for m, direction, duty in cmds:
+                rec.motor("A" if m is motor_A else "B", direction, duty)
+        plan = [(m, _target_pins(direction, duty), duty if duty > 0 else 0) for m, direction, duty in cmds]
+
+        # 1) зняти тягу там, де вона падає в нуль або де міняється напрямок
+        brake_pins, brake_vals = [], []
+        for m, pins, duty in plan:
+            reversing = (duty > 0 and m.pins is not None and m.pins != pins
+                         and m.pins != (GPIO.LOW, GPIO.LOW))
+            if duty == 0 or reversing:
+                _set_duty(m, 0)
+            if reversing:
+                _stats["reversals"] += 1
+                brake_pins += [m.in1, m.in2]; brake_vals += [GPIO.LOW, GPIO.LOW]
+                m.pins = (GPIO.LOW, GPIO.LOW)
+        if brake_pins:
+            GPIO.output(brake_pins, brake_vals)
+            _stats["pin_writes"] += len(brake_pins)
+
+        # 2) напрямні піни всіх моторів — одним записом
+        out_pins, out_vals = [], []
+        for m, pins, duty in plan:
+            if m.pins == pins:
+                _stats["pin_skipped"] += 2
+                continue
+            out_pins += [m.in1, m.in2]; out_vals += list(pins)
+            m.pins = pins
+        if out_pins:
+            GPIO.output(out_pins, out_vals)
+            _stats["pin_writes"] += len(out_pins)
+
+        # 3) тяга
+        for m, pins, duty in plan:
+            if duty > 0:
+                _set_duty(m, duty)
+
+        tel = telemetry.active
+        if tel is not None:
+            dt = perf_counter() - t0
+            for m, direction, duty in cmds:      # знакове duty: - назад
+                tel.record(_TEL_A if m is motor_A else _TEL_B, -duty if direction == Dir_backward else duty, dt)
 
 def motor_left(status, direction, speed):
+    if not _initialized: setup()   # ліниво: залізо — при першій команді
     if status == 0:
-        _apply_motor(pwm_B, Motor_B_Pin1, Motor_B_Pin2, Dir_forward, 0)
+        _apply_motor((motor_B, Dir_forward, 0))
     else:
-        _apply_motor(pwm_B, Motor_B_Pin1, Motor_B_Pin2, direction, speed)
+        _apply_motor((motor_B, direction, speed))
 
 def motor_right(status, direction, speed):
+    if not _initialized: setup()
     if status == 0:
-        _apply_motor(pwm_A, Motor_A_Pin1, Motor_A_Pin2, Dir_forward, 0)
+        _apply_motor((motor_A, Dir_forward, 0))
     else:
-        _apply_motor(pwm_A, Motor_A_Pin1, Motor_A_Pin2, direction, speed)
+        _apply_motor((motor_A, direction, speed))
 
 def move(speed, direction, turn, radius=0.6):
     # speed: 0..100 ; radius: (0,1]
@@ -115,30 +228,32 @@ def move(speed, direction, turn, radius=0.6):
             motorStop(); return
     else:
         return
-    motor_left(1, ld, ls)
-    motor_right(1, rd, rs)
+    if not _initialized: setup()
+    _apply_motor((motor_B, ld, ls), (motor_A, rd, rs))   # обидва мотори одним пакетом
 
-def ramp_to(speed_target, step=5, dt=0.03):
-    # плавна зміна тяги для обох моторів (вперед)
-    for s in range(0, speed_target+1, step):
-        motor_left(1, left_forward, s)
-        motor_right(1, right_forward, s)
-        time.sleep(dt)
+def ramp_to(speed_target, step=5, dt=0.03, wait=True):
+    # плавна зміна тяги для обох моторів: від ПОТОЧНОЇ тяги, в будь-який бік (знакова -100..100),
+    # темп step/dt %/с; робить фоновий slew.SlewLimiter, wait=False — не блокує
+    from slew import get_limiter
+    lim = get_limiter()
+    lim.set(speed_target, speed_target, accel=step / float(dt))
+    if wait:
+        lim.wait()
 
 if __name__ == "__main__":
     try:
         setup()
         speed = 50
         ramp_to(60)
-        time.sleep(0.8)
-
-        move(speed, 'forward', 'no', 1.0); time.sleep(3.0)
-        move(speed, 'backward', 'no', 1.0); time.sleep(3.0)
-        # move(speed, 'forward', 'right', 0.7); time.sleep(1.0)
-        # move(speed, 'forward', 'left', 0.7);  time.sleep(1.0)
-        # move(speed, 'backward', 'no', 0.8);   time.sleep(1.0)
-        # move(speed, 'no', 'right', 0.8);      time.sleep(1.0)
-        # move(speed, 'no', 'left', 0.8);       time.sleep(1.0)
+        backend.sleep(0.8)
+
+        move(speed, 'forward', 'no', 1.0); backend.sleep(3.0)
+        move(speed, 'backward', 'no', 1.0); backend.sleep(3.0)
+        # move(speed, 'forward', 'right', 0.7); backend.sleep(1.0)
+        # move(speed, 'forward', 'left', 0.7);  backend.sleep(1.0)
+        # move(speed, 'backward', 'no', 0.8);   backend.sleep(1.0)
+        # move(speed, 'no', 'right', 0.8);      backend.sleep(1.0)
+        # move(speed, 'no', 'left', 0.8);       backend.sleep(1.0)
 
         motorStop()
     except KeyboardInterrupt:
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/pca_bus.py
+"""
+Єдиний власник PCA9685 на процес: кермо, рука і сервісні скрипти більше не
+створюють власні busio.I2C + ServoKit на 0x40, а пишуть через get_bus().
+
+- Уся робота з чипом іде через один потік з пріоритетною чергою.
+  Менше число = вищий пріоритет: кермо (PRIO_STEER) записується раніше за руку.
+- Усе, що назбиралося за час попереднього запису, зливається: по одному
+  FrameWriter-кадру на рівень пріоритету (останнє значення каналу перемагає).
+- bus.channel(ch) — ручка з .duty_cycle/.frequency, тобто drop-in заміна
+  pca.channels[ch] (підходить для adafruit_motor.servo.Servo).
+- bus.frame(prio) — буфер кадру з тим самим API, що й FrameWriter (Arm).
+"""
+import time, heapq, itertools, threading
+from typing import Dict, List, Optional, Tuple
+
+import backend
+import startup
+from pca_frame import FrameWriter, FREQUENCY_HZ, MODE1, MODE1_AI
+
+PRIO_STEER = 0
+PRIO_ARM   = 10
+PRIO_RAW   = 20
+
+PRESCALE       = 0xFE
+MODE1_SLEEP    = 0x10
+MODE1_RESTART  = 0x80
+OSC_HZ         = 25000000
+
+
+class ChannelHandle:
+    """Один канал PCA9685 через шину-власника (API як у adafruit_pca9685.PWMChannel)."""
+
+    def __init__(self, bus: "PcaBus", ch: int, priority: int):
+        self._bus = bus
+        self._ch = ch
+        self._prio = priority
+        self._duty = 0
+
+    @property
+    def frequency(self) -> float:
+        return self._bus.frequency
+
+    @property
+    def duty_cycle(self) -> int:
+        return self._duty        # останнє записане, без читання з шини
+
+    @duty_cycle.setter
+    def duty_cycle(self, value: int):
+        self._duty = int(value)
+        self._bus.submit({self._ch: self._duty}, self._prio)
+
+
+class BusFrame:
+    """Буфер кадру клієнта шини: set_duty()... flush() — одна команда в черзі."""
+
+    def __init__(self, bus: "PcaBus", priority: int):
+        self._bus = bus
+        self._prio = priority
+        self._pending: Dict[int, int] = {}
+
+    @property
+    def frequency(self) -> float:
+        return self._bus.frequency
+
+    def set_duty(self, ch: int, duty: int):
+        self._pending[ch] = int(duty)
+
+    def flush(self, wait: bool = False) -> Optional[threading.Event]:
+        if not self._pending:
+            return None
+        pending, self._pending = self._pending, {}
+        return self._bus.submit(pending, self._prio, wait)
+
+    def read_duty(self, ch: int) -> int:
+        return self._bus.read_duty(ch)
+
+
+class PcaBus(threading.Thread):
+    def __init__(self, i2c, address: int = 0x40, frequency: float = FREQUENCY_HZ,
+                 threaded: bool = True):
+        super().__init__(name=f"pca9685@0x{address:02x}", daemon=True)
+        self.i2c = i2c
+        self.address = address
+        self.frequency = float(frequency)
+        self.writer = FrameWriter(i2c, address, self.frequency)
+        self._io = threading.Lock()                        # тримає потік під час запису; read_duty теж
+        self._cv = threading.Condition()
+        self._queue: List[Tuple[int, int, Dict[int, int], Optional[threading.Event]]] = []
+        self._seq = itertools.count()
+        self._running = True
+        self.threaded = threaded        # False — запис одразу в потоці того, хто викликав (детермінізм для симулятора)
+        self.batches = 0
+        self.commands = 0
+        self._init_chip()
+        if threaded:
+            self.start()
+
+    # ---------- ініціалізація (те саме, що PCA9685.reset() + .frequency)
+    def _init_chip(self):
+        w = self.writer
+        # без «-1» з даташиту — як у adafruit_pca9685, щоб не зсунути вже відкалібровані кути
+        prescale = int(OSC_HZ / 4096.0 / self.frequency + 0.5)
+        w._write(bytes([MODE1, 0x00]))
+        w._write(bytes([MODE1, MODE1_SLEEP]))
+        w._write(bytes([PRESCALE, prescale]))
+        w._write(bytes([MODE1, 0x00]))
+        backend.sleep(0.005)
+        w._write(bytes([MODE1, MODE1_RESTART | MODE1_AI]))
+
+    # ---------- клієнтське API
+    def submit(self, updates: Dict[int, int], priority: int = PRIO_RAW,
+               wait: bool = False) -> Optional[threading.Event]:
+        """Поставити {канал: 16-бітний duty} у чергу. wait=True -> повертає Event «записано»."""
+        ev = threading.Event() if wait else None
+        startup.actuated()
+        if not self.threaded:
+            self._write_batch([(priority, 0, updates, ev)])
+            return ev
+        with self._cv:
+            heapq.heappush(self._queue, (priority, next(self._seq), dict(updates), ev))
+            self._cv.notify()
+        return ev
+
+    def channel(self, ch: int, priority: int = PRIO_RAW) -> ChannelHandle:
+        return ChannelHandle(self, ch, priority)
+
+    def frame(self, priority: int = PRIO_RAW) -> BusFrame:
+        return BusFrame(self, priority)
+
+    def read_duty(self, ch: int) -> int:
+        with self._io:
+            return self.writer.read_duty(ch)
+
+    def close(self, off: bool = True):
+        """Зупинити потік; off=True — вимкнути всі 16 каналів (як pca.deinit() для серв).
+        Шина виходить з реєстру: наступний get_bus() підніме нову, а не віддасть мертву."""
+        with _buses_lock:
+            if _buses.get(self.address) is self:
+                del _buses[self.address]
+        if off:
+            self.submit({ch: 0 for ch in range(16)}, PRIO_STEER, wait=True).wait(1.0)
+        with self._cv:
+            self._running = False
+            self._cv.notify()
+        if self.is_alive():
+            self.join(1.0)
+
+    # ---------- потік-власник
+    def run(self):
+        while True:
+            with self._cv:
+                while self._running and not self._queue:
+                    self._cv.wait()
+                if not self._running and not self._queue:
+                    return
+                batch, self._queue = sorted(self._queue), []
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        events = []
+        with self._io:
+            level = None
+            for prio, _, updates, ev in batch:            # batch відсортований: пріоритет, потім порядок
+                if level is not None and prio != level:
+                    self.writer.flush()                   # вищий пріоритет іде окремим кадром раніше
+                level = prio
+                for ch, duty in updates.items():
+                    self.writer.set_duty(ch, duty)
+                if ev is not None:
+                    events.append(ev)
+            self.writer.flush()
+        self.batches += 1
+        self.commands += len(batch)
+        for ev in events:
+            ev.set()
+
+
+_buses: Dict[int, PcaBus] = {}
+_buses_lock = threading.Lock()
+
+
+def get_bus(address: int = 0x40, i2c=None) -> PcaBus:
+    """Спільна шина для адреси (створюється при першому виклику)."""
+    with _buses_lock:
+        bus = _buses.get(address)
+        if bus is None:
+            with startup.hw("pca9685"):
+                if i2c is None:
+                    i2c = backend.i2c()          # busio.I2C (важкий імпорт — лише тут) або SimPCA9685
+                # на віртуальному годиннику потік-власник не встигав би «жити» між sleep'ами
+                threaded = not isinstance(backend.clock, backend.VirtualClock)
+                bus = _buses[address] = PcaBus(i2c, address, threaded=threaded)
+        return bus
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/pca_frame.py
+"""
+Покадровий запис у PCA9685: усі зміни каналів за один тік збираються,
+незмінні канали відкидаються, решта йде одним auto-increment burst'ом
+(LEDn_ON_L .. LEDm_OFF_H) замість окремої I2C-транзакції на кожне серво.
+
+FakeI2C — заглушка шини з лічильниками транзакцій/байтів, щоб міряти
+виграш без заліза (див. __main__).
+"""
+import struct
+from typing import Dict, List, Optional, Tuple
+
+# --- регістри PCA9685
+MODE1      = 0x00
+LED0_ON_L  = 0x06
+MODE1_AI   = 0x20          # auto-increment
+FULL_BIT   = 0x1000        # біт 4 у LEDn_ON_H / LEDn_OFF_H
+
+FREQUENCY_HZ = 50          # ServoKit за замовчуванням ставить 50 Гц
+
+
+def servo_duty(angle: float, actuation_range: float, pulse_us: Tuple[int, int],
+               frequency: float = FREQUENCY_HZ) -> int:
+    """Кут -> 16-бітний duty_cycle (та сама математика, що в adafruit_motor.servo)."""
+    min_us, max_us = pulse_us
+    min_duty = int((min_us * frequency) / 1000000 * 0xFFFF)
+    max_duty = (max_us * frequency) / 1000000 * 0xFFFF
+    duty_range = int(max_duty - min_duty)
+    return min_duty + int(angle / float(actuation_range) * duty_range)
+
+
+def duty_to_regs(duty: int) -> Tuple[int, int]:
+    """16-бітний duty -> (ON, OFF) як у adafruit_pca9685.PWMChannel.duty_cycle."""
+    if duty >= 0xFFFF:
+        return (FULL_BIT, 0)        # повністю увімкнено
+    if duty < 0x0010:
+        return (0, FULL_BIT)        # повністю вимкнено
+    return (0, duty >> 4)
+
+
+def regs_to_duty(on: int, off: int) -> int:
+    """Зворотне перетворення (для читання з заліза)."""
+    if on & FULL_BIT:
+        return 0xFFFF
+    if off & FULL_BIT:
+        return 0
+    return (off & 0x0FFF) << 4
+
+
+class FrameWriter:
+    """
+    Збирає оновлення каналів за тік і шле їх одним записом.
+
+      fw.set_duty(ch, duty)   # 16-бітний duty, як channel.duty_cycle
+      fw.flush()              # один burst (або кілька, якщо є «дірки»)
+
+    Канали, чиї регістри не змінилися з попереднього flush, пропускаються.
+    Проміжок між змінними каналами заповнюється вже відомими значеннями
+    (щоб не рвати burst), а невідомий канал рве burst на дві транзакції —
+    чужі канали (напр. кермо) ми не перезаписуємо.
+    """
+
+    def __init__(self, i2c, address: int = 0x40, frequency: float = FREQUENCY_HZ):
+        self.i2c = i2c
+        self.address = address
+        self.frequency = frequency
+        self._regs: Dict[int, Tuple[int, int]] = {}      # що зараз у чипі (за нашими даними)
+        self._pending: Dict[int, Tuple[int, int]] = {}
+        self.frames = 0
+        self.writes = 0          # канали, реально відправлені
+        self.skipped = 0         # канали, відкинуті як незмінні
+        self.transactions = 0
+
+    # ---------- низький рівень
+    def _write(self, buf: bytes):
+        while not self.i2c.try_lock():
+            pass
+        try:
+            self.i2c.writeto(self.address, buf)
+        finally:
+            self.i2c.unlock()
+        self.transactions += 1
+
+    def _read(self, reg: int, n: int) -> bytes:
+        out = bytearray(n)
+        while not self.i2c.try_lock():
+            pass
+        try:
+            self.i2c.writeto_then_readfrom(self.address, bytes([reg]), out)
+        finally:
+            self.i2c.unlock()
+        self.transactions += 1
+        return bytes(out)
+
+    def enable_auto_increment(self):
+        """Переконатися, що MODE1.AI стоїть (adafruit_pca9685 ставить його разом із частотою)."""
+        mode = self._read(MODE1, 1)[0]
+        if not mode & MODE1_AI:
+            self._write(bytes([MODE1, mode | MODE1_AI]))
+
+    # ---------- кадр
+    def set_duty(self, ch: int, duty: int):
+        self._pending[ch] = duty_to_regs(int(duty))
+
+    def forget(self, ch: Optional[int] = None):
+        """Забути кеш каналу (або всіх) — наступний запис піде безумовно."""
+        if ch is None:
+            self._regs.clear()
+        else:
+            self._regs.pop(ch, None)
+
+    def read_duty(self, ch: int) -> int:
+        """Прочитати duty каналу з чипа і оновити кеш."""
+        on, off = struct.unpack("<HH", self._read(LED0_ON_L + 4 * ch, 4))
+        self._regs[ch] = (on, off)
+        return regs_to_duty(on, off)
+
+    def _runs(self, changed: List[int], values: Dict[int, Tuple[int, int]]) -> List[List[int]]:
+        runs: List[List[int]] = []
+        for ch in changed:
+            if runs:
+                last = runs[-1][-1]
+                gap = range(last + 1, ch)
+                if all(g in values for g in gap):
+                    runs[-1].extend(gap)
+                    runs[-1].append(ch)
+                    continue
+            runs.append([ch])
+        return runs
+
+    def flush(self) -> int:
+        """Відправити кадр. Повертає кількість I2C-транзакцій."""
+        pending, self._pending = self._pending, {}
+        changed = sorted(ch for ch, r in pending.items() if self._regs.get(ch) != r)
+        self.skipped += len(pending) - len(changed)
+        if not changed:
+            return 0
+        values = dict(self._regs)
+        values.update(pending)
+        n = 0
+        for run in self._runs(changed, values):
+            buf = bytearray([LED0_ON_L + 4 * run[0]])
+            for ch in run:
+                buf += struct.pack("<HH", *values[ch])
+            self._write(bytes(buf))
+            n += 1
+        self._regs.update(pending)
+        self.writes += len(changed)
+        self.frames += 1
+        return n
+
+    def stats(self) -> Dict[str, int]:
+        return {"frames": self.frames, "writes": self.writes,
+                "skipped": self.skipped, "transactions": self.transactions}
+
+
+class FakeI2C:
+    """
+    Заглушка busio.I2C з образом регістрів PCA9685 (auto-increment) і лічильниками.
+    Емулює лише запис/читання регістрів (без reset/prescale) — для FrameWriter цього досить.
+    """
+
+    def __init__(self):
+        self.regs = bytearray(256)
+        self.regs[MODE1] = MODE1_AI
+        self.transactions = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self._locked = False
+
+    def try_lock(self) -> bool:
+        if self._locked:
+            return False
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    def _store(self, buf) -> int:
+        reg = buf[0]
+        step = 1 if self.regs[MODE1] & MODE1_AI else 0
+        for i, b in enumerate(buf[1:]):
+            self.regs[(reg + i * step) & 0xFF] = b
+        return reg
+
+    def writeto(self, address, buffer, *, start=0, end=None):
+        buf = bytes(buffer[start:end])
+        self.transactions += 1
+        self.bytes_written += len(buf)
+        if buf:
+            self._store(buf)
+
+    def writeto_then_readfrom(self, address, buffer_out, buffer_in, *,
+                              out_start=0, out_end=None, in_start=0, in_end=None):
+        out = bytes(buffer_out[out_start:out_end])
+        self.transactions += 1
+        self.bytes_written += len(out)
+        reg = self._store(out)
+        end = len(buffer_in) if in_end is None else in_end
+        for i in range(in_start, end):
+            buffer_in[i] = self.regs[(reg + i - in_start) & 0xFF]
+        self.bytes_read += end - in_start
+
+    def reset_counters(self):
+        self.transactions = self.bytes_written = self.bytes_read = 0
+
+
+if __name__ == "__main__":
+    # Порівняння: 4 суглоби × 20 кроків, по-канально vs кадрами.
+    import math
+    JOINTS = {"gripper": 0, "shoulder": 1, "base": 2, "wrist": 4}
+    PULSE = (600, 2400)
+    STEPS = 20
+    goals = {"gripper": 30.0, "shoulder": -20.0, "base": 0.0, "wrist": 15.0}
+
+    def samples():
+        for k in range(1, STEPS + 1):
+            a = 0.5 - 0.5 * math.cos(math.pi * k / STEPS)
+            yield {j: 90 + g * a for j, g in goals.items()}
+
+    naive = FakeI2C()
+    for frame in samples():
+        for j, ang in frame.items():
+            on, off = duty_to_regs(servo_duty(ang, 360, PULSE))
+            naive.writeto(0x40, bytes([LED0_ON_L + 4 * JOINTS[j]]) + struct.pack("<HH", on, off))
+
+    bus = FakeI2C()
+    fw = FrameWriter(bus)
+    for frame in samples():
+        for j, ang in frame.items():
+            fw.set_duty(JOINTS[j], servo_duty(ang, 360, PULSE))
+        fw.flush()
+
+    print(f"per-channel: {naive.transactions:>4} transactions, {naive.bytes_written:>5} bytes")
+    print(f"frames     : {bus.transactions:>4} transactions, {bus.bytes_written:>5} bytes   {fw.stats()}")
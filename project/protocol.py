@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/protocol.py
+"""
+Компактний бінарний протокол команд (замість JSON на 50–100 Гц по Wi-Fi).
+
+Кадр = заголовок + N записів фіксованої довжини, little-endian:
+
+  заголовок  <2sBBI   magic b"CR", версія, кількість записів, seq (u32)      8 байт
+  запис      <BBhhh   тип, індекс, a, b, c                                   8 байт
+
+  тип      індекс            a                 b               c
+  DRIVE    0                 лівий %           правий %        0        знакові -100..100
+  STEER    0                 кут, 0.01°        0               0
+  ARM      № у ARM_JOINTS    кут, 0.01°        час руху, мс    0        відносно центру
+  LIGHT    режим (LIGHT_*)   R                 G               B
+  SWITCH   порт 1..3         1/0               0               0
+
+Типовий пакет drive+steer — 24 байти (JSON — ~50). Декодування — struct.unpack_from /
+iter_unpack прямо з memoryview буфера прийому, без копій і проміжних словників:
+decode() віддає (seq, [(slot, value)]) з кортежами/числами замість dict — ті самі
+значення, що й control_server.parse_json (таблиця — після SEQ_MASK).
+Старша версія протоколу відкидається; нові типи записів додаються без зміни версії
+(невідомий тип пропускається).
+
+  enc = Encoder()
+  enc.drive(40, 40).steer(-7.5).arm("base", 20, t=0.3)
+  sock.sendto(enc.pack(), addr)          # seq росте сам, буфер перевикористовується
+"""
+import struct
+from typing import Any, Dict, List, Tuple
+
+MAGIC = b"CR"
+VERSION = 1
+
+HEADER = struct.Struct("<2sBBI")
+RECORD = struct.Struct("<BBhhh")
+MAX_RECORDS = 255
+
+DRIVE, STEER, ARM, LIGHT, SWITCH = 1, 2, 3, 4, 5
+
+ARM_JOINTS = ("gripper", "shoulder", "base", "wrist")      # як Arm.JOINTS
+_JOINT_INDEX = {j: i for i, j in enumerate(ARM_JOINTS)}
+
+LIGHT_OFF, LIGHT_COLOR, LIGHT_POLICE, LIGHT_BREATH = 0, 1, 2, 3
+LIGHT_MODES = ("off", "color", "police", "breath")
+
+SEQ_MASK = 0xFFFFFFFF
+
+# значення слотів після decode()/parse_json:
+#   ("drive", None)   -> (left, right)          ("steer", None)  -> delta, градуси
+#   ("arm", суглоб)   -> (кут, t)               ("light", None)  -> (mode, r, g, b)
+#   ("switch", порт)  -> 1/0
+_DRIVE_SLOT, _STEER_SLOT, _LIGHT_SLOT = ("drive", None), ("steer", None), ("light", None)
+
+
+def _i16(v: float) -> int:
+    v = int(round(v))
+    return -32768 if v < -32768 else 32767 if v > 32767 else v
+
+
+def is_packet(data) -> bool:
+    return not isinstance(data, str) and len(data) >= HEADER.size and bytes(data[:2]) == MAGIC
+
+
+def decode(data) -> Tuple[int, List[Tuple[Any, Any]]]:
+    mv = memoryview(data)
+    magic, ver, count, seq = HEADER.unpack_from(mv, 0)
+    if magic != MAGIC:
+        raise ValueError("bad magic")
+    if ver > VERSION:
+        raise ValueError(f"protocol v{ver} is newer than v{VERSION}")
+    end = HEADER.size + count * RECORD.size
+    if len(mv) < end:
+        raise ValueError("truncated frame")
+    items = []
+    for kind, idx, a, b, c in RECORD.iter_unpack(mv[HEADER.size:end]):
+        if kind == DRIVE:
+            items.append((_DRIVE_SLOT, (a, b)))
+        elif kind == STEER:
+            items.append((_STEER_SLOT, a * 0.01))
+        elif kind == ARM:
+            items.append((("arm", ARM_JOINTS[idx]), (a * 0.01, b * 0.001)))
+        elif kind == LIGHT:
+            items.append((_LIGHT_SLOT, (LIGHT_MODES[idx], a, b, c)))
+        elif kind == SWITCH:
+            items.append((("switch", idx), a))
+    return seq, items
+
+
+class Encoder:
+    """Збирає записи в перевикористовуваний буфер; pack() віддає кадр і чистить його."""
+
+    def __init__(self, seq: int = 0):
+        self.seq = seq
+        self._buf = bytearray(HEADER.size + MAX_RECORDS * RECORD.size)
+        self._n = 0
+
+    def _add(self, kind: int, idx: int = 0, a: float = 0, b: float = 0, c: float = 0) -> "Encoder":
+        if self._n >= MAX_RECORDS:
+            raise OverflowError("too many records in one frame")
+        RECORD.pack_into(self._buf, HEADER.size + self._n * RECORD.size, kind, idx, _i16(a), _i16(b), _i16(c))
+        self._n += 1
+        return self
+
+    def drive(self, left: float, right: float = None) -> "Encoder":
+        return self._add(DRIVE, 0, left, left if right is None else right)
+
+    def steer(self, delta_deg: float) -> "Encoder":
+        return self._add(STEER, 0, delta_deg * 100)
+
+    def arm(self, joint: str, rel_deg: float, t: float = 0.0) -> "Encoder":
+        return self._add(ARM, _JOINT_INDEX[joint], rel_deg * 100, t * 1000)
+
+    def light(self, mode: str, r: int = 0, g: int = 0, b: int = 0) -> "Encoder":
+        return self._add(LIGHT, LIGHT_MODES.index(mode), r, g, b)
+
+    def switch(self, port: int, on: int) -> "Encoder":
+        return self._add(SWITCH, port, 1 if on else 0)
+
+    def pack(self, seq: int = None) -> bytes:
+        if seq is None:
+            self.seq = (self.seq + 1) & SEQ_MASK
+            seq = self.seq
+        HEADER.pack_into(self._buf, 0, MAGIC, VERSION, self._n, seq & SEQ_MASK)
+        out = bytes(self._buf[:HEADER.size + self._n * RECORD.size])
+        self._n = 0
+        return out
+
+
+def encode_channels(seq: int, ch: Dict[str, Any]) -> bytes:
+    """Той самий словник каналів, що й у JSON-пакеті -> бінарний кадр (для UdpClient(encode=...))."""
+    enc = Encoder()
+    for name, val in ch.items():
+        if name == "drive":
+            if "speed" in val:
+                enc.drive(val["speed"])
+            else:
+                enc.drive(val.get("left", 0), val.get("right", 0))
+        elif name == "steer":
+            enc.steer(val.get("delta", 0.0))
+        elif name == "arm":
+            t = val.get("t", 0.0)
+            for j, v in val.items():
+                if j != "t":
+                    enc.arm(j, v, t)
+        elif name == "light":
+            enc.light(val.get("mode", "off"), val.get("r", 0), val.get("g", 0), val.get("b", 0))
+        elif name == "switch":
+            enc.switch(val["port"], val["on"])
+        else:
+            raise ValueError(f"unknown channel {name!r}")
+    return enc.pack(seq)
+
+
+if __name__ == "__main__":
+    import json, timeit
+    ch = {"drive": {"speed": 40}, "steer": {"delta": -7.5}}
+    js = json.dumps(dict(ch, seq=1234), separators=(",", ":")).encode()
+    bn = encode_channels(1234, ch)
+    print(f"json {len(js)} B, binary {len(bn)} B:", decode(bn))
+    n = 100000
+    tj = timeit.timeit(lambda: json.loads(js), number=n) / n
+    tb = timeit.timeit(lambda: decode(bn), number=n) / n
+    print(f"decode: json {tj * 1e6:.2f} us, binary {tb * 1e6:.2f} us")
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/recorder.py
+"""
+Запис сесії керування (кермо, мотори, суглоби руки) і точне відтворення.
+
+  CAR_RECORD=/tmp/drive.rec python3 teleop_cli.py     # або recorder.start(path) у своєму скрипті
+  python3 recorder.py info /tmp/drive.rec
+  python3 recorder.py play /tmp/drive.rec --speed 0.5 --from 12.0 --to 30.0
+
+Записи фіксованої довжини (REC, 24 байти) у кільцевому файлі через mmap: у керуючому
+циклі це один pack_into у відображену пам'ять і оновлення лічильника в заголовку, без
+системних викликів і алокацій. Коли кільце повне — перезаписуються найстаріші записи.
+Файл читається й тоді, коли процес, що писав, упав (лічильник у заголовку оновлюється
+після кожного запису).
+
+Точки запису (перевіряють recorder.active і нічого не коштують, коли запису немає):
+  steering.steer_set        — кут керма
+  move._apply_motor         — кожен мотор: напрямок + duty (motor_left/right, move, slew)
+  Arm._stage                — кожен суглоб (set_joint, center, pose, MotionExecutor)
+
+Відтворення тримає абсолютні дедлайни від старту (t0 + (t - from) / speed), тож похибки
+sleep не накопичуються на довгих записах.
+"""
+import os, mmap, struct, bisect, threading
+from typing import Iterator, List, Optional, Tuple
+
+import backend
+from protocol import ARM_JOINTS
+
+MAGIC = b"CARREC1\0"
+HEADER = struct.Struct("<8sIIQd")        # magic, розмір запису, ємність, записано всього, t0
+HEADER_SIZE = 64
+REC = struct.Struct("<dIBBhff")          # t, № запису, тип, індекс, резерв, a, b
+_COUNT_OFF = 16                          # зсув лічильника «записано всього» в заголовку
+_COUNT = struct.Struct("<Q")
+
+STEER, MOTOR, ARM = 1, 2, 3
+MOTORS = ("A", "B")                       # move.motor_A (правий), move.motor_B (лівий)
+_JOINT_INDEX = {j: i for i, j in enumerate(ARM_JOINTS)}
+
+DEFAULT_CAPACITY = 1 << 18               # ~6 МБ, ~40 хв при 100 записах/с
+
+Record = Tuple[float, int, int, float, float]     # t, тип, індекс, a, b
+
+active: Optional["Recorder"] = None
+
+
+class Recorder:
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = int(capacity)
+        size = HEADER_SIZE + self.capacity * REC.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.t0 = backend.monotonic()
+        HEADER.pack_into(self._mm, 0, MAGIC, REC.size, self.capacity, 0, self.t0)
+        self.count = 0
+        self._lock = threading.Lock()        # пишуть кілька потоків: лімітер, виконавець руки, UI
+
+    def _put(self, kind: int, idx: int, a: float, b: float = 0.0):
+        t = backend.monotonic() - self.t0
+        with self._lock:
+            n = self.count
+            REC.pack_into(self._mm, HEADER_SIZE + (n % self.capacity) * REC.size,
+                          t, n & 0xFFFFFFFF, kind, idx, 0, a, b)
+            self.count = n + 1
+            _COUNT.pack_into(self._mm, _COUNT_OFF, n + 1)
+
+    # ========== точки запису ==========
+    def steer(self, delta_deg: float):
+        self._put(STEER, 0, delta_deg)
+
+    def motor(self, name: str, direction: int, duty: float):
+        self._put(MOTOR, MOTORS.index(name), duty, direction)
+
+    def joint(self, joint: str, delta_from_center: float):
+        idx = _JOINT_INDEX.get(joint)
+        if idx is not None:
+            self._put(ARM, idx, delta_from_center)
+
+    def close(self):
+        with self._lock:
+            self._mm.flush()
+            self._mm.close()
+
+
+def start(path: str, capacity: int = DEFAULT_CAPACITY) -> Recorder:
+    global active
+    stop()
+    active = Recorder(path, capacity)
+    return active
+
+
+def start_from_env() -> Optional[Recorder]:
+    path = os.environ.get("CAR_RECORD")
+    return start(path) if path else None
+
+
+def stop():
+    global active
+    rec, active = active, None
+    if rec is not None:
+        rec.close()
+
+
+# ========== читання ==========
+class Recording:
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, rsize, self.capacity, self.total, self.t0 = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or rsize != REC.size:
+            raise ValueError(f"{path}: not a recorder file")
+        first = max(0, self.total - self.capacity)      # найстаріший запис, що ще вцілів
+        self.records: List[Record] = []
+        for n in range(first, self.total):
+            t, _, kind, idx, _, a, b = REC.unpack_from(self._mm, HEADER_SIZE + (n % self.capacity) * REC.size)
+            self.records.append((t, kind, idx, a, b))
+        # потоки пишуть під локом, але час беруть до нього — можливі дрібні інверсії
+        self.records.sort(key=lambda r: r[0])
+        self.times = [r[0] for r in self.records]
+        self.lost = first
+
+    @property
+    def duration(self) -> float:
+        return self.times[-1] - self.times[0] if self.times else 0.0
+
+    def index_at(self, t: float) -> int:
+        """Номер першого запису з часом >= t (для перемотування)."""
+        return bisect.bisect_left(self.times, t)
+
+    def state_at(self, t: float) -> dict:
+        """Останні значення кожного каналу до моменту t — з чого стартувати відтворення з середини."""
+        st = {}
+        for rec in self.records[:self.index_at(t)]:
+            st[(rec[1], rec[2])] = rec
+        return st
+
+    def close(self):
+        self._mm.close()
+
+
+class Player:
+    """Відтворення на абсолютних дедлайнах; stop() з іншого потоку перериває."""
+
+    def __init__(self, recording: Recording, arm=None):
+        self.rec = recording
+        self._arm = arm
+        self._stop = threading.Event()
+        self.position = 0.0            # час запису, до якого дійшли
+        self.late = 0                  # записів, відданих із запізненням > 10 мс
+
+    @property
+    def arm(self):
+        if self._arm is None:
+            from arm import Arm
+            self._arm = Arm()
+        return self._arm
+
+    def stop(self):
+        self._stop.set()
+
+    def _apply(self, kind: int, idx: int, a: float, b: float):
+        if kind == STEER:
+            from steering import steer_set
+            steer_set(a)
+        elif kind == MOTOR:
+            import move
+            if not move._initialized:
+                move.setup()
+            m = move.motor_A if MOTORS[idx] == "A" else move.motor_B
+            move._apply_motor((m, int(b), a))
+        elif kind == ARM:
+            self.arm._stage(ARM_JOINTS[idx], a)     # flush — пачкою на дедлайн
+
+    def play(self, start: float = 0.0, end: Optional[float] = None, speed: float = 1.0) -> int:
+        """Відтворити [start, end) секунд запису. Повертає кількість відданих записів."""
+        if not speed > 0:                # до перемотування: нульова/від'ємна швидкість не чіпає залізо
+            raise ValueError(f"speed must be > 0, got {speed}")
+        recs = self.rec.records
+        if not recs:
+            return 0
+        base = recs[0][0]
+        i = self.rec.index_at(base + start)
+        stop_i = len(recs) if end is None else self.rec.index_at(base + end)
+        # перемотування: спершу привести залізо до стану на момент start
+        arm_dirty = False
+        for (kind, idx), (t, _, _, a, b) in self.rec.state_at(base + start).items():
+            self._apply(kind, idx, a, b)
+            arm_dirty |= kind == ARM
+        if arm_dirty:
+            self.arm.frame.flush()
+        self._stop.clear()
+        t_rec0 = base + start
+        t_wall0 = backend.monotonic()
+        done = 0
+        while i < stop_i and not self._stop.is_set():
+            t = recs[i][0]
+            deadline = t_wall0 + (t - t_rec0) / speed
+            delay = deadline - backend.monotonic()
+            if delay > 0:
+                backend.sleep(delay)
+            elif delay < -0.01:
+                self.late += 1
+            # усе з однаковим часом — одним махом, суглоби руки одним кадром
+            arm_dirty = False
+            while i < stop_i and recs[i][0] == t:
+                _, kind, idx, a, b = recs[i]
+                self._apply(kind, idx, a, b)
+                arm_dirty |= kind == ARM
+                i += 1
+                done += 1
+            if arm_dirty:
+                self.arm.frame.flush()
+            self.position = t - base
+        return done
+
+
+def _positive(s: str) -> float:
+    import argparse
+    v = float(s)
+    if not v > 0:
+        raise argparse.ArgumentTypeError(f"must be > 0, got {s}")
+    return v
+
+
+def _main(argv=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("cmd", choices=("info", "dump", "play"))
+    ap.add_argument("path")
+    ap.add_argument("--speed", type=_positive, default=1.0)
+    ap.add_argument("--from", dest="start", type=float, default=0.0)
+    ap.add_argument("--to", dest="end", type=float, default=None)
+    args = ap.parse_args(argv)
+    rec = Recording(args.path)
+    if args.cmd == "info":
+        kinds = {}
+        for r in rec.records:
+            kinds[r[1]] = kinds.get(r[1], 0) + 1
+        names = {STEER: "steer", MOTOR: "motor", ARM: "arm"}
+        print(f"{len(rec.records)} records ({rec.lost} overwritten), {rec.duration:.2f}s:",
+              {names.get(k, k): n for k, n in kinds.items()})
+    elif args.cmd == "dump":
+        for t, kind, idx, a, b in rec.records:
+            print(f"{t:10.4f}  {kind}  {idx}  {a:8.2f}  {b:6.2f}")
+    else:
+        p = Player(rec)
+        try:
+            n = p.play(args.start, args.end, args.speed)
+        except KeyboardInterrupt:
+            n = -1
+        print(f"played {n} records, late {p.late}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
-import time
-import RPi.GPIO as GPIO
 import sys
-from rpi_ws281x import *
 import threading
+import time
+import backend
+import startup
+import telemetry
+
+_TEL_LIGHT = telemetry.channel("light")
+
+GPIO = None		# RPi.GPIO і rpi_ws281x імпортуються при першому зверненні до заліза (RobotLight._hw)
+
+def Color(red, green, blue, white = 0):
+	"""Те саме, що rpi_ws281x.Color, без імпорту бібліотеки."""
+	return (white << 24) | (red << 16) | (green << 8) | blue
 
 class RobotLight(threading.Thread):
 	def __init__(self, *args, **kwargs):
@@ -22,28 +31,49 @@ class RobotLight(threading.Thread):
 
 		self.lightMode = 'none'		#'none' 'police' 'breath'
 
-		GPIO.setwarnings(False)
-		GPIO.setmode(GPIO.BCM)
-		GPIO.setup(5, GPIO.OUT)
-		GPIO.setup(6, GPIO.OUT)
-		GPIO.setup(13, GPIO.OUT)
-
-		# Create NeoPixel object with appropriate configuration.
-		self.strip = Adafruit_NeoPixel(self.LED_COUNT, self.LED_PIN, self.LED_FREQ_HZ, self.LED_DMA, self.LED_INVERT, self.LED_BRIGHTNESS, self.LED_CHANNEL)
-		# Intialize the library (must be called once before other functions).
-		self.strip.begin()
+		self._strip = None		# GPIO + стрічка піднімаються ліниво, див. _hw()
 
 		super(RobotLight, self).__init__(*args, **kwargs)
 		self.__flag = threading.Event()
 		self.__flag.clear()
 
+	def _hw(self):
+		"""Підняти GPIO і NeoPixel при першому використанні, а не в конструкторі."""
+		global GPIO
+		if self._strip is not None:
+			return
+		with startup.hw("ws281x+gpio"):
+			GPIO = backend.gpio()		# RPi.GPIO або SimGPIO (CAR_BACKEND=sim)
+			GPIO.setwarnings(False)
+			GPIO.setmode(GPIO.BCM)
+			GPIO.setup(5, GPIO.OUT)
+			GPIO.setup(6, GPIO.OUT)
+			GPIO.setup(13, GPIO.OUT)
+
+			# Create NeoPixel object with appropriate configuration.
+			strip = backend.neopixel(self.LED_COUNT, self.LED_PIN, self.LED_FREQ_HZ, self.LED_DMA, self.LED_INVERT, self.LED_BRIGHTNESS, self.LED_CHANNEL)
+			# Intialize the library (must be called once before other functions).
+			strip.begin()
+			self._strip = strip
+
+
+	@property
+	def strip(self):
+		self._hw()
+		return self._strip
+
+
 	# Define functions which animate LEDs in various ways.
 	def setColor(self, R, G, B):
 		"""Wipe color across display a pixel at a time."""
+		t0 = time.perf_counter()
 		color = Color(int(R),int(G),int(B))
+		startup.actuated()
 		for i in range(self.strip.numPixels()):
 			self.strip.setPixelColor(i, color)
 			self.strip.show()
+		if telemetry.active is not None:
+			telemetry.active.record(_TEL_LIGHT, color, time.perf_counter() - t0)
 
 
 	def setSomeColor(self, R, G, B, ID):
@@ -73,18 +103,18 @@ class RobotLight(threading.Thread):
 		while self.lightMode == 'police':
 			for i in range(0,3):
 				self.setSomeColor(0,0,255,[0,1,2])
-				time.sleep(0.05)
+				backend.sleep(0.05)
 				self.setSomeColor(0,0,0,[0,1,2])
-				time.sleep(0.05)
+				backend.sleep(0.05)
 			if self.lightMode != 'police':
 				break
-			time.sleep(0.1)
+			backend.sleep(0.1)
 			for i in range(0,3):
 				self.setSomeColor(255,0,0,[0,1,2])
-				time.sleep(0.05)
+				backend.sleep(0.05)
 				self.setSomeColor(0,0,0,[0,1,2])
-				time.sleep(0.05)
-			time.sleep(0.1)
+				backend.sleep(0.05)
+			backend.sleep(0.1)
 
 
 	def breath(self, R_input, G_input, B_input):
@@ -101,15 +131,16 @@ class RobotLight(threading.Thread):
 				if self.lightMode != 'breath':
 					break
 				self.setColor(self.colorBreathR*i/self.breathSteps, self.colorBreathG*i/self.breathSteps, self.colorBreathB*i/self.breathSteps)
-				time.sleep(0.03)
+				backend.sleep(0.03)
 			for i in range(0,self.breathSteps):
 				if self.lightMode != 'breath':
 					break
 				self.setColor(self.colorBreathR-(self.colorBreathR*i/self.breathSteps), self.colorBreathG-(self.colorBreathG*i/self.breathSteps), self.colorBreathB-(self.colorBreathB*i/self.breathSteps))
-				time.sleep(0.03)
+				backend.sleep(0.03)
 
 
 	def frontLight(self, switch):
+		self._hw()
 		if switch == 'on':
 			GPIO.output(6, GPIO.HIGH)
 			GPIO.output(13, GPIO.HIGH)
@@ -119,6 +150,7 @@ class RobotLight(threading.Thread):
 
 
 	def switch(self, port, status):
+		self._hw()
 		if port == 1:
 			if status == 1:
 				GPIO.output(5, GPIO.HIGH)
@@ -151,6 +183,7 @@ class RobotLight(threading.Thread):
 
 
 	def headLight(self, switch):
+		self._hw()
 		if switch == 'on':
 			GPIO.output(5, GPIO.HIGH)
 		elif switch == 'off':
@@ -177,8 +210,8 @@ if __name__ == '__main__':
 	RL=RobotLight()
 	RL.start()
 	RL.breath(70,70,255)
-	time.sleep(15)
+	backend.sleep(15)
 	RL.pause()
 	RL.frontLight('off')
-	time.sleep(2)
+	backend.sleep(2)
 	RL.police()
\ No newline at end of file
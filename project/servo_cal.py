@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/servo_cal.py
+"""
+«Компілятор» калібрування серв: CENTER + OFFSET + межі + actuation_range + PULSE_US
+згортаються в одну JointTransform, і гарячий шлях — це кламп + одна афінна
+операція (або індекс у таблиці з кроком 0.1°) одразу до 16-бітного duty.
+
+  xf = compile_joint(center=90, offset=52, limits=(0, 180), actuation_range=180, pulse_us=(600, 2400))
+  xf.duty(+20)    # delta від центру -> duty_cycle
+  xf.angle(+20)   # delta від центру -> абсолютний кут (після клампу)
+"""
+from array import array
+from typing import Optional, Tuple
+
+from pca_frame import FREQUENCY_HZ
+
+LUT_STEP = 0.1     # градусів на клітинку таблиці
+
+
+class JointTransform:
+    __slots__ = ("base", "lo", "hi", "d0", "k", "rel_lo", "lut")
+
+    def __init__(self, base: float, lo: float, hi: float, d0: int, k: float, lut: bool = False):
+        self.base = base          # CENTER + OFFSET
+        self.lo = lo              # абсолютні межі (вже відсортовані)
+        self.hi = hi
+        self.d0 = d0              # duty при 0°
+        self.k = k                # duty на градус
+        self.rel_lo = lo - base
+        self.lut: Optional[array] = None
+        if lut:
+            n = int(round((hi - lo) / LUT_STEP)) + 1
+            self.lut = array("H", (d0 + int(min(lo + i * LUT_STEP, hi) * k) for i in range(n)))
+
+    def angle(self, rel: float) -> float:
+        a = self.base + rel
+        return self.lo if a < self.lo else self.hi if a > self.hi else a
+
+    def duty(self, rel: float) -> int:
+        lut = self.lut
+        if lut is not None:
+            i = int((rel - self.rel_lo) / LUT_STEP + 0.5)
+            return lut[0 if i < 0 else len(lut) - 1 if i >= len(lut) else i]
+        return self.d0 + int(self.angle(rel) * self.k)
+
+
+def compile_joint(center: float, offset: float, limits: Optional[Tuple[float, float]],
+                  actuation_range: float, pulse_us: Tuple[int, int],
+                  frequency: float = FREQUENCY_HZ, lut: bool = False,
+                  rel_limits: Optional[Tuple[float, float]] = None) -> JointTransform:
+    """
+    limits=None -> кламп у 0..actuation_range (як Arm при enforce_limits=False).
+    rel_limits  -> додатковий кламп delta (як LEFT_MAX/RIGHT_MAX у steering).
+    """
+    rng = float(actuation_range)
+    base = float(center) + float(offset)
+    lo, hi = (0.0, rng) if limits is None else sorted((float(limits[0]), float(limits[1])))
+    if rel_limits is not None:
+        lo, hi = max(lo, base + rel_limits[0]), min(hi, base + rel_limits[1])
+        lo, hi = max(lo, 0.0), min(hi, rng)
+    if hi < lo:
+        hi = lo
+    min_us, max_us = pulse_us
+    min_duty = int((min_us * frequency) / 1000000 * 0xFFFF)
+    max_duty = (max_us * frequency) / 1000000 * 0xFFFF
+    duty_range = int(max_duty - min_duty)
+    return JointTransform(base, lo, hi, min_duty, duty_range / rng, lut)
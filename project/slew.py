@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/slew.py
+"""
+Фоновий обмежувач швидкості зміни тяги (slew-rate) для обох моторів.
+
+  lim = get_limiter()          # спільний на процес, потік стартує сам
+  lim.set(+80, +80)            # не блокує; нова уставка перехоплює попередню одразу
+  lim.set(-100, -100)          # з +80: гальмування з decel до 0, далі розгін з accel назад
+
+Швидкості знакові, -100..+100 (+ вперед). Набір тяги обмежений accel (%/с),
+скидання — decel (%/с); цикл тікає з фіксованою частотою по абсолютних
+дедлайнах, а коли ціль досягнута — спить до нової уставки. Записи йдуть через
+move._apply_motor (обидва мотори одним пакетом, незмінне не пишеться).
+Тим, хто керує через лімітер, не варто паралельно смикати motor_left/right напряму.
+"""
+import threading, time
+from typing import Optional, Tuple
+
+import backend
+import move
+
+
+def _step(cur: float, target: float, accel: float, decel: float, dt: float) -> float:
+    if cur == target:
+        return cur
+    if cur != 0 and (target == 0 or (cur > 0) != (target > 0) or abs(target) < abs(cur)):
+        # скидаємо тягу (в т.ч. перед реверсом — спершу до нуля)
+        stop_at = target if (target == 0 or (cur > 0) == (target > 0)) else 0.0
+        d = decel * dt
+        return max(stop_at, cur - d) if cur > 0 else min(stop_at, cur + d)
+    d = accel * dt
+    return min(target, cur + d) if target > cur else max(target, cur - d)
+
+
+class SlewLimiter(threading.Thread):
+    def __init__(self, rate_hz: float = 100.0, accel: float = 250.0, decel: float = 400.0):
+        super().__init__(name="drive-slew", daemon=True)
+        self.dt = 1.0 / float(rate_hz)
+        self.accel = float(accel)        # %/с, набір тяги
+        self.decel = float(decel)        # %/с, скидання тяги
+        self._cv = threading.Condition()
+        self._target = [0.0, 0.0]        # лівий, правий
+        self._cur = [0.0, 0.0]
+        self._accel_once: Optional[float] = None
+        self._out: Tuple[int, int] = (0, 0)
+        self._running = True
+        self.ticks = 0
+        self.last_write = 0.0            # time.perf_counter() останнього запису в мотори
+
+    # ========== API ==========
+    def set(self, left: float, right: float, accel: Optional[float] = None):
+        """Нова уставка (знакова, -100..100). accel — разовий перебір набору тяги для цієї уставки."""
+        left = max(-100.0, min(100.0, float(left)))
+        right = max(-100.0, min(100.0, float(right)))
+        with self._cv:
+            if self._target == [left, right] and accel is None:
+                return
+            self._target = [left, right]
+            self._accel_once = accel
+            self._cv.notify()
+
+    def stop(self, hard: bool = False):
+        """Плавно до нуля; hard=True — миттєво (аварійно), без рампи."""
+        with self._cv:
+            self._target = [0.0, 0.0]
+            if hard:
+                self._cur = [0.0, 0.0]
+                self._write(0.0, 0.0)
+            self._cv.notify()
+
+    def current(self) -> Tuple[float, float]:
+        with self._cv:
+            return self._cur[0], self._cur[1]
+
+    def target(self) -> Tuple[float, float]:
+        with self._cv:
+            return self._target[0], self._target[1]
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Дочекатися, поки поточна тяга дійде до уставки (для блокуючих сценаріїв)."""
+        with self._cv:
+            return self._cv.wait_for(lambda: self._cur == self._target, timeout)
+
+    def shutdown(self):
+        with self._cv:
+            self._running = False
+            self._cv.notify_all()
+        if self.is_alive():
+            self.join(1.0)
+
+    # ========== цикл ==========
+    def _write(self, left: float, right: float):
+        out = (int(round(left)), int(round(right)))
+        if out == self._out:
+            return
+        self._out = out
+        l, r = out
+        move._apply_motor(
+            (move.motor_B, move.left_forward if l >= 0 else move.left_backward, abs(l)),
+            (move.motor_A, move.right_forward if r >= 0 else move.right_backward, abs(r)),
+        )
+        self.last_write = time.perf_counter()
+
+    def run(self):
+        move.setup()
+        deadline = backend.monotonic()
+        while True:
+            with self._cv:
+                while self._running and self._cur == self._target:
+                    self._cv.notify_all()            # для wait()
+                    self._cv.wait()
+                    deadline = backend.monotonic()
+                if not self._running:
+                    return
+                acc = self.accel if self._accel_once is None else self._accel_once
+                for i in (0, 1):
+                    self._cur[i] = _step(self._cur[i], self._target[i], acc, self.decel, self.dt)
+                if self._cur == self._target:
+                    self._accel_once = None
+                self._write(self._cur[0], self._cur[1])
+            self.ticks += 1
+            deadline += self.dt
+            delay = deadline - backend.monotonic()
+            if delay > 0:
+                backend.sleep(delay)
+            elif delay < -self.dt:
+                deadline = backend.monotonic()
+
+
+_limiter: Optional[SlewLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> SlewLimiter:
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = SlewLimiter()
+            _limiter.start()
+        return _limiter
+
+
+def close_limiter(hard: bool = True):
+    """Зупинити спільний лімітер і дочекатися його потоку (наступний get_limiter() підніме новий)."""
+    global _limiter
+    with _limiter_lock:
+        lim, _limiter = _limiter, None
+    if lim is not None:
+        lim.stop(hard=hard)
+        lim.shutdown()
+
+
+def stop_if_running(hard: bool = True) -> bool:
+    """Зупинити спільний лімітер, якщо його вже підняли (заради зупинки потік не стартує)."""
+    lim = _limiter
+    if lim is None:
+        return False
+    lim.stop(hard=hard)
+    return True
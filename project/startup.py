@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/startup.py
+"""
+Бюджет старту точки входу: скільки пішло на імпорти, на підняття заліза
+і коли сталося перше реальне керування.
+
+  import startup; startup.begin("teleop_cli")   # ПЕРШИМ рядком у скрипті
+  import ...                                    # решта імпортів
+  startup.mark("import")
+
+Бекенди самі загортають ініціалізацію в `with startup.hw("pca9685"):` і
+смикають startup.actuated() на першому записі. Точка входу друкує звіт
+одним рядком при виході (print_report()), тож регресії видно з кожного запуску.
+"""
+import os, sys, time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+_T0 = time.perf_counter()
+_name = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else "?"
+_marks: Dict[str, float] = {}
+_hw: List[Tuple[str, float, float]] = []      # (пристрій, старт, тривалість) — від _T0
+_first: Optional[float] = None
+
+
+def begin(name: str):
+    global _name
+    _name = name
+
+
+def mark(phase: str):
+    """Запам'ятати момент фази (лише перший раз)."""
+    _marks.setdefault(phase, time.perf_counter() - _T0)
+
+
+@contextmanager
+def hw(device: str):
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        _hw.append((device, t - _T0, time.perf_counter() - t))
+
+
+def actuated():
+    """Викликається бекендами на кожному записі; фіксує лише перший."""
+    global _first
+    if _first is None:
+        _first = time.perf_counter() - _T0
+
+
+def report() -> Dict[str, object]:
+    return {
+        "entry": _name,
+        "import_ms": round(_marks["import"] * 1e3, 1) if "import" in _marks else None,
+        "hw_init_ms": round(sum(d for _, _, d in _hw) * 1e3, 1),
+        "hw": {dev: round(d * 1e3, 1) for dev, _, d in _hw},
+        "first_actuation_ms": None if _first is None else round(_first * 1e3, 1),
+        "marks_ms": {k: round(v * 1e3, 1) for k, v in _marks.items()},
+    }
+
+
+def print_report(stream=None):
+    r = report()
+    hw_txt = " ".join(f"{k}={v}" for k, v in r["hw"].items()) or "-"
+    ms = lambda v: "-" if v is None else f"{v}ms"
+    print(f"[startup] {r['entry']}: import={ms(r['import_ms'])} hw_init={r['hw_init_ms']}ms ({hw_txt}) "
+          f"first_actuation={ms(r['first_actuation_ms'])}", file=stream or sys.stderr)
@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 # /home/mykodia/car/server/steering.py
-import time, board, busio
-from adafruit_servokit import ServoKit
+import time
+from servo_cal import compile_joint
+from pca_bus import get_bus, PRIO_STEER
+import recorder
+import telemetry
 
 PCA_ADDR        = 0x40
 STEER_CHANNEL   = 0        # ← твій канал
@@ -12,20 +15,35 @@ OFFSET_DEG      = 0         # підкрутиш після пробігу
 LEFT_MAX        = 35         # вліво  (відносно центру)
 RIGHT_MAX       = 35         # вправо (відносно центру)
 
-i2c = busio.I2C(board.SCL, board.SDA)
-kit = ServoKit(channels=16, i2c=i2c, address=PCA_ADDR)
+_TEL = telemetry.channel("steer")
 
-s = kit.servo[STEER_CHANNEL]
-s.actuation_range = ACTUATION_RANGE
-s.set_pulse_width_range(MIN_US, MAX_US)
+# залізо піднімається при першому steer_set, а не при імпорті
+bus  = None
+_pwm = None
+_xf  = None
 
 def _clamp(x, lo, hi): return lo if x < lo else hi if x > hi else x
 
+def _init():
+    global bus, _pwm
+    bus  = get_bus(PCA_ADDR)
+    _pwm = bus.channel(STEER_CHANNEL, PRIO_STEER)   # кермо випереджає руку в черзі шини
+
+def recompile():
+    """Перезібрати трансформацію після зміни OFFSET_DEG / LEFT_MAX / RIGHT_MAX / MIN_US..MAX_US."""
+    global _xf
+    _xf = compile_joint(CENTER_ANGLE, OFFSET_DEG, None, ACTUATION_RANGE, (MIN_US, MAX_US),
+                        lut=True, rel_limits=(-LEFT_MAX, RIGHT_MAX))
+
+recompile()
+
 def steer_set(delta_deg: float):
     """delta_deg: -ліво, +вправо (відносно центру)"""
-    a = _clamp(delta_deg, -LEFT_MAX, RIGHT_MAX)
-    target = _clamp(CENTER_ANGLE + OFFSET_DEG + a, 0, ACTUATION_RANGE)
-    s.angle = target
+    t0 = time.perf_counter()
+    if _pwm is None: _init()
+    _pwm.duty_cycle = _xf.duty(delta_deg)   # кламп + індекс у таблиці -> duty
+    if recorder.active is not None: recorder.active.steer(delta_deg)
+    if telemetry.active is not None: telemetry.active.record(_TEL, delta_deg, time.perf_counter() - t0)
 
 def center():          steer_set(0)
 def steer_left(deg=20):  steer_set(-abs(deg))
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/telemetry.py
+"""
+Телеметрія актуації: що і коли сказали залізу, скільки тривав запис.
+
+  import telemetry
+  telemetry.active.aggregates()          # {канал: {count, rate_hz, p50_us, p99_us, max_us, redundant}}
+  snap = telemetry.active.snapshot()     # узгоджений зріз кільця: t/ch/value/dur_us/redundant
+  CAR_TELEMETRY=0                        # вимкнути (за замовчуванням увімкнено)
+
+Кільце — передвиділені array.array (час, канал, значення, тривалість, ознака повтору,
+номер запису), без алокацій на запис і без локів: номер слоту бере itertools.count
+(атомарний під GIL), номер запису пишеться в слот останнім. snapshot() читає номери
+слотів до і після копіювання даних (seqlock) і відкидає слоти, які за цей час переписали
+або ще дописують, — рваних записів у зрізі немає, зріз узгоджений
+без зупинки писачів. Запис ~1 мкс, тож телеметрію можна не вимикати.
+
+Точки запису: move._apply_motor (motor.A / motor.B, знакове duty),
+Arm._stage (arm.<суглоб>, кут після клампу: set_joint, pose, center, MotionExecutor, replay),
+steering.steer_set (steer), RobotLight.setColor (light, 0xRRGGBB).
+«Повтор» — запис того самого значення, що вже було на каналі (кандидат на дедуп).
+"""
+import os, itertools
+from array import array
+from typing import Dict, List, Optional
+
+import backend
+
+DEFAULT_CAPACITY = 1 << 14
+MAX_CHANNELS = 64
+
+_names: List[str] = []
+_ids: Dict[str, int] = {}
+
+
+def channel(name: str) -> int:
+    """Номер каналу за іменем (реєструється при першому зверненні; кешуйте на рівні модуля)."""
+    cid = _ids.get(name)
+    if cid is None:
+        if len(_names) >= MAX_CHANNELS:
+            raise OverflowError("too many telemetry channels")
+        cid = _ids[name] = len(_names)
+        _names.append(name)
+    return cid
+
+
+def channel_name(cid: int) -> str:
+    return _names[cid]
+
+
+def _pct(s: List[float], p: float) -> float:
+    if not s:
+        return 0.0
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+class Snapshot:
+    __slots__ = ("t", "ch", "value", "dur", "redundant", "first", "lost")
+
+    def __init__(self, t, ch, value, dur, redundant, first, lost):
+        self.t, self.ch, self.value, self.dur, self.redundant = t, ch, value, dur, redundant
+        self.first = first          # номер першого запису в зрізі
+        self.lost = lost            # записів, що вже витіснені з кільця
+
+    def __len__(self):
+        return len(self.t)
+
+    def rows(self):
+        for i in range(len(self.t)):
+            yield self.t[i], _names[self.ch[i]], self.value[i], self.dur[i], bool(self.redundant[i])
+
+
+class Ring:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        cap = 1 << max(1, int(capacity - 1).bit_length())     # степінь двійки — слот через &
+        self.capacity = cap
+        self._mask = cap - 1
+        self.t = array("d", bytes(8 * cap))
+        self.ch = array("B", bytes(cap))
+        self.value = array("d", bytes(8 * cap))
+        self.dur = array("f", bytes(4 * cap))       # мкс
+        self.red = array("B", bytes(cap))
+        self.seq = array("q", [-1]) * cap
+        self._last = array("d", [float("nan")]) * MAX_CHANNELS
+        self._counter = itertools.count()
+        self.head = 0                               # верхня межа дописаних записів
+
+    def record(self, ch: int, value: float, dur_s: float):
+        i = next(self._counter)
+        s = i & self._mask
+        self.seq[s] = -1                            # слот «у роботі» для читачів
+        self.t[s] = backend.monotonic()
+        self.ch[s] = ch
+        self.value[s] = value
+        self.dur[s] = dur_s * 1e6
+        self.red[s] = self._last[ch] == value
+        self._last[ch] = value
+        self.seq[s] = i
+        if i >= self.head:
+            self.head = i + 1
+
+    def last(self, name: str) -> float:
+        """Останнє записане значення каналу — поточна команда (nan — ще не писали)."""
+        return self._last[channel(name)]
+
+    def snapshot(self) -> Snapshot:
+        head = self.head
+        seq = self.seq[:]
+        t, ch, value, dur, red = self.t[:], self.ch[:], self.value[:], self.dur[:], self.red[:]
+        seq2 = self.seq[:]          # seqlock: слот, чий номер змінився за час копіювання, — рваний
+        # усе, що старіше за head_після - ємність, могли переписати, поки копіювали
+        lo = max(0, self.head - self.capacity)
+        out = (array("d"), array("B"), array("d"), array("f"), array("B"))
+        ot, och, oval, odur, ored = out
+        mask = self._mask
+        for i in range(lo, head):
+            s = i & mask
+            if seq[s] != i or seq2[s] != i:
+                continue
+            ot.append(t[s]); och.append(ch[s]); oval.append(value[s])
+            odur.append(dur[s]); ored.append(red[s])
+        return Snapshot(ot, och, oval, odur, ored, lo, lo)
+
+    def aggregates(self, window: Optional[float] = None) -> Dict[str, dict]:
+        """Агрегати по каналах; window — лише останні N секунд."""
+        snap = self.snapshot()
+        t_end = backend.monotonic()
+        t_min = t_end - window if window else None
+        per: Dict[int, list] = {}
+        for i in range(len(snap)):
+            if t_min is not None and snap.t[i] < t_min:
+                continue
+            per.setdefault(snap.ch[i], []).append(i)
+        out = {}
+        for cid, idx in per.items():
+            durs = sorted(snap.dur[i] for i in idx)
+            t0 = t_min if t_min is not None else snap.t[idx[0]]
+            span = t_end - t0
+            out[_names[cid]] = {
+                "count": len(idx),
+                "rate_hz": len(idx) / span if span > 0 else 0.0,
+                "p50_us": _pct(durs, 50),
+                "p99_us": _pct(durs, 99),
+                "max_us": durs[-1],
+                "redundant": sum(snap.redundant[i] for i in idx),
+            }
+        return out
+
+    def clear(self):
+        for s in range(self.capacity):
+            self.seq[s] = -1
+        for c in range(MAX_CHANNELS):
+            self._last[c] = float("nan")
+
+
+active: Optional[Ring] = None if os.environ.get("CAR_TELEMETRY", "1") == "0" else Ring()
+
+
+if __name__ == "__main__":
+    import time, timeit
+    backend.configure("sim")
+    import move, steering
+    import telemetry as tm          # той самий модуль, що й у точках запису (не __main__)
+    from arm import Arm
+    from robotLight import RobotLight
+    arm = Arm(offsets_file="/nonexistent", limits_file="/nonexistent")
+    rl = RobotLight()
+    for i in range(200):
+        move.move(40 + (i // 20) * 5, "forward", "no")
+        steering.steer_set((i // 10) % 30 - 15)
+        arm.set_joint("base", i % 40)
+        if i % 50 == 0:
+            rl.setColor(255, 0, i)
+        backend.sleep(0.01)
+    for name, a in sorted(tm.active.aggregates().items()):
+        print(f"{name:<10} " + "  ".join(f"{k} {v:.1f}" if isinstance(v, float) else f"{k} {v}" for k, v in a.items()))
+    cid = tm.channel("bench")
+    n = 200000
+    per = timeit.timeit(lambda: tm.active.record(cid, 1.0, 0.0), number=n) / n
+    t = time.perf_counter(); tm.active.snapshot(); snap_t = time.perf_counter() - t
+    print(f"record: {per * 1e6:.2f} us, snapshot of {tm.active.capacity}: {snap_t * 1e3:.1f} ms")
@@ -1,42 +1,150 @@
 #!/usr/bin/env python3
-import time, curses
+import startup; startup.begin("teleop_cli")
+import os, time, curses, threading
+from collections import deque
 from move import setup, motor_left, motor_right, motorStop, left_forward, right_forward, left_backward, right_backward, Dir_forward, Dir_backward
 from steering import steer_set, center
+from slew import get_limiter
+import cmd_watchdog as wd
+import recorder
+startup.mark("import")
 
 SPEED_STEP = 10      # крок швидкості %
 TURN_STEP  = 5       # крок керма, градуси
 MAX_SPEED  = 100
 MAX_TURN   = 35      # збігається з LEFT_MAX/RIGHT_MAX у steering.py
 
+ACT_HZ     = 50      # тік актуації (keepalive уставки, навіть без натискань)
+RENDER_HZ  = 10      # перемальовка статусу — окремо й рідше
+LAT_WINDOW = 200     # скільки останніх замірів затримки тримати
+
 def clamp(v, lo, hi): return lo if v < lo else hi if v > hi else v
 
 def apply_drive(speed, turn_deg):
     # turn_deg: -вліво, +вправо
+    # speed: -100..100 — уставка; реальну тягу плавно доводить фоновий slew-лімітер
     steer_set(turn_deg)
-    if speed > 0:
-        motor_left(1, left_forward,  speed)
-        motor_right(1, right_forward, speed)
-    elif speed < 0:
-        motor_left(1, left_backward,  -speed)
-        motor_right(1, right_backward, -speed)
-    else:
-        motorStop()
+    get_limiter().set(speed, speed)
+
+def pct(samples, p):
+    s = sorted(samples)
+    if not s:
+        return 0.0
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+class Actuator(threading.Thread):
+    """
+    Окремий потік актуації: тікає з ACT_HZ по абсолютних дедлайнах і віддає
+    поточну уставку в кермо/лімітер. Натискання будить його одразу (не чекаючи тіку).
+    Заміри: клавіша -> steer_set повернувся, клавіша -> перший запис у мотори лімітером.
+    """
+
+    def __init__(self, rate_hz=ACT_HZ):
+        super().__init__(name="teleop-act", daemon=True)
+        self.dt = 1.0 / float(rate_hz)
+        self._cv = threading.Condition()
+        self.speed = 0
+        self.turn = 0
+        self._key_ts = None          # час натискання, ще не відданого в кермо
+        self._drive_ts = None        # час натискання, що змінило швидкість і чекає запису в мотори
+        self._running = True
+        self.lat_steer = deque(maxlen=LAT_WINDOW)
+        self.lat_motor = deque(maxlen=LAT_WINDOW)
+        self.ticks = 0
+
+    def submit(self, speed, turn, key_ts):
+        with self._cv:
+            if speed != self.speed:
+                self._drive_ts = key_ts
+            self.speed, self.turn = speed, turn
+            self._key_ts = key_ts
+            self._cv.notify()
+
+    def shutdown(self):
+        with self._cv:
+            self._running = False
+            self._cv.notify()
+        if self.is_alive():
+            self.join(1.0)
+
+    def run(self):
+        lim = get_limiter()
+        deadline = time.monotonic()
+        while True:
+            with self._cv:
+                if self._key_ts is None:
+                    self._cv.wait(max(0.0, deadline - time.monotonic()))
+                if not self._running:
+                    return
+                speed, turn, key_ts = self.speed, self.turn, self._key_ts
+                self._key_ts = None
+            apply_drive(speed, turn)
+            wd.feed("drive"); wd.feed("steering")
+            now = time.perf_counter()
+            if key_ts is not None:
+                self.lat_steer.append(now - key_ts)
+            with self._cv:
+                drive_ts = self._drive_ts
+                if drive_ts is not None and lim.last_write >= drive_ts:
+                    self.lat_motor.append(lim.last_write - drive_ts)
+                    self._drive_ts = None
+            self.ticks += 1
+            if key_ts is None:
+                deadline += self.dt
+                if deadline < time.monotonic() - self.dt:
+                    deadline = time.monotonic()
+            # тік по клавіші дедлайн не зсуває — фіксована сітка лишається
+
+    def latency_line(self):
+        def fmt(name, d):
+            s = list(d)
+            if not s:
+                return f"{name}: -"
+            return f"{name}: last {s[-1]*1e3:5.1f}  p50 {pct(s, 50)*1e3:5.1f}  max {max(s)*1e3:5.1f} ms"
+        return fmt("key->steer", self.lat_steer) + "   " + fmt("key->motor", self.lat_motor)
+
+
+def draw(stdscr, act):
+    stdscr.erase()
+    stdscr.addstr(0, 0, "Teleop: W/S speed, A/D steer, SPACE stop, C center, Q quit")
+    stdscr.addstr(1, 0, f"Speed: {act.speed:>4}   Turn: {act.turn:>4} deg")
+    cur_l, cur_r = get_limiter().current()
+    stdscr.addstr(2, 0, f"Motor now: L {cur_l:6.1f}  R {cur_r:6.1f}   act ticks {act.ticks}")
+    stdscr.addstr(3, 0, act.latency_line())
+    d = wd.get_watchdog().stats()["drive"]
+    if d["min_margin_ms"] is not None:
+        stdscr.addstr(4, 0, f"Watchdog drive: min margin {d['min_margin_ms']:5.1f} / {d['timeout_ms']:.0f} ms   trips {d['trips']}")
+    stdscr.refresh()
 
 def main(stdscr):
     curses.curs_set(0)
-    stdscr.nodelay(True)
-    stdscr.timeout(50)
 
+    recorder.start_from_env()     # CAR_RECORD=файл — записати сесію для recorder.py play
+    dataset = None
+    if os.environ.get("CAR_DATASET"):      # numpy і камера — лише коли справді пишемо датасет
+        import drive_dataset as dataset
+        dataset.start_from_env()
     setup()
     center()
 
     speed = 0       # -100..+100
     turn  = 0       # -MAX_TURN..+MAX_TURN
 
+    wd.get_watchdog()     # стоп моторів, якщо тік актуації завис/впав
+    act = Actuator()
+    act.start()
+    render_dt = 1.0 / RENDER_HZ
+    next_render = time.monotonic()
+
+    # curses не потокобезпечний, тож getch і малювання лишаються в головному потоці:
+    # getch блокується до клавіші (або до наступної перемальовки) і одразу будить актуацію
     try:
         while True:
+            stdscr.timeout(max(0, int((next_render - time.monotonic()) * 1000)))
             ch = stdscr.getch()
             if ch != -1:
+                key_ts = time.perf_counter()
                 if ch in (ord('q'), ord('Q')):
                     break
                 elif ch in (ord('w'), curses.KEY_UP):
@@ -51,18 +159,22 @@ def main(stdscr):
                     speed = 0
                 elif ch in (ord('c'), ord('C')):
                     turn = 0
+                if (speed, turn) != (act.speed, act.turn):
+                    act.submit(speed, turn, key_ts)
 
-            apply_drive(speed, turn)
-
-            stdscr.erase()
-            stdscr.addstr(0, 0, "Teleop: W/S speed, A/D steer, SPACE stop, C center, Q quit")
-            stdscr.addstr(1, 0, f"Speed: {speed:>4}   Turn: {turn:>4} deg")
-            stdscr.refresh()
-
-            time.sleep(0.02)
+            now = time.monotonic()
+            if now >= next_render:
+                draw(stdscr, act)
+                next_render = max(next_render + render_dt, now)
     finally:
+        act.shutdown()
+        get_limiter().stop(hard=True)
         motorStop()
         center()
+        recorder.stop()
+        if dataset is not None:
+            dataset.stop()
 
 if __name__ == "__main__":
     curses.wrapper(main)
+    startup.print_report()
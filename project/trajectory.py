@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# /home/mykodia/car/server/trajectory.py
+"""
+Планувальник траєкторій для руки (NumPy).
+
+Нормовані таблиці easing (k/steps, k=1..steps -> 0..1) кешуються по ключу
+(easing, steps) з LRU-витісненням, а вся матриця «крок × суглоб» рахується
+однією операцією:  path = start + (goal - start) * table[:, None].
+
+Свої профілі:
+  PLANNER.register("snap", [0, 0.05, 0.3, 0.9, 1.0])   # таблиця, пере-семплюється під steps
+  PLANNER.register("cubic", lambda x: x ** 3)          # або векторна функція від x∈(0,1]
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, Sequence, Tuple, Union
+
+import numpy as np
+
+EasingFn = Callable[[np.ndarray], np.ndarray]
+
+EASINGS: Dict[str, EasingFn] = {
+    "linear":  lambda x: x,
+    "easein":  lambda x: x * x,
+    "easeout": lambda x: 1 - (1 - x) * (1 - x),
+    "easeio":  lambda x: 0.5 - 0.5 * np.cos(np.pi * x),
+}
+
+
+def _from_table(table: Sequence[float]) -> EasingFn:
+    ys = np.asarray(table, dtype=np.float64)
+    if ys.ndim != 1 or ys.size < 2:
+        raise ValueError("easing table needs at least 2 samples")
+    xs = np.linspace(0.0, 1.0, ys.size)
+    return lambda x: np.interp(x, xs, ys)
+
+
+class TrajectoryPlanner:
+    def __init__(self, cache_size: int = 64):
+        self.cache_size = int(cache_size)
+        self._fns: Dict[str, EasingFn] = dict(EASINGS)
+        self._cache: "OrderedDict[Tuple[str, int], np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, name: str, easing: Union[EasingFn, Sequence[float]]):
+        """Додати/перевизначити профіль: функція від масиву x або таблиця значень 0..1."""
+        self._fns[name] = easing if callable(easing) else _from_table(easing)
+        for key in [k for k in self._cache if k[0] == name]:
+            del self._cache[key]
+
+    def table(self, easing: str, steps: int) -> np.ndarray:
+        """Нормована таблиця a[k] для k=1..steps (read-only, з кешу)."""
+        key = (easing, int(steps))
+        tab = self._cache.get(key)
+        if tab is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return tab
+        self.misses += 1
+        fn = self._fns.get(easing, EASINGS["linear"])    # невідомий профіль -> linear, як Arm._easing
+        x = np.arange(1, key[1] + 1, dtype=np.float64) / key[1]
+        tab = np.asarray(fn(x), dtype=np.float64)
+        tab.setflags(write=False)
+        self._cache[key] = tab
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return tab
+
+    def plan(self, start: Sequence[float], goal: Sequence[float],
+             steps: int, easing: str = "easeio") -> np.ndarray:
+        """Матриця (steps, n_joints) відносних кутів для всіх суглобів разом."""
+        s = np.asarray(start, dtype=np.float64)
+        g = np.asarray(goal, dtype=np.float64)
+        return s + (g - s) * self.table(easing, steps)[:, None]
+
+
+# спільний на процес: повтор тих самих поз бере таблиці з кешу
+PLANNER = TrajectoryPlanner()
+
+
+# ========== синхронні рухи з обмеженням швидкості/прискорення ==========
+def _accel_eff(amax: np.ndarray, shape: str) -> np.ndarray:
+    # S-крива: прискорення sin²-формою з піком amax, середнє — amax/2
+    return amax * 0.5 if shape == "scurve" else amax
+
+
+def min_duration(dist: Sequence[float], vmax: Sequence[float], amax: Sequence[float],
+                 shape: str = "trapezoid") -> float:
+    """Мінімальний час, за який ВСІ суглоби пройдуть |dist| у межах своїх vmax/amax."""
+    d = np.abs(np.asarray(dist, dtype=np.float64))
+    v = np.asarray(vmax, dtype=np.float64)
+    a = _accel_eff(np.asarray(amax, dtype=np.float64), shape)
+    tri = d <= v * v / a                       # не встигає вийти на vmax -> трикутник
+    t = np.where(tri, 2.0 * np.sqrt(d / a), d / v + v / a)
+    return float(t.max()) if t.size else 0.0
+
+
+def sync_profile(start: Sequence[float], goal: Sequence[float],
+                 vmax: Sequence[float], amax: Sequence[float],
+                 dt: float, shape: str = "trapezoid") -> np.ndarray:
+    """
+    Матриця (n, joints) для руху, де всі суглоби приходять разом за мінімальний час,
+    який дозволяє найповільніший. Кожен суглоб отримує свій профіль тієї ж тривалості
+    T: з власним amax і меншою за vmax крейсерською швидкістю.
+    shape: "trapezoid" (обмежене прискорення) або "scurve" (ще й плавний ривок).
+    """
+    s = np.asarray(start, dtype=np.float64)
+    g = np.asarray(goal, dtype=np.float64)
+    dist = g - s
+    d = np.abs(dist)
+    a = _accel_eff(np.asarray(amax, dtype=np.float64), shape)
+    T = min_duration(d, vmax, amax, shape)
+    if T <= 0:
+        return g[None, :].copy()
+
+    # крейсерська швидкість під спільний T:  v*T - v²/a = d
+    disc = np.maximum((a * T) ** 2 - 4.0 * a * d, 0.0)
+    v = (a * T - np.sqrt(disc)) * 0.5
+    ta = np.where(d > 0, v / a, 0.0)
+    safe_ta = np.where(ta > 0, ta, 1.0)
+
+    n = max(1, int(np.ceil(T / dt)))
+    t = np.minimum(np.arange(1, n + 1, dtype=np.float64) * dt, T)[:, None]
+
+    def ramp(tt):
+        # пройдений шлях на розгоні (0..ta)
+        if shape == "scurve":
+            w = 2.0 * np.pi / safe_ta
+            return v * (tt * tt / (2.0 * safe_ta) + (np.cos(w * tt) - 1.0) / (2.0 * np.pi * w))
+        return 0.5 * a * tt * tt
+
+    acc = ramp(np.minimum(t, ta))
+    pos = np.where(t < ta, acc,
+          np.where(t <= T - ta, v * (t - ta * 0.5), d - ramp(np.clip(T - t, 0.0, None))))
+    pos = np.where(d > 0, pos, 0.0)
+    return s + np.sign(dist) * pos